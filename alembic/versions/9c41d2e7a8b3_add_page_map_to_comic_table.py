@@ -0,0 +1,28 @@
+"""Add page map to comic table
+
+Revision ID: 9c41d2e7a8b3
+Revises: 5f2be68db998
+Create Date: 2026-10-18 10:02:14.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41d2e7a8b3'
+down_revision: Union[str, None] = '5f2be68db998'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('page_map', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_column('page_map')
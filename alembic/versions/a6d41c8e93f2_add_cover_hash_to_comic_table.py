@@ -0,0 +1,30 @@
+"""Add cover_hash to comic table
+
+Revision ID: a6d41c8e93f2
+Revises: f3c7a2d91e45
+Create Date: 2026-10-18 16:05:12.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d41c8e93f2'
+down_revision: Union[str, None] = 'f3c7a2d91e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cover_hash', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_comics_cover_hash'), ['cover_hash'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comics_cover_hash'))
+        batch_op.drop_column('cover_hash')
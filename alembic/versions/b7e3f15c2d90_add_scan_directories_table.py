@@ -0,0 +1,43 @@
+"""Add scan directories table
+
+Revision ID: b7e3f15c2d90
+Revises: 9c41d2e7a8b3
+Create Date: 2026-10-18 11:20:47.902315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f15c2d90'
+down_revision: Union[str, None] = '9c41d2e7a8b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scan_directories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('library_id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('mtime', sa.Float(), nullable=True),
+        sa.Column('file_count', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['library_id'], ['libraries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('library_id', 'path', name='uq_scan_directory_library_path')
+    )
+    with op.batch_alter_table('scan_directories', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scan_directories_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_scan_directories_library_id'), ['library_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scan_directories', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scan_directories_library_id'))
+        batch_op.drop_index(batch_op.f('ix_scan_directories_id'))
+
+    op.drop_table('scan_directories')
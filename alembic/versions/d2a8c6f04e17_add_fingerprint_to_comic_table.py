@@ -0,0 +1,30 @@
+"""Add fingerprint to comic table
+
+Revision ID: d2a8c6f04e17
+Revises: b7e3f15c2d90
+Create Date: 2026-10-18 12:41:09.557120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8c6f04e17'
+down_revision: Union[str, None] = 'b7e3f15c2d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_comics_fingerprint'), ['fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comics_fingerprint'))
+        batch_op.drop_column('fingerprint')
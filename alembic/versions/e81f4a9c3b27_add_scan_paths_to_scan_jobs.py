@@ -0,0 +1,28 @@
+"""Add scan_paths to scan_jobs table
+
+Revision ID: e81f4a9c3b27
+Revises: d2a8c6f04e17
+Create Date: 2026-10-18 14:02:33.184511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81f4a9c3b27'
+down_revision: Union[str, None] = 'd2a8c6f04e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('scan_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('scan_paths', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scan_jobs', schema=None) as batch_op:
+        batch_op.drop_column('scan_paths')
@@ -0,0 +1,28 @@
+"""Add page_dimensions to comic table
+
+Revision ID: f3c7a2d91e45
+Revises: e81f4a9c3b27
+Create Date: 2026-10-18 15:20:47.602813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c7a2d91e45'
+down_revision: Union[str, None] = 'e81f4a9c3b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('page_dimensions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_column('page_dimensions')
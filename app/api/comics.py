@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import Response, FileResponse
 from sqlalchemy import Float, func, case, cast, or_
 from sqlalchemy.orm import joinedload, selectinload
@@ -6,6 +6,7 @@ from typing import List, Annotated, Literal
 from pathlib import Path
 import re
 import random
+import asyncio
 
 from app.core.comic_helpers import (get_reading_time, get_format_sort_index, REVERSE_NUMBERING_SERIES,
                                     get_age_rating_config, get_series_age_restriction)
@@ -23,7 +24,11 @@ from app.models.tags import Character, Team, Location, Genre
 
 from app.schemas.search import SearchRequest, SearchResponse
 from app.services.search import SearchService
-from app.services.images import ImageService
+from app.services.sprites import sprite_cache, SPRITE_MAX_ITEMS, SPRITE_KEY_RE
+from app.services.cover_store import cover_store
+from app.services.thumbnail_cache import thumbnail_cache
+from app.services.ondemand_thumbnails import ondemand_thumbnails, ONDEMAND_WAIT_SECONDS, PENDING, FAILED
+from app.services.images import get_thumbnail_widths, pick_rendition_width, rendition_path
 
 
 router = APIRouter()
@@ -213,51 +218,126 @@ async def get_comic(comic_id: int, db: SessionDep, current_user: CurrentUser):
     }
 
 
+def cover_candidates(comic_id: int, cover_hash: str | None, thumbnail_path: str | None,
+                     width: int | None = None) -> List[tuple]:
+    """
+    Where a comic's thumbnail may be, in order, as (path, immutable).
+    1. Content-addressed store (set by the thumbnail job / on-demand generation) - immutable, the name is its hash
+    2. Legacy flat path stored in the Database (until the cleanup task migrates it)
+    3. The legacy "Standard" path (flat files written by older versions, until migrated)
+    """
+    candidates = []
+    if cover_hash:
+        candidates.append((cover_store.path_for(cover_hash, width), True))
+    elif thumbnail_path:
+        path = Path(thumbnail_path)
+        candidates.append((rendition_path(path, width) if width else path, False))
+
+    standard_path = Path(f"./storage/cover/comic_{comic_id}.webp")
+    candidates.append((rendition_path(standard_path, width) if width else standard_path, False))
+    return candidates
+
+
+def resolve_cover_path(comic_id: int, cover_hash: str | None, thumbnail_path: str | None,
+                       width: int | None = None) -> Path | None:
+    """Existing thumbnail file for a comic (None if it has to be generated)"""
+    for path, _ in cover_candidates(comic_id, cover_hash, thumbnail_path, width):
+        if path.exists():
+            return path
+    return None
+
+
+# A URL pinned to the cover's hash (?v=<cover_hash>) never changes content: cache it for good.
+# The bare URL follows the comic's current cover, so clients revalidate it (cheap 304s via the ETag).
+VERSIONED_COVER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+COVER_CACHE_CONTROL = "no-cache"
+
+
+def _thumbnail_response(request: Request, path: Path, etag: str, data: bytes | None, versioned: bool):
+    """200 with validators, or 304 when the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": VERSIONED_COVER_CACHE_CONTROL if versioned else COVER_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*"
+                          or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+
+    if data is None:
+        return FileResponse(path, media_type="image/webp", headers=headers)
+    return Response(content=data, media_type="image/webp", headers=headers)
+
+
 @router.get("/{comic_id}/thumbnail", name="thumbnail")
 async def get_comic_thumbnail(
         comic_id: int,
-        db: SessionDep
+        request: Request,
+        db: SessionDep,
+        w: Annotated[int | None, Query(ge=1, le=4096, description="Display width in px (picks the nearest rendition)")] = None,
+        v: Annotated[str | None, Query(description="Cover hash the URL is pinned to (long-lived caching)")] = None
 ):
     """
         Get the thumbnail for a comic (public)
     Serves from storage/cover. Regenerates if missing.
-        Self-healing: Generates file if missing, but DOES NOT write to DB
-        to avoid locking issues during parallel loading.
+        Self-healing: Generates the cover into the cover store if missing and sets the
+        comic's cover_hash (best effort: skipped when the DB is locked).
+
+    ?w= selects the smallest configured rendition at least that wide
+    (system.thumbnail_widths). Missing covers are generated on demand (every rendition at once).
+    While another request or worker is generating it, a 202 placeholder is returned.
+
+    Responses carry a strong ETag (file mtime + size); If-None-Match gets a 304.
+    ?v=<cover_hash> (matching the current cover) is cached as immutable; the bare URL is revalidated.
     """
     # 1. Base Query
-    comic = db.query(Comic).filter(Comic.id == comic_id).first()
+    # OPTIMIZED: Only the columns needed to find the file, not the whole row (summary, metadata_json, ...)
+    comic = db.query(Comic.id, Comic.file_path, Comic.thumbnail_path, Comic.cover_hash) \
+        .filter(Comic.id == comic_id).first()
 
     if not comic:
         # We return 404 here to prevent leaking existence of the comic
         raise HTTPException(status_code=404, detail="Comic not found")
 
-
-    # 2. Layer 1: Check the path stored in the Database
-    if comic.thumbnail_path:
-        db_path = Path(comic.thumbnail_path)
-        if db_path.exists():
-            return FileResponse(db_path, media_type="image/webp")
-
-    # 3. Layer 2: Check the "Standard" path (Self-Healing fallback)
-    # This handles cases where the DB is NULL or points to a file that was deleted.
-    standard_path = Path(f"./storage/cover/comic_{comic.id}.webp")
-
-    if standard_path.exists():
-        return FileResponse(standard_path, media_type="image/webp")
-
-    # 4. Layer 3: Generate on the fly
-    # We use the standard path for the new file.
-    image_service = ImageService()
-    success = image_service.generate_thumbnail(comic.file_path, standard_path)
-
-    if not success:
-        # Return a placeholder or 404
+    width = pick_rendition_width(w, get_thumbnail_widths()) if w else None
+
+    # 2. Layers 1-2: Stored / legacy / standard path
+    # OPTIMIZED: Hot covers come from the per-worker memory cache (no disk I/O for stored covers)
+    for path, immutable in cover_candidates(comic.id, comic.cover_hash, comic.thumbnail_path, width):
+        cached = thumbnail_cache.get(path, immutable=immutable)
+        if cached:
+            versioned = immutable and v is not None and v == comic.cover_hash
+            return _thumbnail_response(request, path, *cached, versioned)
+
+    # 3. Layer 3: Generate on the fly
+    # OPTIMIZED: Generation runs on a bounded thread pool, single-flight per comic across
+    # requests and web workers, so a grid of missing covers can't stall the event loop.
+    # Same layout as the thumbnail job: hash-sharded store files, cover_hash on the comic.
+    future = ondemand_thumbnails.submit(comic.id, comic.file_path)
+    status, cover_hash = PENDING, None
+    if future is not None:
+        try:
+            # shield: a timed-out request must not cancel a task other requests share
+            status, cover_hash = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                                        timeout=ONDEMAND_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            status = PENDING
+
+    if status == FAILED:
         raise HTTPException(status_code=404, detail="Could not generate thumbnail")
 
-    # NOTE: We serve the file, but we DO NOT write back to the DB here.
-    # This avoids the "Database Locked" issues during parallel loading.
-    # The next time this runs, it will hit Layer 2 and succeed.
-    return FileResponse(standard_path, media_type="image/webp")
+    if status == PENDING:
+        # Busy (queue full, or another worker is generating it): answer fast, retry later
+        return Response(
+            content=ondemand_thumbnails.placeholder(width),
+            media_type="image/webp",
+            status_code=202,
+            headers={"Cache-Control": "no-store", "Retry-After": "2", "X-Thumbnail-Status": "pending"}
+        )
+
+    path = cover_store.path_for(cover_hash, width)
+    cached = thumbnail_cache.get(path, immutable=True)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Could not generate thumbnail")
+    return _thumbnail_response(request, path, *cached, versioned=v is not None and v == cover_hash)
 
 
 @router.get("/random/backgrounds", name="random_backgrounds")
@@ -289,6 +369,74 @@ async def get_random_backgrounds(
     return [f"api/comics/{cid}/thumbnail" for cid in selected_ids]
 
 
+@router.get("/covers/sprite", name="cover_sprite")
+def get_cover_sprite(
+        db: SessionDep,
+        current_user: CurrentUser,
+        ids: Annotated[str, Query(description="Comma separated comic ids, in display order")],
+        w: Annotated[int, Query(ge=1, le=4096, description="Cell width in px (picks the nearest rendition)")] = 160
+):
+    """
+    One sprite sheet for a page of covers (grid pages, cover browser).
+    Returns the layout (one rectangle per comic, in order) and the URL of the sheet,
+    which replaces up to 100 separate thumbnail requests.
+    Comics the user can't see, or without a cover yet, are left out ("missing").
+    Plain def: building a sheet decodes up to 100 covers, so it runs in the threadpool.
+    """
+    try:
+        requested = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma separated integers")
+
+    if not requested:
+        raise HTTPException(status_code=400, detail="No comic ids given")
+    if len(requested) > SPRITE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {SPRITE_MAX_ITEMS} comics per sprite")
+
+    width = pick_rendition_width(w, get_thumbnail_widths())
+
+    # 1. One query for the whole page (same access rules as the cover browser)
+    query = db.query(Comic.id, Comic.cover_hash, Comic.thumbnail_path) \
+        .select_from(Comic).join(Volume).join(Series) \
+        .filter(Comic.id.in_(requested))
+    query = filter_by_user_access(query, current_user)
+    age_filter = get_series_age_restriction(current_user)
+    if age_filter is not None:
+        query = query.filter(age_filter)
+
+    rows = {r.id: r for r in query.all()}
+
+    # 2. Resolve files (the rendition, else the base thumbnail scaled into the cell)
+    covers = []
+    for comic_id in requested:
+        row = rows.get(comic_id)
+        path = None
+        if row:
+            path = (resolve_cover_path(comic_id, row.cover_hash, row.thumbnail_path, width)
+                    or resolve_cover_path(comic_id, row.cover_hash, row.thumbnail_path))
+        covers.append((comic_id, path))
+
+    # 3. Cached sheet, keyed by ids + width + cover mtimes (identical misses share one build)
+    key = sprite_cache.make_key(covers, width)
+    layout = sprite_cache.get_or_build(key, covers, width)
+
+    return {
+        "sprite_url": f"/api/comics/covers/sprite/{key}.webp",
+        **layout
+    }
+
+
+@router.get("/covers/sprite/{key}.webp", name="cover_sprite_image")
+async def get_cover_sprite_image(key: str, current_user: CurrentUser):
+    """Sprite sheet image. Keys are content-derived, so it can be cached forever."""
+    path = sprite_cache.image_path(key) if SPRITE_KEY_RE.match(key) else None
+    if not path or not path.exists():
+        raise HTTPException(status_code=404, detail="Sprite not found")
+
+    return FileResponse(path, media_type="image/webp",
+                        headers={"Cache-Control": "private, max-age=31536000, immutable"})
+
+
 @router.get("/covers/manifest", name="cover_manifest")
 async def get_cover_manifest(
         db: SessionDep,
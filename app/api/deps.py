@@ -148,6 +148,23 @@ async def get_current_user_optional(
     return user
 
 
+async def get_token_subject_optional(
+        token: Annotated[Optional[str], Depends(get_token_optional)]
+) -> Optional[str]:
+    """
+    Username from a valid token, without loading the user (no DB query).
+    For per-user bookkeeping on hot paths (e.g. prefetch limits), NOT for access control.
+    """
+    if not token:
+        return None
+
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except (JWTError, ValidationError):
+        return None
+    return payload.get("sub")
+
+
 async def get_current_active_superuser(
     current_user: Annotated[User, Depends(get_current_user)],
 ) -> User:
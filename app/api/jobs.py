@@ -41,7 +41,9 @@ async def get_active_job(db: SessionDep):
         "library_id": job.library_id,
         "library_name": determine_library_name(job.job_type, job.library),
         "started_at": job.started_at,
-        "force_scan": job.force_scan
+        "force_scan": job.force_scan,
+        # Running jobs may report {"done", "total"} (thumbnail jobs)
+        "progress": json.loads(job.result_summary).get("progress") if job.result_summary else None
     }
 
 
@@ -118,6 +120,7 @@ async def get_job_details(job_id: int, db: SessionDep, admin_user: AdminUser):
         "library_name": determine_library_name(job.job_type, job.library),
         "status": job.status,
         "force_scan": job.force_scan,
+        "scan_paths": job.scan_paths,
         "created_at": job.created_at,
         "started_at": job.started_at,
         "completed_at": job.completed_at,
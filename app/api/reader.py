@@ -1,19 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response, FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, BackgroundTasks
+from fastapi.responses import Response, FileResponse, StreamingResponse
 from sqlalchemy import func, Float, case, or_, cast
 from sqlalchemy.orm import joinedload
 from typing import List, Annotated, Optional, Literal
 from pathlib import Path
 import re
+import uuid
 import logging
 
 from app.core.comic_helpers import (get_age_rating_config, get_comic_age_restriction)
 from app.core.comic_helpers import get_format_sort_index, get_format_weight, REVERSE_NUMBERING_SERIES
-from app.api.deps import SessionDep, CurrentUser
+from app.api.deps import SessionDep, CurrentUser, get_token_subject_optional
 from app.models.comic import Comic, Volume
 from app.models.series import Series
 
-from app.services.images import ImageService
+from app.services.images import ImageService, accepts_page_format, pick_page_width, negotiate_page_format
+from app.services.archive import archive_pool
+from app.services.extraction_cache import extraction_cache
+from app.services.page_cache import page_cache
+from app.services.page_dimensions import page_dimensions_cache
+from app.services.prefetch import page_prefetcher, PREFETCH_AHEAD, PREFETCH_NEXT_COMIC_PAGES
+from app.core.responses import FileRangeResponse
 from app.models.reading_progress import ReadingProgress
 from app.models.pull_list import PullList, PullListItem
 from app.models.reading_list import ReadingList, ReadingListItem
@@ -23,6 +30,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Pages per /pages batch (raw pages are held in memory until they are sent)
+PAGE_BATCH_MAX = 10
+
 def natural_sort_key(s):
     """Sorts 'Issue 1' before 'Issue 10' and handles '10a'"""
     return [int(text) if text.isdigit() else text.lower()
@@ -32,6 +42,7 @@ def natural_sort_key(s):
 async def get_comic_reader_init(comic_id: int,
                                 db: SessionDep,
                                 current_user: CurrentUser,
+                                background_tasks: BackgroundTasks,
                                 # Context Parameters
                                 context_type: Annotated[
                                     Optional[Literal["volume", "reading_list", "pull_list", "collection", "series"]],
@@ -40,7 +51,12 @@ async def get_comic_reader_init(comic_id: int,
                                 context_id: Annotated[
                                     Optional[int],
                                     "Unique identifier for the given context"
-                                ] = None):
+                                ] = None,
+                                # Reader filters (pages are prefetched in the same variant)
+                                sharpen: Annotated[bool, Query()] = False,
+                                grayscale: Annotated[bool, Query()] = False,
+                                webp: Annotated[bool, Query()] = False,
+                                width: Annotated[Optional[int], Query(ge=1, le=8192, description="Display width in CSS px (device-sized pages)")] = None):
     """
     Get initialization data for the reader.
     OPTIMIZED: Uses tuple queries for sibling sorting instead of full object fetches.
@@ -296,6 +312,43 @@ async def get_comic_reader_init(comic_id: int,
         # GET requests shouldn't write to DB to avoid locks.
         # The Scanner update will fix this eventually.
 
+    # Deferred columns, fetched in one small tuple query
+    page_map, page_dimensions = db.query(Comic.page_map, Comic.page_dimensions).filter(Comic.id == comic.id).one()
+
+    # RAR/7z books are scanned without dimensions: read them once (in memory, no DB write), after this response
+    if page_dimensions is None:
+        page_dimensions = page_dimensions_cache.get(comic.id, str(comic.file_path))
+        if page_dimensions is None:
+            background_tasks.add_task(page_dimensions_cache.fill, comic.id, str(comic.file_path), page_map)
+
+    # Only trust dimensions that line up with the pages we serve
+    if not page_dimensions or len(page_dimensions) != page_count:
+        page_dimensions = None
+
+    # Warm-up: Extract CBR/CB7 books to the page cache while the reader UI loads
+    if extraction_cache.applies_to(comic.file_path) and extraction_cache.is_enabled():
+        background_tasks.add_task(extraction_cache.warm, comic.id, str(comic.file_path), page_map)
+
+    # Prefetch: Render the pages after the resume point (and the start of the next book) with the session's filters.
+    # Device-sized sessions (?width=) are left to the page endpoint: the rendition's format comes from the
+    # image request's Accept header, which this JSON request doesn't carry.
+    if (sharpen or grayscale or webp) and not width:
+        progress = db.query(ReadingProgress.current_page, ReadingProgress.completed).filter(
+            ReadingProgress.user_id == current_user.id, ReadingProgress.comic_id == comic.id
+        ).first()
+        start_page = progress.current_page if progress and not progress.completed else 0
+
+        page_prefetcher.schedule(current_user.username, comic.id, str(comic.file_path), page_map,
+                                 range(start_page + 1, min(start_page + 1 + PREFETCH_AHEAD, page_count)),
+                                 sharpen=sharpen, grayscale=grayscale, webp=webp)
+
+        if next_id:
+            next_comic = db.query(Comic.file_path, Comic.page_map).filter(Comic.id == next_id).first()
+            if next_comic and next_comic.file_path:
+                page_prefetcher.schedule(current_user.username, next_id, str(next_comic.file_path),
+                                         next_comic.page_map, range(PREFETCH_NEXT_COMIC_PAGES),
+                                         sharpen=sharpen, grayscale=grayscale, webp=webp)
+
     return {
         "comic_id": comic.id,
         "title": comic.title,
@@ -311,7 +364,10 @@ async def get_comic_reader_init(comic_id: int,
         "context_position": current_idx + 1 if ids else 0,
         "context_total": len(ids) if ids else 0,
         "context_type": context_type,
-        "context_label": context_label
+        "context_label": context_label,
+
+        # Per-page [width, height, is_spread] (null until the comic is rescanned / RAR/7z: until read once)
+        "page_dimensions": page_dimensions
     }
 
 
@@ -322,33 +378,241 @@ def get_comic_page(
         db: SessionDep,
         sharpen: Annotated[bool, Query()] = False,
         grayscale: Annotated[bool, Query()] = False,
-        webp: Annotated[bool, Query()] = False
+        webp: Annotated[bool, Query()] = False,
+        width: Annotated[Optional[int], Query(ge=1, le=8192, description="Display width in CSS px")] = None,
+        dpr: Annotated[float, Query(gt=0, le=4, description="Device pixel ratio for width")] = 1.0,
+        accept: Annotated[Optional[str], Header()] = None,
+        username: Optional[str] = Depends(get_token_subject_optional)
 ):
     """
     Get a specific page image.
-    OPTIMIZED: Fetches only the file_path string, not the full Comic object.
+    OPTIMIZED: Fetches only the file_path and page map, not the full Comic object.
+    The page map lets us jump straight to the page without re-listing the archive.
+    With filters on, the next pages are rendered into the page cache in the background.
+
+    ?width= (x ?dpr=) asks for a device-sized rendition: the page is downscaled to the
+    nearest PAGE_WIDTH_BUCKETS size and encoded as AVIF / WebP / JPEG, whichever the
+    Accept header allows (webp=true counts as accepting WebP). Renditions are cached.
     """
-    # 1. Fetch Path Only (Scalar Query = <1ms)
-    file_path = db.query(Comic.file_path).filter(Comic.id == comic_id).scalar()
+    # 1. Fetch Path + Page Index Only (Tuple Query = <1ms)
+    row = db.query(Comic.file_path, Comic.page_map, Comic.page_count).filter(Comic.id == comic_id).first()
 
-    if not file_path:
+    if not row or not row.file_path:
         raise HTTPException(status_code=404, detail="Comic not found")
 
-    image_service = ImageService()
-    image_bytes, is_correct_format, mime_type = image_service.get_page_image(
-        str(file_path),
-        page_index,
-        sharpen=sharpen,
-        grayscale=grayscale,
-        transcode_webp=webp
-    )
+    file_path, page_map = row.file_path, row.page_map
+
+    # Device rendition: snapped width + negotiated format (both part of the cache key)
+    max_width = pick_page_width(width, dpr) if width else None
+    output_format = negotiate_page_format(accept, prefer_webp=webp) if width else None
+
+    # Prefetch the pages after this one (queued per user, never blocks this request)
+    if username and (sharpen or grayscale or webp or width) and row.page_count:
+        page_prefetcher.schedule(username, comic_id, str(file_path), page_map,
+                                 range(page_index + 1, min(page_index + 1 + PREFETCH_AHEAD, row.page_count)),
+                                 sharpen=sharpen, grayscale=grayscale, webp=webp,
+                                 width=max_width, output_format=output_format)
+
+    # 2. ZERO-COPY PATH: Uncompressed CBZ page + no filters
+    # Stream the member's byte range straight from the .cbz instead of copying it into memory.
+    if not sharpen and not grayscale and not max_width:
+        stored_page = ImageService.get_stored_page_range(str(file_path), page_index, page_map)
+        if stored_page:
+            offset, length, mime_type = stored_page
+
+            # Same rule as get_page_image: only large, non-WebP pages (or formats the client refuses) are re-encoded
+            if not ImageService.should_transcode(length, mime_type, webp) and \
+                    accepts_page_format(accept, mime_type, prefer_webp=webp):
+                return FileRangeResponse(
+                    str(file_path),
+                    offset,
+                    length,
+                    media_type=mime_type,
+                    headers=_page_headers(page_index, mime_type, webp, is_correct_format=True)
+                )
+
+    # 3. PROCESSED PAGE CACHE: Filtered / transcoded output of an earlier request
+    # Skips the decode, resize, filter and re-encode when a book is re-read or opened on another device.
+    use_page_cache = (sharpen or grayscale or webp or max_width) and page_cache.is_enabled()
+    if use_page_cache:
+        variant = page_cache.variant(sharpen, grayscale, webp, max_width, output_format)
+        cached = page_cache.get(comic_id, str(file_path), page_index, variant)
+        if cached and accepts_page_format(accept, cached[1], prefer_webp=webp):
+            cached_path, mime_type = cached
+            return FileResponse(
+                cached_path,
+                media_type=mime_type,
+                headers=_page_headers(page_index, mime_type, webp, is_correct_format=True)
+            )
+
+    # Reuse open archive handles while a reader flips through the same book
+    image_service = ImageService(archive_pool=archive_pool)
+    image_bytes = None
+
+    # 4. EXTRACTION CACHE (Opt-in): CBR/CB7 pages served from plain files
+    if extraction_cache.applies_to(file_path) and extraction_cache.is_enabled():
+        cached_page = extraction_cache.get_page(comic_id, str(file_path), page_index, page_map)
+        if cached_page:
+            mime_type = ImageService.guess_page_mime_type(cached_page.name)
+
+            if not sharpen and not grayscale and not max_width and \
+                    not ImageService.should_transcode(cached_page.stat().st_size, mime_type, webp) and \
+                    accepts_page_format(accept, mime_type, prefer_webp=webp):
+                return FileResponse(
+                    cached_page,
+                    media_type=mime_type,
+                    headers=_page_headers(page_index, mime_type, webp, is_correct_format=True)
+                )
+
+            image_bytes, is_correct_format, mime_type, transformed = image_service.process_page_bytes(
+                cached_page.read_bytes(),
+                cached_page.name,
+                sharpen=sharpen,
+                grayscale=grayscale,
+                transcode_webp=webp,
+                max_width=max_width,
+                output_format=output_format,
+                accept=accept
+            )
+
+    # 5. Standard path: Read from the archive
+    if image_bytes is None:
+        image_bytes, is_correct_format, mime_type, transformed = image_service.get_page_image(
+            str(file_path),
+            page_index,
+            sharpen=sharpen,
+            grayscale=grayscale,
+            transcode_webp=webp,
+            page_map=page_map,
+            max_width=max_width,
+            output_format=output_format,
+            accept=accept
+        )
 
     if not image_bytes:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    # 3. Construct Headers
+    # Only re-encoded output is cached: passed-through pages (nothing to do, or failed processing)
+    # are just a copy of the archive
+    if use_page_cache and transformed:
+        page_cache.put(comic_id, str(file_path), page_index, variant, image_bytes, mime_type)
+
+    return Response(
+        content=image_bytes,
+        media_type=mime_type,
+        headers=_page_headers(page_index, mime_type, webp, is_correct_format)
+    )
+
+
+@router.get("/{comic_id}/pages", name="comic_pages")
+def get_comic_pages(
+        comic_id: int,
+        db: SessionDep,
+        current_user: CurrentUser,
+        start: Annotated[int, Query(ge=0)] = 0,
+        count: Annotated[int, Query(ge=1, le=PAGE_BATCH_MAX)] = 4,
+        sharpen: Annotated[bool, Query()] = False,
+        grayscale: Annotated[bool, Query()] = False,
+        webp: Annotated[bool, Query()] = False,
+        width: Annotated[Optional[int], Query(ge=1, le=8192)] = None,
+        dpr: Annotated[float, Query(gt=0, le=4)] = 1.0,
+        accept: Annotated[Optional[str], Header()] = None
+):
+    """
+    Several consecutive pages in one multipart/mixed response (reader prefetch).
+    Same filters / ?width= renditions as the single page endpoint, and the same page cache.
+
+    OPTIMIZED: One DB lookup and one archive open for the whole batch.
+    Each part has Content-Type, Content-Length and X-Page-Index headers; pages past the
+    end of the book are left out.
+    """
+    # 1. One query: path + page map, restricted to the user's libraries and age rating
+    query = db.query(Comic.file_path, Comic.page_map, Comic.page_count) \
+        .join(Volume).join(Series).filter(Comic.id == comic_id)
+    if not current_user.is_superuser:
+        query = query.filter(Series.library_id.in_([lib.id for lib in current_user.accessible_libraries]))
+        age_filter = get_comic_age_restriction(current_user)
+        if age_filter is not None:
+            query = query.filter(age_filter)
+    row = query.first()
+
+    if not row or not row.file_path:
+        raise HTTPException(status_code=404, detail="Comic not found")
+
+    file_path, page_map = str(row.file_path), row.page_map
+    end = start + count
+    if row.page_count:
+        end = min(end, row.page_count)
+    indices = list(range(start, end))
+
+    max_width = pick_page_width(width, dpr) if width else None
+    output_format = negotiate_page_format(accept, prefer_webp=webp) if width else None
+    options = dict(sharpen=sharpen, grayscale=grayscale, transcode_webp=webp,
+                   max_width=max_width, output_format=output_format, accept=accept)
+
+    # 2. Processed page cache
+    use_page_cache = (sharpen or grayscale or webp or max_width) and page_cache.is_enabled()
+    variant = page_cache.variant(sharpen, grayscale, webp, max_width, output_format)
+    cached = {}
+    if use_page_cache:
+        for index in indices:
+            hit = page_cache.get(comic_id, file_path, index, variant)
+            if hit and accepts_page_format(accept, hit[1], prefer_webp=webp):
+                cached[index] = hit
+
+    # 3. Raw pages for the rest: extraction cache (opt-in), then one pass over the archive
+    image_service = ImageService(archive_pool=archive_pool)
+    missing = [index for index in indices if index not in cached]
+    raw = {}
+
+    if missing and extraction_cache.applies_to(file_path) and extraction_cache.is_enabled():
+        for index in missing:
+            cached_page = extraction_cache.get_page(comic_id, file_path, index, page_map)
+            if cached_page:
+                raw[index] = (cached_page.read_bytes(), cached_page.name)
+
+    missing = [index for index in missing if index not in raw]
+    if missing:
+        try:
+            raw.update(image_service.read_pages(file_path, missing, page_map))
+        except Exception as e:
+            logger.error(f"Batch read of comic {comic_id} failed: {e}")
+
+    if not cached and not raw:
+        raise HTTPException(status_code=404, detail="Pages not found")
+
+    boundary = uuid.uuid4().hex
+
+    def parts():
+        # Filters run per part while streaming, so the first page goes out before the last is encoded
+        for index in indices:
+            if index in cached:
+                cached_path, mime_type = cached[index]
+                data = cached_path.read_bytes()
+            elif index in raw:
+                data, _, mime_type, transformed = image_service.process_page_bytes(*raw.pop(index), **options)
+                if use_page_cache and transformed:
+                    page_cache.put(comic_id, file_path, index, variant, data, mime_type)
+            else:
+                continue
+
+            yield (f"--{boundary}\r\nContent-Type: {mime_type}\r\nContent-Length: {len(data)}\r\n"
+                   f"X-Page-Index: {index}\r\n\r\n").encode() + data + b"\r\n"
+
+        yield f"--{boundary}--\r\n".encode()
+
+    headers = {"Vary": "Accept"} if max_width else None
+    return StreamingResponse(parts(), media_type=f"multipart/mixed; boundary={boundary}", headers=headers)
+
+
+def _page_headers(page_index: int, mime_type: str, webp: bool, is_correct_format: bool) -> dict:
+    """
+    Build filename + cache headers for a served page.
+    Vary: Accept on every page: formats the client refuses are re-encoded, and ?width= renditions
+    are negotiated, so shared caches must key on it.
+    """
     # We use the returned mime_type to determine the correct extension for the browser
-    extension = "webp" if mime_type == "image/webp" else "jpg"
+    extension = {"image/webp": "webp", "image/avif": "avif"}.get(mime_type, "jpg")
 
     # Check if the original detected type was PNG/GIF for the filename if we didn't transcode
     if not webp and mime_type == "image/png": extension = "png"
@@ -368,8 +632,6 @@ def get_comic_page(
         # for a URL like "?grayscale=true"
         headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
 
-    return Response(
-        content=image_bytes,
-        media_type=mime_type,
-        headers=headers
-    )
+    headers["Vary"] = "Accept"
+
+    return headers
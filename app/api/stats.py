@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy import func, case, desc
 from typing import Annotated
+import os
 
 from app.api.deps import SessionDep, AdminUser
 from app.models.comic import Comic, Volume
@@ -9,6 +10,13 @@ from app.models.library import Library
 from app.models.tags import Genre, comic_genres
 from app.models.user import User
 from app.models.reading_progress import ReadingProgress
+from app.services.archive import archive_pool
+from app.services.extraction_cache import extraction_cache
+from app.services.page_cache import page_cache
+from app.services.page_dimensions import page_dimensions_cache
+from app.services.prefetch import page_prefetcher
+from app.services.ondemand_thumbnails import ondemand_thumbnails
+from app.services.thumbnail_cache import thumbnail_cache
 
 router = APIRouter()
 
@@ -90,4 +98,21 @@ async def get_genre_stats(db: SessionDep, user: AdminUser):
             "size_bytes": row.total_bytes or 0
         }
         for row in stats
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/cache", name="cache")
+async def get_cache_stats(admin: AdminUser):
+    """
+    Hit/miss counters for the in-process reader caches.
+    NOTE: Each Uvicorn worker has its own caches, so this reports the worker that served the request.
+    """
+    return {
+        "worker_pid": os.getpid(),
+        "archive_pool": archive_pool.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "page_dimensions": page_dimensions_cache.stats(),
+        "prefetch": page_prefetcher.stats(),
+        "ondemand_thumbnails": ondemand_thumbnails.stats(),
+        "thumbnail_cache": thumbnail_cache.stats()
+    }
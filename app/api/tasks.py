@@ -17,6 +17,7 @@ async def run_cleanup_task(
     """
     Trigger database garbage collection.
     Removes tags, people, and collections that have no associated comics.
+    Also migrates flat cover files into the sharded cover store and prunes unused covers.
     """
     # Offload to Job Queue
     result = scan_manager.add_cleanup_task()
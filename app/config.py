@@ -34,6 +34,10 @@ class Settings(BaseSettings):
     thumbnail_size: tuple[float, float] = (320, 455)
     avatar_size: tuple[float, float] = (400, 400)  # standard avatar box
 
+    # Open archive handle pool (per worker process) used by the reader
+    archive_pool_size: int = 16
+    archive_pool_idle_seconds: int = 300
+
     # Supported formats
     supported_extensions: list = [".cbz", ".cbr"]
 
@@ -0,0 +1,56 @@
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from typing import Mapping, Optional
+
+
+class FileRangeResponse(Response):
+    """
+    Serves a byte range of a file on disk (e.g. a STORED member inside a .cbz).
+    The body is streamed in small chunks straight from the file, so the page
+    never has to be materialized as one large Python bytes object.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+            self,
+            path: str,
+            offset: int,
+            length: int,
+            status_code: int = 200,
+            headers: Optional[Mapping[str, str]] = None,
+            media_type: Optional[str] = None,
+            background: Optional[BackgroundTask] = None,
+    ):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.init_headers(headers)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if scope.get("method", "GET").upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.offset)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        # File shrank underneath us. Content-Length is already sent, so finishing
+                        # the body cleanly would hand the client a silently truncated page:
+                        # raise instead, and the server aborts the connection.
+                        raise OSError(f"{self.path} ended {remaining} bytes short of the promised range")
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+        if self.background is not None:
+            await self.background()
@@ -27,6 +27,9 @@ from app.services.scheduler import scheduler_service
 from app.models.user import User
 
 from app.services.watcher import library_watcher
+from app.services.image_pool import image_worker_pool
+from app.services.ondemand_thumbnails import ondemand_thumbnails
+from app.services.prefetch import page_prefetcher
 
 # API Routes
 from app.api import libraries, comics, reader, progress, series, volumes, search
@@ -116,6 +119,11 @@ async def lifespan(app: FastAPI):
     # --- SHUTDOWN ---
     logger.info(f"Worker {worker_pid} shutting down...")
 
+    # Image workers are started lazily by whichever process ran image jobs
+    image_worker_pool.shutdown()
+    ondemand_thumbnails.shutdown()
+    page_prefetcher.shutdown()
+
     if is_manager:
         logger.info(f"Worker {worker_pid} is Manager, also stopping services...")
         library_watcher.stop()
@@ -8,6 +8,7 @@ from app.models.reading_list import ReadingList, ReadingListItem
 from app.models.collection import Collection, CollectionItem
 from app.models.reading_progress import ReadingProgress
 from app.models.job import ScanJob
+from app.models.scan_directory import ScanDirectory
 from app.models.user import User
 from app.models.interactions import UserSeries
 from app.models.saved_search import SavedSearch
@@ -23,7 +24,7 @@ __all__ = [
     'ReadingList', 'ReadingListItem',
     'Collection', 'CollectionItem',
     'ReadingProgress',
-    'ScanJob',
+    'ScanJob', 'ScanDirectory',
     'User',
     'UserSeries',
     'SavedSearch', 'SmartList',
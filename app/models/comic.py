@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Float, JSON, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime, timezone
 from app.database import Base
 
@@ -33,8 +33,23 @@ class Comic(Base):
     file_modified_at = Column(Float)
     file_size = Column(Integer)
     thumbnail_path = Column(String, nullable=True)  # Path to cached thumbnail
+
+    # CoverStore key (hash of the base thumbnail). Shared by comics with identical covers.
+    cover_hash = Column(String, nullable=True, index=True)
     page_count = Column(Integer, default=0)
 
+    # Persistent page index built at scan time (sorted page names + CBZ member offsets).
+    # Deferred: it can be large and only the page endpoint needs it.
+    page_map = deferred(Column(JSON(none_as_null=True), nullable=True))
+
+    # Per-page [width, height, is_spread] read from image headers at scan time.
+    # Lets the reader lay out spreads without fetching pages. Deferred like page_map.
+    page_dimensions = deferred(Column(JSON(none_as_null=True), nullable=True))
+
+    # Content fingerprint (size + head/tail/central directory hash).
+    # Lets the scanner recognise moved/renamed files and keep their history.
+    fingerprint = Column(String, nullable=True, index=True)
+
     # Basic metadata
     number = Column(String)
     title = Column(String)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 import enum
@@ -28,6 +28,10 @@ class ScanJob(Base):
     status = Column(String, default=JobStatus.PENDING, index=True)
     force_scan = Column(Boolean, default=False)
 
+    # Optional scope for SCAN jobs: list of file/folder paths (from watcher events).
+    # NULL = walk the whole library.
+    scan_paths = Column(JSON(none_as_null=True), nullable=True)
+
     # Timestamps
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     started_at = Column(DateTime, nullable=True)
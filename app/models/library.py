@@ -18,4 +18,5 @@ class Library(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     # Relationships - use string reference to avoid circular import
-    series = relationship("Series", back_populates="library", cascade="all, delete-orphan")
\ No newline at end of file
+    series = relationship("Series", back_populates="library", cascade="all, delete-orphan")
+    scan_directories = relationship("ScanDirectory", back_populates="library", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class ScanDirectory(Base):
+    """
+    Directory index from the last successful scan.
+    Lets the scanner skip listing folders whose mtime hasn't changed.
+    """
+    __tablename__ = "scan_directories"
+
+    __table_args__ = (
+        UniqueConstraint('library_id', 'path', name='uq_scan_directory_library_path'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    library_id = Column(Integer, ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    path = Column(String, nullable=False)
+
+    # Directory mtime when it was last listed (NULL = must be re-listed, e.g. a file in it failed)
+    mtime = Column(Float, nullable=True)
+
+    # Number of comic files directly inside this directory
+    file_count = Column(Integer, default=0)
+
+    library = relationship("Library", back_populates="scan_directories")
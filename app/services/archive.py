@@ -1,10 +1,18 @@
+import hashlib
 import logging
+import os
+import struct
+import threading
+import time
 import zipfile
+import zlib
 import rarfile
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 import io
 import re
+from collections import OrderedDict
+from contextlib import contextmanager
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -23,6 +31,160 @@ except ImportError:
     CB7_SUPPORT = False
     logger.warning("Warning: py7zr not installed. CB7 support disabled.")
 
+# Bump when the layout of the stored page map changes so stale maps are ignored
+PAGE_MAP_VERSION = 1
+
+# ZIP local file header: signature, version, flags, method, time, date, crc, csize, usize, name len, extra len
+_ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+def zip_member_data_offset(fp, header_offset: int) -> Optional[int]:
+    """
+    Resolve where a ZIP member's data starts, given its local header offset.
+    The local header has its own name/extra lengths, so we must read it rather
+    than trust the central directory.
+    """
+    fp.seek(header_offset)
+    header = fp.read(_ZIP_LOCAL_HEADER.size)
+    if len(header) != _ZIP_LOCAL_HEADER.size:
+        return None
+
+    fields = _ZIP_LOCAL_HEADER.unpack(header)
+    if fields[0] != _ZIP_LOCAL_SIGNATURE:
+        return None
+
+    name_length, extra_length = fields[9], fields[10]
+    return header_offset + _ZIP_LOCAL_HEADER.size + name_length + extra_length
+
+
+def read_indexed_zip_member(filepath: Path, entry: List[Any]) -> Optional[bytes]:
+    """
+    Read a single page straight out of a CBZ using a page map entry
+    ([name, header_offset, compress_size, compress_type, file_size]).
+    Skips opening the archive and parsing the central directory entirely.
+
+    Returns None if the entry can't be served this way (caller falls back to ComicArchive).
+    """
+    if len(entry) < 5:
+        return None
+
+    _, header_offset, compress_size, compress_type, file_size = entry
+
+    if compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        return None
+
+    with open(filepath, "rb") as fp:
+        data_offset = zip_member_data_offset(fp, header_offset)
+        if data_offset is None:
+            return None
+
+        fp.seek(data_offset)
+        data = fp.read(compress_size)
+
+    if compress_type == zipfile.ZIP_DEFLATED:
+        # Raw deflate stream (no zlib header)
+        data = zlib.decompress(data, -zlib.MAX_WBITS)
+
+    # Sanity check: a mismatch means the map no longer describes this file
+    if len(data) != file_size:
+        return None
+
+    return data
+
+
+def locate_stored_zip_member(filepath: Path, entry: List[Any]) -> Optional[Tuple[int, int]]:
+    """
+    For an uncompressed (ZIP_STORED) page map entry, return (data_offset, length)
+    so the bytes can be served straight from the .cbz file.
+    Returns None for deflated members, CBR/CB7 entries or a mismatched header.
+    """
+    if len(entry) < 5:
+        return None
+
+    _, header_offset, compress_size, compress_type, file_size = entry
+
+    if compress_type != zipfile.ZIP_STORED or compress_size != file_size:
+        return None
+
+    with open(filepath, "rb") as fp:
+        data_offset = zip_member_data_offset(fp, header_offset)
+
+    if data_offset is None:
+        return None
+
+    return data_offset, file_size
+
+
+# Fingerprint: size + head/tail chunks + ZIP central directory
+FINGERPRINT_CHUNK_SIZE = 64 * 1024
+# Central directories beyond this are skipped (head/tail + size are still hashed)
+_MAX_CENTRAL_DIRECTORY_SIZE = 8 * 1024 * 1024
+
+# ZIP end of central directory record: signature, disk, cd disk, entries here, entries total, cd size, cd offset, comment len
+_ZIP_END_RECORD = struct.Struct("<4s4H2LH")
+_ZIP_END_SIGNATURE = b"PK\x05\x06"
+
+
+def _read_zip_central_directory(fp, file_size: int) -> Optional[bytes]:
+    """Locate and return the raw ZIP central directory (None for non-ZIP or ZIP64 files)"""
+    # The end record sits in the last 22 bytes + up to 64KB of archive comment
+    tail_size = min(file_size, _ZIP_END_RECORD.size + 0xFFFF)
+    fp.seek(file_size - tail_size)
+    tail = fp.read(tail_size)
+
+    pos = tail.rfind(_ZIP_END_SIGNATURE)
+    if pos < 0 or len(tail) - pos < _ZIP_END_RECORD.size:
+        return None
+
+    fields = _ZIP_END_RECORD.unpack(tail[pos:pos + _ZIP_END_RECORD.size])
+    cd_size, cd_offset = fields[5], fields[6]
+
+    # ZIP64 markers / corrupt values
+    if cd_offset == 0xFFFFFFFF or cd_size > _MAX_CENTRAL_DIRECTORY_SIZE or cd_offset + cd_size > file_size:
+        return None
+
+    fp.seek(cd_offset)
+    return fp.read(cd_size)
+
+
+def compute_fingerprint(filepath: Path) -> str:
+    """
+    Cheap content fingerprint used to recognise a comic that was moved or renamed.
+    Hashes the size, the first and last 64KB and (for CBZ) the central directory,
+    which lists every member's CRC. Reads ~128KB instead of the whole file.
+
+    Format: "<size>:<blake2b hex>"
+    """
+    file_size = os.path.getsize(filepath)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(file_size).encode())
+
+    with open(filepath, "rb") as fp:
+        digest.update(fp.read(FINGERPRINT_CHUNK_SIZE))
+
+        if file_size > FINGERPRINT_CHUNK_SIZE:
+            fp.seek(max(file_size - FINGERPRINT_CHUNK_SIZE, FINGERPRINT_CHUNK_SIZE))
+            digest.update(fp.read(FINGERPRINT_CHUNK_SIZE))
+
+        if Path(filepath).suffix.lower() == ".cbz":
+            central_directory = _read_zip_central_directory(fp, file_size)
+            if central_directory:
+                digest.update(central_directory)
+
+    return f"{file_size}:{digest.hexdigest()}"
+
+
+def is_page_map_current(filepath: Path, page_map: Optional[Dict]) -> bool:
+    """Check that a stored page map still describes the file on disk"""
+    if not page_map or page_map.get("version") != PAGE_MAP_VERSION:
+        return False
+    try:
+        return page_map.get("mtime") == os.path.getmtime(filepath)
+    except OSError:
+        return False
+
+
 class ComicArchive:
     """Unified interface for CBZ, CBR, and CB7 archives"""
 
@@ -44,6 +206,14 @@ class ComicArchive:
         else:
             raise ValueError(f"Unsupported format: {self.extension}")
 
+    @property
+    def supports_partial_reads(self) -> bool:
+        """
+        True if a member's first bytes can be read on their own (ZIP).
+        RAR reads spawn one unrar process per member, 7z decompresses the whole solid block.
+        """
+        return self.extension == ".cbz"
+
     def get_file_list(self) -> List[str]:
         """Get list of files in archive"""
         if self.extension == ".cbz":
@@ -121,6 +291,38 @@ class ComicArchive:
 
         return pages
 
+    def get_page_map(self, pages: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Build a persistent page index for this archive.
+        Stores the sorted page names so readers can skip get_pages() entirely,
+        and for CBZ the location of each member so a page can be read without
+        opening the archive at all.
+
+        Layout (kept compact, this is stored per comic):
+            {"version": 1, "mtime": float, "pages": [[name, offset, csize, method, size], [name], ...]}
+
+        Pass 'pages' if get_pages() was already called to avoid sorting twice.
+        """
+        if pages is None:
+            pages = self.get_pages()
+        entries = []
+
+        for name in pages:
+            if self.extension == ".cbz":
+                info = self.archive.getinfo(name)
+                # Encrypted members (flag bit 0) can't be read directly
+                if not info.flag_bits & 0x1:
+                    entries.append([name, info.header_offset, info.compress_size,
+                                    info.compress_type, info.file_size])
+                    continue
+            entries.append([name])
+
+        return {
+            "version": PAGE_MAP_VERSION,
+            "mtime": os.path.getmtime(self.filepath),
+            "pages": entries
+        }
+
     def read_file(self, filename: str) -> bytes:
         """Read a specific file from the archive"""
         if self.extension == ".cbz":
@@ -128,7 +330,49 @@ class ComicArchive:
         elif self.extension == ".cbr":
             return self.archive.read(filename)
         elif self.extension == ".cb7":
-            return self.archive.read([filename])[filename].read()
+            data = self.archive.read([filename])[filename].read()
+            # py7zr consumes the stream on read; rewind so the handle can be reused
+            self.archive.reset()
+            return data
+
+    def iter_files(self, filenames: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """
+        Read several files in one pass, yielding (name, bytes) in the given order.
+        For CB7 this decompresses the solid block once instead of once per file.
+        """
+        if self.extension == ".cb7":
+            data = self.archive.read(filenames)
+            self.archive.reset()
+            for name in filenames:
+                yield name, data[name].read()
+            return
+
+        for name in filenames:
+            yield name, self.read_file(name)
+
+    def extract_all(self, path: Path) -> None:
+        """
+        Extract every member under 'path' in one pass.
+        CBR: a single unrar process (read_file starts one per member). CB7: one pass over the solid block.
+        """
+        self.archive.extractall(path)
+        if self.extension == ".cb7":
+            self.archive.reset()
+
+    def iter_file_heads(self, filenames: List[str], size: int) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yield (name, first `size` bytes) for each file without reading whole members.
+        ZIP/RAR streams stop decompressing after `size` bytes; CB7 has no partial
+        reads, so whole files are returned (one solid pass).
+        Only cheap for ZIP (see supports_partial_reads).
+        """
+        if self.extension == ".cb7":
+            yield from self.iter_files(filenames)
+            return
+
+        for name in filenames:
+            with self.archive.open(name) as stream:
+                yield name, stream.read(size)
 
     def get_comicinfo(self) -> Optional[bytes]:
         """Extract ComicInfo.xml if it exists"""
@@ -147,4 +391,166 @@ class ComicArchive:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
\ No newline at end of file
+        self.close()
+
+
+class _PooledArchive:
+    """An open ComicArchive plus the bookkeeping the pool needs"""
+
+    __slots__ = ("archive", "lock", "last_used", "in_use", "evicted")
+
+    def __init__(self, archive: ComicArchive):
+        self.archive = archive
+        # Readers of the same book take turns (rarfile/py7zr handles are not thread-safe)
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.evicted = False
+
+
+class ArchivePool:
+    """
+    Process-local LRU pool of open archive handles.
+    Keeps recently read comics open so a reader flipping pages doesn't pay
+    for an open + central directory parse + close on every request.
+
+    Keyed by (path, mtime) so a replaced file is never served from a stale handle.
+    Thread-safe: FastAPI runs sync endpoints in a threadpool.
+
+    Idle handles are closed after idle_timeout by a daemon timer that only runs while
+    something is open, so a reader who stops doesn't leave files (or unrar/7z state) open.
+    """
+
+    def __init__(self, max_open: int = 16, idle_timeout: float = 300):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+
+        self._entries: "OrderedDict[tuple, _PooledArchive]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Timer] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def open(self, filepath: Path):
+        """
+        Borrow an open ComicArchive for 'filepath'.
+        Usage mirrors the plain context manager: `with pool.open(path) as archive: ...`
+        """
+        key = (str(filepath), os.path.getmtime(filepath))
+
+        with self._lock:
+            self._evict_idle_locked()
+            entry = self._entries.get(key)
+            if entry:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                entry.in_use += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            # Open outside the pool lock, this is the expensive part
+            archive = ComicArchive(filepath)
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry:
+                    # Another thread opened it while we were busy; use theirs
+                    archive.close()
+                else:
+                    entry = _PooledArchive(archive)
+                    self._drop_other_versions_locked(key)
+                    self._entries[key] = entry
+                    self._evict_overflow_locked()
+                entry.in_use += 1
+
+        try:
+            with entry.lock:
+                yield entry.archive
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+                if entry.evicted and entry.in_use == 0:
+                    self._close_entry(entry)
+                self._schedule_sweep_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the pool (per worker process)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "open": len(self._entries),
+                "max_open": self.max_open,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def close_all(self):
+        """Close every idle handle (busy ones close when released)"""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict_locked(key)
+            if self._sweeper is not None:
+                self._sweeper.cancel()
+                self._sweeper = None
+
+    def _sweep(self):
+        """Timer callback: close idle handles, and check again while any are left"""
+        with self._lock:
+            self._sweeper = None
+            self._evict_idle_locked()
+            self._schedule_sweep_locked()
+
+    # --- Internal helpers (caller holds self._lock) ---
+
+    def _evict_locked(self, key):
+        entry = self._entries.pop(key)
+        entry.evicted = True
+        self.evictions += 1
+        if entry.in_use == 0:
+            self._close_entry(entry)
+
+    def _evict_idle_locked(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in [k for k, e in self._entries.items() if e.in_use == 0 and e.last_used < cutoff]:
+            self._evict_locked(key)
+
+    def _schedule_sweep_locked(self):
+        if self._sweeper is None and self._entries:
+            # When the oldest idle handle expires (handles in use: a full timeout from now)
+            now = time.monotonic()
+            due = min((e.last_used + self.idle_timeout for e in self._entries.values() if e.in_use == 0),
+                      default=now + self.idle_timeout)
+            self._sweeper = threading.Timer(max(due - now, 0.01), self._sweep)
+            self._sweeper.daemon = True
+            self._sweeper.start()
+
+    def _evict_overflow_locked(self):
+        # Oldest first; handles in use still count toward the cap but close on release
+        while len(self._entries) > self.max_open:
+            self._evict_locked(next(iter(self._entries)))
+
+    def _drop_other_versions_locked(self, key):
+        path = key[0]
+        for other in [k for k in self._entries if k[0] == path and k != key]:
+            self._evict_locked(other)
+
+    @staticmethod
+    def _close_entry(entry: _PooledArchive):
+        try:
+            entry.archive.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled archive: {e}")
+
+
+# Global instance (one per worker process)
+archive_pool = ArchivePool(
+    max_open=settings.archive_pool_size,
+    idle_timeout=settings.archive_pool_idle_seconds
+)
@@ -0,0 +1,128 @@
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+def chunked(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def insert_ignore(db: Session, table, rows: List[Dict]) -> None:
+    """
+    One executemany INSERT ... ON CONFLICT DO NOTHING.
+    Rows already present (unique constraint / primary key) are silently skipped.
+    """
+    if rows:
+        db.execute(sqlite_insert(table).on_conflict_do_nothing(), rows)
+
+
+def ensure_names(db: Session, model, names: Iterable[str], name_ids: Dict[str, int]) -> None:
+    """
+    Make sure every name exists in a `name`-unique lookup table (Person, Character...).
+    Inserts the missing ones in one statement and adds their ids to `name_ids` in place.
+    """
+    missing = [name for name in dict.fromkeys(names) if name not in name_ids]
+    if not missing:
+        return
+
+    insert_ignore(db, model.__table__, [{"name": name} for name in missing])
+
+    for chunk in chunked(missing):
+        name_ids.update(db.query(model.name, model.id).filter(model.name.in_(chunk)).all())
+
+
+def delete_for_comics(db: Session, table, comic_ids: List[int]) -> None:
+    """Bulk delete association rows for the given comics, in chunks"""
+    for chunk in chunked(comic_ids):
+        db.execute(table.delete().where(table.c.comic_id.in_(chunk)))
+
+
+class AdaptiveCommitBatcher:
+    """
+    Decides when a write batch should be committed, by time rather than a fixed item count.
+
+    SQLite holds the write lock from the first write of a transaction until commit, so a
+    batch is committed once it has been open for `budget_ms`. On top of that, the batch size
+    adapts (AIMD): it shrinks when a batch overran the budget or the commit itself was slow
+    (i.e. we waited on another writer / a checkpoint), and grows slowly while batches are cheap.
+    """
+
+    def __init__(self, budget_ms: int = 200, initial_size: int = 50, min_size: int = 1, max_size: int = 500):
+        self.budget = budget_ms / 1000
+        self.size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self.pending = 0
+        self._opened_at: Optional[float] = None
+
+        self.commit_latencies: List[float] = []
+        self.max_held = 0.0
+        self.contended = 0
+
+    def add(self, count: int = 1) -> None:
+        """Record written items; the first one opens the batch clock"""
+        if self._opened_at is None:
+            self._opened_at = time.perf_counter()
+        self.pending += count
+
+    def held(self) -> float:
+        """Seconds since the first write of the current batch"""
+        return time.perf_counter() - self._opened_at if self._opened_at is not None else 0.0
+
+    def should_commit(self) -> bool:
+        return self.pending > 0 and (self.pending >= self.size or self.held() >= self.budget)
+
+    def commit(self, db, before: Optional[Callable[[], None]] = None) -> None:
+        """Run any deferred writes, commit, and adapt the batch size to what it cost"""
+        if before:
+            before()
+
+        started = time.perf_counter()
+        db.commit()
+        latency = time.perf_counter() - started
+
+        held = self.held()
+        self.commit_latencies.append(latency)
+        self.max_held = max(self.max_held, held)
+
+        if latency > self.budget / 2:
+            # The commit waited (lock contention or a slow fsync): back off hard
+            self.contended += 1
+            self.size = max(self.min_size, self.size // 2)
+        elif held > self.budget:
+            self.size = max(self.min_size, int(self.size * 0.75))
+        elif self.pending >= self.size:
+            self.size = min(self.max_size, self.size + max(1, self.size // 10))
+
+        self.pending = 0
+        self._opened_at = None
+
+    def discard(self) -> None:
+        """The batch was rolled back (its commit failed): treat it as contention and start over"""
+        self.contended += 1
+        self.size = max(self.min_size, self.size // 2)
+        self.pending = 0
+        self._opened_at = None
+
+    def stats(self) -> Dict:
+        """Per-batch commit latency summary (milliseconds) for job results"""
+        latencies = sorted(self.commit_latencies)
+        if not latencies:
+            return {"batches": 0}
+
+        return {
+            "batches": len(latencies),
+            "commit_ms_avg": round(sum(latencies) / len(latencies) * 1000, 1),
+            "commit_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            "commit_ms_max": round(latencies[-1] * 1000, 1),
+            "held_ms_max": round(self.max_held * 1000, 1),
+            "contended": self.contended,
+            "final_batch_size": self.size,
+        }
@@ -1,8 +1,9 @@
 import logging
 from sqlalchemy.orm import Session
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 from app.models import Collection, CollectionItem, Comic
+from app.services.bulk import insert_ignore, delete_for_comics
 
 class CollectionService:
     def __init__(self, db: Session):
@@ -10,6 +11,11 @@ class CollectionService:
         self.collection_cache: Dict[str, Collection] = {}
         self.logger = logging.getLogger(__name__)
 
+        # Bulk ingest state (see preload / queue_comic_collection / flush_queued)
+        self.collection_ids: Dict[str, int] = {}
+        self.pending_items: List[Dict] = []
+        self.pending_replace: List[int] = []
+
     def get_or_create_collection(self, name: str) -> Collection:
         name = name.strip()
 
@@ -60,4 +66,38 @@ class CollectionService:
         for col in empty_collections:
             self.db.delete(col)
             if col.name in self.collection_cache:
-                del self.collection_cache[col.name]
\ No newline at end of file
+                del self.collection_cache[col.name]
+            self.collection_ids.pop(col.name, None)
+
+    # --- Bulk ingest (scanner) ---
+
+    def preload(self):
+        """Load every collection name -> id once per scan"""
+        self.collection_ids = dict(self.db.query(Collection.name, Collection.id).all())
+
+    def queue_comic_collection(self, comic_id: int, series_group: Optional[str], replace: bool = False):
+        """Queue the collection membership of one comic; nothing is written until flush_queued()"""
+        if replace:
+            self.pending_replace.append(comic_id)
+
+        if not series_group or not series_group.strip():
+            return
+
+        name = series_group.strip()
+        if name not in self.collection_ids:
+            self.collection_ids[name] = self.get_or_create_collection(name).id
+
+        self.pending_items.append({"collection_id": self.collection_ids[name], "comic_id": comic_id})
+
+    def flush_queued(self):
+        if self.pending_replace:
+            delete_for_comics(self.db, CollectionItem.__table__, self.pending_replace)
+            self.pending_replace = []
+
+        insert_ignore(self.db, CollectionItem.__table__, self.pending_items)
+        self.pending_items = []
+
+    def discard_queued(self):
+        """Drop queued rows without writing them (after a failed flush was rolled back)"""
+        self.pending_items = []
+        self.pending_replace = []
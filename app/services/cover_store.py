@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.services.images import rendition_path
+
+# <root>/<ab>/<cd>/<hash>.webp (+ <hash>_w<width>.webp renditions next to it)
+HASH_DIGEST_SIZE = 16
+COVER_SUFFIX = ".webp"
+
+# Files younger than this are never pruned: a thumbnail job may have written them
+# but not committed the comic rows pointing at them yet.
+PRUNE_GRACE_SECONDS = 3600
+
+LEGACY_COVER_RE = re.compile(r"^comic_(\d+)(?:_w(\d+))?\.webp$")
+STORED_COVER_RE = re.compile(r"^([0-9a-f]{32})(?:_w(\d+))?\.webp$")
+
+
+class CoverStore:
+    """
+    Content-addressed cover thumbnails.
+
+    The key is a hash of the base (320px) WebP bytes, so byte-identical covers (variants,
+    reprints, duplicate files) share one set of files. Files are sharded by hash prefix so
+    no directory grows past a few hundred entries, even with 300k comics.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or settings.cover_dir)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=HASH_DIGEST_SIZE).hexdigest()
+
+    def path_for(self, cover_hash: str, width: Optional[int] = None) -> Path:
+        """Base thumbnail path for a hash, or one of its renditions"""
+        path = self.root / cover_hash[:2] / cover_hash[2:4] / f"{cover_hash}{COVER_SUFFIX}"
+        return rendition_path(path, width) if width else path
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """Temp file + rename: readers never see a half-written cover"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def put(self, renditions: Dict[int, bytes], base_width: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Store encoded renditions ({width: webp bytes}, must include the base width).
+        Files that already exist are not rewritten.
+
+        Returns: (cover_hash, deduplicated) - deduplicated is True if the base file was already stored
+        """
+        base_width = int(base_width or settings.thumbnail_size[0])
+        cover_hash = self.hash_bytes(renditions[base_width])
+
+        base_path = self.path_for(cover_hash)
+        deduplicated = base_path.exists()
+
+        for width, data in renditions.items():
+            path = self.path_for(cover_hash, width)
+            if not path.exists():
+                self._write_atomic(path, data)
+
+        return cover_hash, deduplicated
+
+    def adopt(self, legacy_files: Dict[int, Path], expected_hash: Optional[str] = None,
+              base_width: Optional[int] = None) -> Optional[str]:
+        """
+        Move an existing flat set of files ({width: path}) into the store, under the hash of the base file.
+        expected_hash: The comic's current cover_hash, if any; files whose content doesn't match it are stale.
+        Files already stored (another comic with the same cover) are simply removed.
+        Returns None (and moves nothing) when there is no base file to hash, or it doesn't match expected_hash.
+        """
+        base = legacy_files.get(int(base_width or settings.thumbnail_size[0]))
+        if not base:
+            return None
+
+        cover_hash = self.hash_bytes(base.read_bytes())
+        if expected_hash and cover_hash != expected_hash:
+            return None
+
+        for width, path in legacy_files.items():
+            target = self.path_for(cover_hash, width)
+            if target.exists():
+                path.unlink(missing_ok=True)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, target)
+
+        return cover_hash
+
+    def iter_legacy_files(self) -> Iterator[Tuple[int, int, Path]]:
+        """(comic_id, width, path) for every flat comic_<id>[_w<width>].webp in the root"""
+        base_width = int(settings.thumbnail_size[0])
+        if not self.root.is_dir():
+            return
+
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                match = LEGACY_COVER_RE.match(entry.name)
+                if match and entry.is_file():
+                    width = int(match.group(2)) if match.group(2) else base_width
+                    yield int(match.group(1)), width, Path(entry.path)
+
+    def iter_stored_files(self) -> Iterator[Tuple[str, os.DirEntry]]:
+        """(cover_hash, entry) for every file in the sharded tree"""
+        if not self.root.is_dir():
+            return
+
+        for level1 in os.scandir(self.root):
+            if not (level1.is_dir() and len(level1.name) == 2):
+                continue
+            for level2 in os.scandir(level1.path):
+                if not level2.is_dir():
+                    continue
+                for entry in os.scandir(level2.path):
+                    match = STORED_COVER_RE.match(entry.name)
+                    if match:
+                        yield match.group(1), entry
+
+    def prune(self, referenced: set, grace_seconds: int = PRUNE_GRACE_SECONDS) -> int:
+        """Delete stored covers whose hash no comic references. Returns the number of files removed."""
+        cutoff = time.time() - grace_seconds
+        removed = 0
+
+        for cover_hash, entry in self.iter_stored_files():
+            if cover_hash in referenced:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+
+# Global instance
+cover_store = CoverStore()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from app.models import Person, ComicCredit, Comic
+from app.services.bulk import insert_ignore, ensure_names, delete_for_comics
 
 class CreditService:
     """Service for managing comic credits with Caching"""
@@ -19,6 +20,11 @@ class CreditService:
         self.db = db
         self.person_cache: Dict[str, Person] = {}
 
+        # Bulk ingest state (see preload / queue_comic_credits / flush_queued)
+        self.person_ids: Dict[str, int] = {}
+        self.pending_credits: List[Tuple[int, str, str]] = []
+        self.pending_replace: List[int] = []
+
     def get_or_create_person(self, name: str) -> Person:
         name = name.strip()
         if not name:
@@ -64,4 +70,41 @@ class CreditService:
                         self.db.add(credit)
                         # No flush needed here, the objects just sit in session until batch commit
 
-        # REMOVED self.db.commit() - Scanner handles this
\ No newline at end of file
+        # REMOVED self.db.commit() - Scanner handles this
+
+    # --- Bulk ingest (scanner) ---
+
+    def preload(self):
+        """Load every person name -> id once per scan"""
+        self.person_ids = dict(self.db.query(Person.name, Person.id).all())
+
+    def queue_comic_credits(self, comic_id: int, metadata: Dict, replace: bool = False):
+        """Queue the credits of one comic; nothing is written until flush_queued()"""
+        if replace:
+            self.pending_replace.append(comic_id)
+
+        for metadata_field, role in self.ROLE_MAPPING.items():
+            for name in self.parse_credit_field(metadata.get(metadata_field)):
+                self.pending_credits.append((comic_id, name, role))
+
+    def flush_queued(self):
+        """Write queued credits with one executemany (duplicates ignored by the unique constraint)"""
+        if self.pending_replace:
+            delete_for_comics(self.db, ComicCredit.__table__, self.pending_replace)
+            self.pending_replace = []
+
+        if not self.pending_credits:
+            return
+
+        ensure_names(self.db, Person, (name for _, name, _ in self.pending_credits), self.person_ids)
+
+        insert_ignore(self.db, ComicCredit.__table__, [
+            {"comic_id": comic_id, "person_id": self.person_ids[name], "role": role}
+            for comic_id, name, role in self.pending_credits
+        ])
+        self.pending_credits = []
+
+    def discard_queued(self):
+        """Drop queued rows without writing them (after a failed flush was rolled back)"""
+        self.pending_credits = []
+        self.pending_replace = []
@@ -0,0 +1,316 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+import portalocker
+
+from app.config import settings
+from app.core.settings_loader import get_cached_setting
+from app.services.archive import ComicArchive, is_page_map_current
+
+logger = logging.getLogger(__name__)
+
+# Only formats where reading a single member is expensive benefit from this.
+# (rarfile shells out to unrar per read, py7zr decompresses the whole solid block)
+EXTRACTABLE_EXTENSIONS = {".cbr", ".cb7"}
+
+# Written last: an entry without it is incomplete and ignored
+_COMPLETE_MARKER = ".complete"
+_TMP_PREFIX = ".tmp_"
+_LOCK_PREFIX = ".lock_"
+_RAW_DIR = ".raw"  # Archive contents inside a temp dir, before pages are renamed into order
+
+
+class ExtractionCache:
+    """
+    Opt-in on-disk cache of fully extracted CBR/CB7 archives.
+
+    The first page request (or the read-init warm-up) extracts the whole book once
+    into 'comic_{id}_{mtime}/00000.jpg, 00001.jpg, ...'. Later pages are plain files.
+
+    Shared by all Uvicorn workers through the filesystem:
+    - Entries are built in a temp dir and renamed into place (atomic).
+    - A per-entry lock file ('.lock_comic_{id}_{mtime}') makes other workers wait for a
+      running extraction instead of extracting the same book again. Eviction removes it only
+      while holding it, and lockers re-open it if it was replaced while they waited.
+    - Directory mtime is the LRU clock (touched on every hit).
+    - Size cap is enforced after each extraction by evicting the oldest entries.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+        # Per-entry locks so concurrent requests in one worker extract only once.
+        # Refcounted ([lock, users]): dropped when the last user leaves, so the map stays small.
+        self._locks: Dict[str, list] = {}
+        self._locks_guard = threading.Lock()
+
+        # Counters (per worker process)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.extractions = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(get_cached_setting("system.extraction_cache_enabled", False))
+
+    @staticmethod
+    def applies_to(file_path) -> bool:
+        return Path(str(file_path)).suffix.lower() in EXTRACTABLE_EXTENSIONS
+
+    @staticmethod
+    def max_bytes() -> int:
+        return int(get_cached_setting("system.extraction_cache_size_mb", 2048)) * 1024 * 1024
+
+    def get_page(self, comic_id: int, file_path: str, page_index: int,
+                 page_map: Optional[Dict] = None) -> Optional[Path]:
+        """
+        Return the cached file for a page, extracting the archive on a miss.
+        Returns None if the page can't be served from the cache (caller falls back to the archive).
+        """
+        try:
+            entry_dir = self._entry_dir(comic_id, file_path)
+            pages = self._list_pages(entry_dir)
+
+            if pages is None:
+                self._count("misses")
+                if not self.extract(comic_id, file_path, page_map):
+                    return None
+                pages = self._list_pages(entry_dir)
+                if pages is None:
+                    return None
+            else:
+                self._count("hits")
+                self._touch(entry_dir)
+
+            if page_index < 0 or page_index >= len(pages):
+                return None
+
+            return pages[page_index]
+
+        except Exception as e:
+            logger.error(f"Extraction cache lookup failed for comic {comic_id}: {e}")
+            return None
+
+    def warm(self, comic_id: int, file_path: str, page_map: Optional[Dict] = None) -> None:
+        """Background warm-up (read-init): extract the book before the first page request"""
+        if not self.is_enabled() or not self.applies_to(file_path):
+            return
+        try:
+            if self._list_pages(self._entry_dir(comic_id, file_path)) is None:
+                self.extract(comic_id, file_path, page_map)
+        except Exception as e:
+            logger.error(f"Extraction cache warm-up failed for comic {comic_id}: {e}")
+
+    def extract(self, comic_id: int, file_path: str, page_map: Optional[Dict] = None) -> bool:
+        """Extract every page of the archive into the cache. Returns True if the entry is ready."""
+        file_path = Path(file_path)
+        entry_dir = self._entry_dir(comic_id, file_path)
+
+        # Thread lock (this worker), then a file lock (other workers): each book is extracted once
+        with self._entry_lock(entry_dir.name), self._entry_file_lock(entry_dir.name):
+            # Another thread/worker may have finished while we waited
+            if (entry_dir / _COMPLETE_MARKER).exists():
+                return True
+
+            tmp_dir = self.root / f"{_TMP_PREFIX}{entry_dir.name}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+            raw_dir = tmp_dir / _RAW_DIR
+
+            try:
+                tmp_dir.mkdir(parents=True)
+
+                with ComicArchive(file_path) as archive:
+                    # Reuse the scan-time page order if it still matches the file
+                    if is_page_map_current(file_path, page_map):
+                        names = [entry[0] for entry in page_map["pages"]]
+                    else:
+                        names = archive.get_pages()
+
+                    # One pass over the archive (one unrar process), not one read per page
+                    archive.extract_all(raw_dir)
+
+                # Zero-padded index keeps pages sortable; suffix keeps the mime type
+                raw_root = raw_dir.resolve()
+                for index, name in enumerate(names):
+                    source = (raw_dir / name).resolve()
+                    if raw_root not in source.parents:
+                        raise ValueError(f"Unsafe member path: {name}")
+                    os.rename(source, tmp_dir / f"{index:05d}{Path(name).suffix.lower()}")
+
+                shutil.rmtree(raw_dir)
+                (tmp_dir / _COMPLETE_MARKER).touch()
+
+                # Drop entries for older versions of this file
+                for old_dir in self.root.glob(f"comic_{comic_id}_*"):
+                    if old_dir != entry_dir:
+                        shutil.rmtree(old_dir, ignore_errors=True)
+
+                try:
+                    os.rename(tmp_dir, entry_dir)
+                    self._count("extractions")
+                    logger.debug(f"Extracted {len(names)} pages of {file_path.name} into cache")
+                except OSError:
+                    # Entry appeared anyway; theirs is just as good
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            except Exception as e:
+                logger.error(f"Failed to extract {file_path.name} into cache: {e}")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return False
+
+        self._enforce_size_limit(keep=entry_dir)
+        return (entry_dir / _COMPLETE_MARKER).exists()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters (this worker) + current disk usage (all workers)"""
+        entries = self._scan_entries()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.is_enabled(),
+                "entries": len(entries),
+                "size_bytes": sum(size for _, _, size in entries),
+                "max_bytes": self.max_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "extractions": self.extractions,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # --- Internal helpers ---
+
+    def _entry_dir(self, comic_id: int, file_path) -> Path:
+        # mtime in the key: a replaced file never serves stale pages
+        mtime_ms = int(os.path.getmtime(file_path) * 1000)
+        return self.root / f"comic_{comic_id}_{mtime_ms}"
+
+    @staticmethod
+    def _list_pages(entry_dir: Path) -> Optional[List[Path]]:
+        if not (entry_dir / _COMPLETE_MARKER).exists():
+            return None
+        return sorted(p for p in entry_dir.iterdir() if p.name != _COMPLETE_MARKER)
+
+    @staticmethod
+    def _touch(entry_dir: Path) -> None:
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+
+    @contextmanager
+    def _entry_lock(self, key: str):
+        with self._locks_guard:
+            slot = self._locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del self._locks[key]
+
+    @contextmanager
+    def _entry_file_lock(self, key: str, blocking: bool = True):
+        """
+        Cross-process lock per entry (lock files live next to the entries).
+        Non-blocking: raises portalocker.LockException if another worker holds it.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        lock_path = self.root / f"{_LOCK_PREFIX}{key}"
+        flags = portalocker.LOCK_EX if blocking else portalocker.LOCK_EX | portalocker.LOCK_NB
+
+        while True:
+            lock_file = open(lock_path, "a")
+            try:
+                portalocker.lock(lock_file, flags)
+                # Evicted (unlinked) while we waited: lock the current file instead
+                try:
+                    current = os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    break
+                portalocker.unlock(lock_file)
+            except BaseException:
+                lock_file.close()
+                raise
+            lock_file.close()
+
+        try:
+            yield lock_path
+        finally:
+            portalocker.unlock(lock_file)
+            lock_file.close()
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _scan_entries(self) -> List[tuple]:
+        """(last_used, path, size) for every complete entry"""
+        entries = []
+        if not self.root.exists():
+            return entries
+
+        for entry_dir in self.root.iterdir():
+            if not entry_dir.is_dir() or entry_dir.name.startswith(_TMP_PREFIX):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry_dir.iterdir())
+                entries.append((entry_dir.stat().st_mtime, entry_dir, size))
+            except OSError:
+                # Evicted by another worker while we were looking
+                continue
+        return entries
+
+    def _enforce_size_limit(self, keep: Path) -> None:
+        """Evict least recently used entries until the cache fits the configured size"""
+        limit = self.max_bytes()
+        entries = sorted(self._scan_entries(), key=lambda e: e[0])
+        total = sum(size for _, _, size in entries)
+
+        for _, entry_dir, size in entries:
+            if total <= limit:
+                break
+            if entry_dir == keep:
+                continue
+            # Under the entry's lock, so the lock file is never removed from under a worker using it
+            try:
+                with self._entry_file_lock(entry_dir.name, blocking=False) as lock_path:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    lock_path.unlink(missing_ok=True)
+            except portalocker.LockException:
+                continue  # Being (re-)extracted right now
+            total -= size
+            self._count("evictions")
+            self._count("evicted_bytes", size)
+
+        # Leftovers from workers that died mid-extraction
+        stale_cutoff = time.time() - 3600
+        for tmp_dir in self.root.glob(f"{_TMP_PREFIX}*"):
+            try:
+                if tmp_dir.stat().st_mtime < stale_cutoff:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+            except OSError:
+                continue
+
+
+# Global instance (counters are per worker, the cache itself is shared on disk)
+extraction_cache = ExtractionCache(settings.cache_dir / "extracted")
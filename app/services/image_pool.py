@@ -0,0 +1,164 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from app.core.settings_loader import get_cached_setting
+
+logger = logging.getLogger(__name__)
+
+# Recycle a worker after this many covers (bounds Pillow/libwebp memory growth)
+IMAGE_WORKER_MAX_TASKS = 500
+
+# Tasks queued per worker; callers block beyond that instead of pickling a whole library up front
+IMAGE_QUEUE_DEPTH = 4
+
+
+def configured_image_workers() -> int:
+    """
+    Pool size from settings: all allowed image workers when parallel image processing is on
+    (system.parallel_image_workers, 0 = Auto / 50% of cores), else 1.
+    """
+    if not get_cached_setting("system.parallel_image_processing", False):
+        return 1
+
+    requested_workers = int(get_cached_setting("system.parallel_image_workers", 0))
+    max_cores = multiprocessing.cpu_count() or 1
+
+    if requested_workers <= 0:
+        # AUTO MODE:
+        # Use 50% of cores, with a minimum of 1.
+        # This prevents system starvation when multiple web workers are active.
+        return max(1, max_cores // 2)
+
+    return min(requested_workers, max_cores)
+
+
+class _TaskFailed:
+    """Marks an exception raised in a worker (workers normally return error dicts instead)"""
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ImageWorkerPool:
+    """
+    Process-local, lazily started pool for image work (thumbnails, covers streamed by scans).
+
+    Started on first use and kept for the life of the process, so a one-series regeneration
+    doesn't pay for forking workers and importing Pillow/NumPy again. Workers are recycled
+    every IMAGE_WORKER_MAX_TASKS tasks. If the worker settings change, the pool is rebuilt
+    the next time it is idle.
+    """
+
+    def __init__(self, max_tasks_per_child: int = IMAGE_WORKER_MAX_TASKS):
+        self.max_tasks_per_child = max_tasks_per_child
+
+        self._pool = None
+        self._workers = 0
+        self._active = 0  # Jobs currently using the pool
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.tasks = 0
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def acquire(self):
+        """
+        The pool, sized to the current settings (created / resized only while nobody uses it).
+        Every acquire() must be paired with release(); the pool isn't resized in between.
+        """
+        wanted = configured_image_workers()
+
+        with self._lock:
+            if self._pool is not None and self._workers != wanted and self._active == 0:
+                logger.info(f"Image worker count changed ({self._workers} -> {wanted}), restarting pool")
+                self._shutdown_locked()
+
+            if self._pool is None:
+                logger.info(f"Starting image worker pool with {wanted} worker(s)")
+                self._pool = multiprocessing.Pool(processes=wanted, maxtasksperchild=self.max_tasks_per_child)
+                self._workers = wanted
+                self.started += 1
+
+            self._active += 1
+            return self._pool
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def imap_unordered(self, func: Callable, tasks: Iterable, max_in_flight: Optional[int] = None,
+                       on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Any]:
+        """
+        Run func over tasks, yielding results as they finish.
+        max_in_flight: Cap on queued + running tasks (default: IMAGE_QUEUE_DEPTH per worker).
+                       1 gives serial behaviour on a shared pool.
+        on_progress: Called as (done, total) after each result.
+        """
+        tasks = list(tasks)
+        total = len(tasks)
+        if not total:
+            return
+
+        pool = self.acquire()
+        try:
+            limit = max(1, max_in_flight or self._workers * IMAGE_QUEUE_DEPTH)
+            results: "queue.Queue" = queue.Queue()
+            sent = done = 0
+
+            def next_result():
+                nonlocal done
+                item = results.get()
+                if isinstance(item, _TaskFailed):
+                    raise item.error
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+                return item
+
+            for task in tasks:
+                # Bounded queue: wait for a result before sending more
+                while sent - done >= limit:
+                    yield next_result()
+
+                pool.apply_async(func, (task,), callback=results.put,
+                                 error_callback=lambda e: results.put(_TaskFailed(e)))
+                sent += 1
+                self.tasks += 1
+
+            while done < sent:
+                yield next_result()
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._pool is not None,
+            "workers": self._workers,
+            "active_jobs": self._active,
+            "pool_starts": self.started,
+            "tasks": self.tasks,
+            "max_tasks_per_child": self.max_tasks_per_child,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the workers (app shutdown). The next use starts a fresh pool."""
+        with self._lock:
+            self._shutdown_locked()
+
+    def _shutdown_locked(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._workers = 0
+
+
+# Global instance (per process)
+image_worker_pool = ImageWorkerPool()
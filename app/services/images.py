@@ -1,92 +1,262 @@
 import logging
+import math
+import os
+import uuid
 from pathlib import Path
-from typing import Optional, Tuple, Annotated, Dict
+from typing import Optional, Tuple, Annotated, Dict, List, Iterable
 from io import BytesIO
-from PIL import Image, ImageFilter, ImageOps
-from colorthief import ColorThief
+from PIL import Image, ImageFilter, ImageOps, features
 
 
-from app.services.archive import ComicArchive
+from app.services.archive import (ComicArchive, ArchivePool, is_page_map_current, read_indexed_zip_member,
+                                  locate_stored_zip_member)
 from app.config import settings
+from app.services.palette import get_palette, palette_to_dict
+
+# Enough for JPEG/PNG/WebP/GIF headers in practice (JPEG SOF comes after APPn segments)
+PROBE_HEADER_BYTES = 32 * 1024
+
+# Thumbnail renditions are clamped to this range (px wide)
+MIN_RENDITION_WIDTH = 64
+MAX_RENDITION_WIDTH = 1280
+
+
+def parse_thumbnail_widths(value, base_width: int) -> List[int]:
+    """
+    "160,320,640" -> [160, 320, 640]. Invalid entries are ignored, values are clamped,
+    and the base width (settings.thumbnail_size) is always included: it is the rendition
+    stored in Comic.thumbnail_path and served when no width is asked for.
+    """
+    widths = {int(base_width)}
+    for part in str(value or "").split(","):
+        try:
+            width = int(part.strip())
+        except ValueError:
+            continue
+        widths.add(max(MIN_RENDITION_WIDTH, min(MAX_RENDITION_WIDTH, width)))
+    return sorted(widths)
+
+
+def get_thumbnail_widths() -> List[int]:
+    """Configured rendition widths (system.thumbnail_widths)"""
+    from app.core.settings_loader import get_cached_setting
+
+    return parse_thumbnail_widths(get_cached_setting("system.thumbnail_widths", ""),
+                                  int(settings.thumbnail_size[0]))
+
+
+def pick_rendition_width(requested: int, widths: List[int]) -> int:
+    """Smallest rendition at least as wide as requested (never upscale), else the largest"""
+    for width in widths:
+        if width >= requested:
+            return width
+    return widths[-1]
+
+
+def rendition_path(thumbnail_path: Path, width: int) -> Path:
+    """comic_12.webp -> comic_12_w640.webp. The base width keeps the plain name."""
+    if width == int(settings.thumbnail_size[0]):
+        return thumbnail_path
+    return thumbnail_path.with_name(f"{thumbnail_path.stem}_w{width}{thumbnail_path.suffix}")
+
+
+# Reader page renditions (?width=): requests snap up to one of these, so each page has a
+# handful of cached sizes instead of one per device. The largest is the legacy WebP cap.
+PAGE_WIDTH_BUCKETS = (480, 720, 1080, 1440, 1920, 2560)
+
+# Encoder per negotiated page format: (Pillow format, mime type, save options)
+PAGE_FORMATS = {
+    "avif": ("AVIF", "image/avif", {"quality": 60, "speed": 8}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 85, "progressive": True}),
+}
+
+
+def pick_page_width(width: int, dpr: float = 1.0) -> int:
+    """Device width x pixel ratio, snapped up to the nearest bucket (capped at the largest)"""
+    target = int(math.ceil(width * max(dpr, 0.1)))
+    for bucket in PAGE_WIDTH_BUCKETS:
+        if bucket >= target:
+            return bucket
+    return PAGE_WIDTH_BUCKETS[-1]
+
+
+def _accepted_types(accept: Optional[str]) -> set:
+    """Media types of an Accept header, minus the ones refused with q=0"""
+    accepted = set()
+    for part in (accept or "").lower().split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        if any(p.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000") for p in params):
+            continue
+        accepted.add(media_type)
+    return accepted
+
+
+def accepts_page_format(accept: Optional[str], mime_type: str, prefer_webp: bool = False) -> bool:
+    """
+    Can a page be served in this format as-is? No Accept header (or a wildcard) allows anything.
+    prefer_webp: webp=true counts as accepting WebP (see negotiate_page_format).
+    """
+    if not accept or (prefer_webp and mime_type == "image/webp"):
+        return True
+    accepted = _accepted_types(accept)
+    return bool(accepted & {"*/*", "image/*", mime_type})
+
+
+def negotiate_page_format(accept: Optional[str], prefer_webp: bool = False) -> str:
+    """
+    Best page format the client accepts: AVIF (if this Pillow can encode it), then WebP, else JPEG.
+    prefer_webp: The client asked for webp=true explicitly (fetch() sends a bare */*).
+    """
+    accepted = _accepted_types(accept)
+
+    if "image/avif" in accepted and features.check("avif"):
+        return "avif"
+    if "image/webp" in accepted or prefer_webp:
+        return "webp"
+    return "jpeg"
 
 
 class ImageService:
     """Service for extracting and processing comic images"""
 
-    def __init__(self):
+    def __init__(self, archive_pool: Optional[ArchivePool] = None):
         self.thumbnail_size: tuple[float, float] = settings.thumbnail_size
         self.avatar_size: tuple[float, float] = settings.avatar_size
 
-    def process_cover(self, comic_path: str, thumbnail_path: Path) -> dict:
+        # Optional: Reuse open archive handles across requests (reader only).
+        # Batch jobs touch each comic once, so they open/close directly.
+        self.archive_pool = archive_pool
+
+        # Decode JPEG covers at 1/2, 1/4 or 1/8 scale when the target is small enough
+        # (turned off only to benchmark against full decoding)
+        self.reduced_decoding = True
+
+    def _open_cover(self, cover_bytes: bytes, target_size: Tuple[float, float]) -> Image.Image:
+        """
+        Open cover bytes for downscaling.
+        JPEG: draft() makes libjpeg decode straight to the smallest DCT scale that is still
+        >= target_size, so a 2000x3000 cover is decoded at ~500x750 instead of full size.
+        Other formats ignore draft() and decode normally.
+        """
+        img = Image.open(BytesIO(cover_bytes))
+        if self.reduced_decoding:
+            img.draft('RGB', (int(target_size[0]), int(target_size[1])))
+        return img
+
+    def rendition_size(self, width: int) -> Tuple[int, int]:
+        """Bounding box for a rendition: same aspect ratio as the base thumbnail box"""
+        base_width, base_height = self.thumbnail_size
+        return int(width), int(round(width * base_height / base_width))
+
+    def _encode_renditions(self, img: Image.Image, widths: Iterable[int]) -> Dict[int, bytes]:
+        """
+        Encode one WebP per width from a single decoded image.
+        Largest first, each one downscaled (in place) from the previous, so the full-size
+        decode is only resampled once.
+        """
+        renditions = {}
+        for width in sorted(set(widths), reverse=True):
+            img.thumbnail(self.rendition_size(width), Image.Resampling.LANCZOS)
+            output = BytesIO()
+            img.save(output, format='WEBP', quality=85)
+            renditions[width] = output.getvalue()
+        return renditions
+
+    def _open_archive(self, file_path: Path):
+        """Open an archive, borrowing from the pool when one is configured"""
+        if self.archive_pool:
+            return self.archive_pool.open(file_path)
+        return ComicArchive(file_path)
+
+    def render_cover(self, comic_path: str, widths: Optional[List[int]] = None) -> dict:
         """
         Optimized Workflow:
         1. Open Archive (Expensive I/O) -> Extract Cover
-        2. Calculate Colors (CPU) using a small resized copy
-        3. Resize & Save Thumbnail (CPU/Disk) using the original high-res data
+        2. Calculate Colors + Encode Thumbnail renditions (see render_cover_bytes)
 
-        Returns: { "success": bool, "palette": dict }
+        Returns: { "success": bool, "palette": dict, "renditions": {width: webp bytes} }
         """
-        result = {"success": False, "palette": None}
-
         try:
             # 1. Get Raw Bytes (Reuse existing logic, force raw)
             # This handles the archive opening and file detection
-            cover_bytes, success, _ = self.get_page_image(comic_path, 0, transcode_webp=False)
+            cover_bytes, success, _, _ = self.get_page_image(comic_path, 0, transcode_webp=False)
 
             if not success or not cover_bytes:
-                return result
+                return {"success": False, "palette": None, "renditions": {}}
 
-            # 2. Load into Pillow
-            img = Image.open(BytesIO(cover_bytes))
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            return self.render_cover_bytes(cover_bytes, widths)
 
-            # 3. Extract Colors (Run ColorThief on a small copy)
-            # Optimization: Resizing to 150px makes ColorThief 10x faster with 99% accuracy
-            small_img = img.copy()
-            small_img.thumbnail((150, 150))
+        except Exception as e:
+            print(f"Error processing cover for {Path(comic_path).name}: {e}")
+            return {"success": False, "palette": None, "renditions": {}}
 
-            # ColorThief needs a file-like object
-            small_bytes = BytesIO()
-            small_img.save(small_bytes, format='JPEG')
+    def render_cover_bytes(self, cover_bytes: bytes, widths: Optional[List[int]] = None) -> dict:
+        """
+        Palette + thumbnail renditions from raw cover bytes (no archive access, e.g. the scanner
+        already read them).
+        1. Calculate Colors (CPU) using a small resized copy
+        2. Resize & Encode Thumbnail renditions (CPU) using the original high-res data
 
-            color_thief = ColorThief(small_bytes)
-            # Get 5 colors
-            raw_palette = color_thief.get_palette(color_count=5, quality=10)
+        widths: Rendition widths to encode. The base thumbnail width is always included.
+        All of them come from the same decode.
 
-            def rgb_to_hex(rgb):
-                return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
+        Returns: { "success": bool, "palette": dict, "renditions": {width: webp bytes} }
+        """
+        result = {"success": False, "palette": None, "renditions": {}}
 
-            result['palette'] = {
-                'primary': rgb_to_hex(raw_palette[0]),
-                'secondary': rgb_to_hex(raw_palette[1]),
-                'accent1': rgb_to_hex(raw_palette[2]),
-                'accent2': rgb_to_hex(raw_palette[3]) if len(raw_palette) > 3 else None,
-                'accent3': rgb_to_hex(raw_palette[4]) if len(raw_palette) > 4 else None
-            }
+        try:
+            widths = set(widths or []) | {int(self.thumbnail_size[0])}
 
-            # 4. Generate Thumbnail (Resize the original high-res img)
-            # We do this LAST so we don't accidentally use the tiny 150px image
-            width, height = self.thumbnail_size
-            img.thumbnail((width, height), Image.Resampling.LANCZOS)
+            # 1. Load into Pillow (reduced-scale decode: the largest rendition is the target)
+            img = self._open_cover(cover_bytes, self.rendition_size(max(widths)))
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            # 2. Extract Colors (vectorized median cut on a 150px copy, no re-encode)
+            result['palette'] = palette_to_dict(get_palette(img, color_count=5, quality=10))
 
-            # Save
-            thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(thumbnail_path, format='WEBP', quality=85)
+            # 3. Generate Thumbnails (Resize the decoded img, still >= every rendition)
+            result['renditions'] = self._encode_renditions(img, widths)
 
             result['success'] = True
             return result
 
         except Exception as e:
-            print(f"Error processing cover for {Path(comic_path).name}: {e}")
+            print(f"Error processing cover: {e}")
             return result
 
+    def process_cover(self, comic_path: str, thumbnail_path: Path, widths: Optional[List[int]] = None) -> dict:
+        """
+        render_cover, written to thumbnail_path (+ rendition_path() for other widths).
+        Library thumbnails go through the CoverStore instead; this is the plain-file variant.
+
+        Returns: { "success": bool, "palette": dict }
+        """
+        result = self.render_cover(comic_path, widths)
+        renditions = result.pop('renditions')
+
+        try:
+            for width, data in renditions.items():
+                path = rendition_path(thumbnail_path, width)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+        except Exception as e:
+            print(f"Error saving cover for {Path(comic_path).name}: {e}")
+            result['success'] = False
+
+        return result
+
 
     def get_page_image(self, comic_path: str, page_index: int,
                        sharpen: bool = False,
                        grayscale: bool = False,
-                       transcode_webp: bool = False
-                       ) -> Tuple[Optional[bytes], bool, str]:
+                       transcode_webp: bool = False,
+                       page_map: Optional[Dict] = None,
+                       max_width: Optional[int] = None,
+                       output_format: Optional[str] = None,
+                       accept: Optional[str] = None
+                       ) -> Tuple[Optional[bytes], bool, str, bool]:
         """
         Extract a specific page from a comic archive, optionally applying filters.
 
@@ -96,94 +266,305 @@ class ImageService:
             sharpen: Whether to sharpen the image
             grayscale: Whether to apply grayscale filters
             transcode_webp: Whether to convert the output to WebP (if large)
+            page_map: Stored page index (Comic.page_map). Skips listing/sorting the archive when current.
+            max_width: Device rendition: downscale to this width (see process_page_bytes)
+            output_format: Device rendition format (a PAGE_FORMATS key)
+            accept: Client's Accept header; pages in a format it refuses are re-encoded
 
         Returns:
-            (bytes, success, mimetype)
+            (bytes, success, mimetype, transformed) - see process_page_bytes
         """
         try:
             file_path = Path(comic_path)
 
             if not file_path.exists():
                 print(f"Comic file not found: {comic_path}")
-                return None, False, "application/octet-stream"
+                return None, False, "application/octet-stream", False
 
-            with ComicArchive(file_path) as archive:
+            image_bytes, page_name = self._read_page_bytes(file_path, page_index, page_map)
+
+            if image_bytes is None:
+                return None, False, "application/octet-stream", False
+
+            return self.process_page_bytes(image_bytes, page_name,
+                                           sharpen=sharpen,
+                                           grayscale=grayscale,
+                                           transcode_webp=transcode_webp,
+                                           max_width=max_width,
+                                           output_format=output_format,
+                                           accept=accept)
+
+        except Exception as e:
+            print(f"Error extracting page {page_index}: {e}")
+            return None, False, "application/octet-stream", False
+
+    def process_page_bytes(self, image_bytes: bytes, page_name: str,
+                           sharpen: bool = False,
+                           grayscale: bool = False,
+                           transcode_webp: bool = False,
+                           max_width: Optional[int] = None,
+                           output_format: Optional[str] = None,
+                           accept: Optional[str] = None
+                           ) -> Tuple[Optional[bytes], bool, str, bool]:
+        """
+        Apply reader filters / transcoding to raw page bytes.
+        Split from get_page_image so pages that didn't come from an archive
+        (e.g. the extraction cache) go through the exact same pipeline.
+
+        Device renditions (max_width + output_format): the page is downscaled to max_width
+        and encoded in output_format. Pages that already fit and are small are passed through.
+
+        accept: The client's Accept header. A page in a format it refuses (e.g. WebP for a
+        JPEG-only client) is never passed through: it is re-encoded (JPEG, or output_format).
+
+        Returns:
+            (bytes, success, mimetype, transformed)
+            transformed: False when the original bytes are passed through (nothing worth caching)
+        """
+        mime_type = self.guess_page_mime_type(page_name)
+        needs_transcode = self.should_transcode(len(image_bytes), mime_type, transcode_webp)
+        refused = not accepts_page_format(accept, mime_type, prefer_webp=transcode_webp)
 
-                pages = archive.get_pages()
+        # FAST PATH: If no processing needed, return raw bytes
+        if not sharpen and not grayscale and not needs_transcode and not max_width and not refused:
+            return image_bytes, True, mime_type, False
 
-                if page_index < 0 or page_index >= len(pages):
-                    print(f"Page index {page_index} out of range (0-{len(pages) - 1})")
-                    return None, False, "application/octet-stream"
+        # SLOW PATH: Pillow Processing
+        try:
+            img = Image.open(BytesIO(image_bytes))
+
+            # 1. Device rendition: Only decode / re-encode what the screen can show
+            if max_width:
+                if not sharpen and not grayscale and img.width <= max_width and not refused and \
+                        not self.should_transcode(len(image_bytes), mime_type, True):
+                    return image_bytes, True, mime_type, False
+
+                if img.width > max_width:
+                    size = (max_width, max(1, round(img.height * max_width / img.width)))
+                    # Reduced-scale decode for JPEG (no-op for other formats)
+                    img.draft('RGB', size)
+                    img = img.resize(size, Image.Resampling.LANCZOS)
+
+            # Convert to RGB (Strip Alpha/Palette if transcoding to optimize size)
+            # For WebP, RGBA is fine, but for Grayscale we need L.
+            if img.mode not in ('RGB', 'L', 'RGBA'):
+                img = img.convert('RGB')
 
-                # Extract Raw Bytes
-                image_bytes = archive.read_file(pages[page_index])
-                original_size = len(image_bytes)
+            # 2. OPTIMIZATION: Resize Huge Images
+            # If we are transcoding for bandwidth/speed, we shouldn't serve 4000px images.
+            # 2560px is more than enough for iPad Pros/Tablets.
+            if transcode_webp and not max_width:
+                max_dimension = 2560
+                if img.width > max_dimension or img.height > max_dimension:
+                    img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+            # A. Apply Grayscale
+            if grayscale:
+                img = ImageOps.grayscale(img)
+
+            # B. Apply Sharpening (UnsharpMask is best for scans)
+            if sharpen:
+                img = img.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+
+            # 4. Save / Transcode
+            output = BytesIO()
+
+            if max_width:
+                pil_format, out_mime, options = PAGE_FORMATS[output_format or "jpeg"]
+                if img.mode == 'RGBA' and pil_format == 'JPEG':
+                    img = img.convert('RGB')
+                elif img.mode == 'L' and pil_format == 'AVIF':
+                    img = img.convert('RGB')
+                img.save(output, format=pil_format, **options)
+                return output.getvalue(), True, out_mime, True
+
+            webp_output = needs_transcode or mime_type == "image/webp"
+            if webp_output and accepts_page_format(accept, "image/webp", prefer_webp=transcode_webp):
+                # Encode fast (The biggest latency saver)
+                # quality=75: Good visual fidelity, low file size
+                # method=0: Fastest encoding speed
+                img.save(output, format="WEBP", quality=75, method=0)
+                return output.getvalue(), True, "image/webp", True
+            else:
+                # Fallback to JPEG if we just sharpened but didn't ask for WebP (or the client refuses it)
+                if img.mode == 'RGBA':
+                    img = img.convert('RGB')
+                img.save(output, format="JPEG", quality=85)
+                return output.getvalue(), True, "image/jpeg", True
 
-                # Detect original mime type based on file extension in archive
-                # (Simple heuristic is enough here, or use python-magic if you want to be strict)
-                filename = pages[page_index].lower()
-                mime_type = "image/jpeg"  # Default
-                if filename.endswith(".png"): mime_type = "image/png"
-                elif filename.endswith(".webp"): mime_type = "image/webp"
-                elif filename.endswith(".gif"): mime_type = "image/gif"
+        except Exception as e:
+            logging.error(f"Image processing failed: {e}")
+            print(f"Error processing image: {e}")
+            # CRITICAL: Return original bytes, but flag as FAILED processing
+            # so the controller knows not to cache this as the 'filtered' version.
+            return image_bytes, False, mime_type, False  # Fallback, just return original bytes
 
-                # Logic: Should we Transcode?
-                # Only if requested AND image is large (>500KB) AND not already WebP
-                needs_transcode = transcode_webp and original_size > 500_000 and mime_type != "image/webp"
+    @staticmethod
+    def should_transcode(size: int, mime_type: str, transcode_webp: bool) -> bool:
+        """
+        Logic: Should we Transcode?
+        Only if requested AND image is large (>500KB) AND not already WebP
+        """
+        return transcode_webp and size > 500_000 and mime_type != "image/webp"
+
+    @staticmethod
+    def probe_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+        """
+        Read (width, height) from the start of an image file without decoding pixels.
+        Image.open only parses the header; returns None if it isn't in these bytes.
+        """
+        try:
+            with Image.open(BytesIO(header)) as img:
+                return img.size
+        except Exception:
+            return None
+
+    def probe_page_dimensions(self, archive: ComicArchive, pages: list) -> Optional[list]:
+        """
+        Per-page [width, height, is_spread] for a whole book, from image headers only.
+        is_spread = 1 for landscape pages (double-page spreads). Unreadable pages are [0, 0, 0].
+        None for RAR/7z: header reads aren't cheap there (see read_page_dimensions).
+        """
+        if not archive.supports_partial_reads:
+            return None
 
-                # FAST PATH: If no processing needed, return raw bytes
-                if not sharpen and not grayscale and not needs_transcode:
-                    return image_bytes, True, mime_type
+        dimensions = []
+        for name, head in archive.iter_file_heads(pages, PROBE_HEADER_BYTES):
+            size = self.probe_dimensions(head)
 
-                # SLOW PATH: Pillow Processing
+            # Header pushed past the probe window (e.g. large EXIF/ICC blocks): read it all
+            if size is None and len(head) >= PROBE_HEADER_BYTES:
                 try:
-                    img = Image.open(BytesIO(image_bytes))
-
-                    # Convert to RGB (Strip Alpha/Palette if transcoding to optimize size)
-                    # For WebP, RGBA is fine, but for Grayscale we need L.
-                    if img.mode not in ('RGB', 'L', 'RGBA'):
-                        img = img.convert('RGB')
-
-                    # 2. OPTIMIZATION: Resize Huge Images
-                    # If we are transcoding for bandwidth/speed, we shouldn't serve 4000px images.
-                    # 2560px is more than enough for iPad Pros/Tablets.
-                    if transcode_webp:
-                        max_dimension = 2560
-                        if img.width > max_dimension or img.height > max_dimension:
-                            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
-
-                    # A. Apply Grayscale
-                    if grayscale:
-                        img = ImageOps.grayscale(img)
-
-                    # B. Apply Sharpening (UnsharpMask is best for scans)
-                    if sharpen:
-                        img = img.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
-
-                    # 4. Save / Transcode
-                    output = BytesIO()
-
-                    if needs_transcode or mime_type == "image/webp":
-                        # Encode fast (The biggest latency saver)
-                        # quality=75: Good visual fidelity, low file size
-                        # method=0: Fastest encoding speed
-                        img.save(output, format="WEBP", quality=75, method=0)
-                        return output.getvalue(), True, "image/webp"
-                    else:
-                        # Fallback to JPEG if we just sharpened but didn't ask for WebP
-                        img.save(output, format="JPEG", quality=85)
-                        return output.getvalue(), True, "image/jpeg"
-
-                except Exception as e:
-                    logging.error(f"Image processing failed: {e}")
-                    print(f"Error processing image: {e}")
-                    # CRITICAL: Return original bytes, but flag as FAILED processing
-                    # so the controller knows not to cache this as the 'filtered' version.
-                    return image_bytes, False, mime_type  # Fallback, just return original bytes
+                    size = self.probe_dimensions(archive.read_file(name))
+                except Exception:
+                    size = None
+
+            dimensions.append(self._dimension_entry(size))
+
+        return dimensions
+
+    def read_page_dimensions(self, comic_path: str, page_map: Optional[Dict] = None) -> Optional[list]:
+        """
+        Page dimensions for any archive. RAR/7z pages are read whole, in one pass:
+        meant for a background task when the book is opened, not for the scan.
+        """
+        file_path = Path(comic_path)
+
+        with ComicArchive(file_path) as archive:
+            if is_page_map_current(file_path, page_map):
+                names = [entry[0] for entry in page_map["pages"]]
+            else:
+                names = archive.get_pages()
+
+            if archive.supports_partial_reads:
+                return self.probe_page_dimensions(archive, names)
+
+            return [self._dimension_entry(self.probe_dimensions(data)) for _, data in archive.iter_files(names)]
+
+    @staticmethod
+    def _dimension_entry(size: Optional[Tuple[int, int]]) -> list:
+        if not size:
+            return [0, 0, 0]
+        width, height = size
+        return [width, height, 1 if width > height else 0]
+
+    @staticmethod
+    def guess_page_mime_type(page_name: str) -> str:
+        """
+        Detect original mime type based on file extension in archive
+        (Simple heuristic is enough here, or use python-magic if you want to be strict)
+        """
+        filename = page_name.lower()
+        if filename.endswith(".png"): return "image/png"
+        if filename.endswith(".webp"): return "image/webp"
+        if filename.endswith(".gif"): return "image/gif"
+        return "image/jpeg"  # Default
+
+    @staticmethod
+    def get_stored_page_range(comic_path: str, page_index: int,
+                              page_map: Optional[Dict]) -> Optional[Tuple[int, int, str]]:
+        """
+        Locate an uncompressed (STORED) CBZ page inside the archive file.
+        Returns (offset, length, mime_type) so the page can be streamed straight from disk,
+        or None when the page must go through get_page_image (deflated, CBR/CB7, no/stale index).
+        """
+        try:
+            file_path = Path(comic_path)
+            if not is_page_map_current(file_path, page_map):
+                return None
+
+            entries = page_map["pages"]
+            if page_index < 0 or page_index >= len(entries):
+                return None
+
+            entry = entries[page_index]
+            member = locate_stored_zip_member(file_path, entry)
+            if not member:
+                return None
+
+            offset, length = member
+            return offset, length, ImageService.guess_page_mime_type(entry[0])
 
         except Exception as e:
-            print(f"Error extracting page {page_index}: {e}")
-            return None, False, "application/octet-stream"
+            logging.debug(f"Stored page lookup failed for {comic_path}: {e}")
+            return None
+
+    def _read_page_bytes(self, file_path: Path, page_index: int,
+                         page_map: Optional[Dict] = None) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Fetch the raw bytes of one page.
+        FAST PATH: A current page map gives us the member name (and for CBZ its offset),
+        so we skip listing + natural-sorting the archive on every request.
+
+        Returns: (bytes, archive member name)
+        """
+        if is_page_map_current(file_path, page_map):
+            entries = page_map["pages"]
+
+            if page_index < 0 or page_index >= len(entries):
+                print(f"Page index {page_index} out of range (0-{len(entries) - 1})")
+                return None, None
+
+            entry = entries[page_index]
+
+            # CBZ: Jump straight to the member
+            image_bytes = read_indexed_zip_member(file_path, entry)
+            if image_bytes is not None:
+                return image_bytes, entry[0]
+
+            # CBR/CB7 (or unsupported compression): Open, but skip the sort
+            with self._open_archive(file_path) as archive:
+                return archive.read_file(entry[0]), entry[0]
+
+        # SLOW PATH: No (or stale) index, list and sort the archive
+        with self._open_archive(file_path) as archive:
+            pages = archive.get_pages()
+
+            if page_index < 0 or page_index >= len(pages):
+                print(f"Page index {page_index} out of range (0-{len(pages) - 1})")
+                return None, None
+
+            return archive.read_file(pages[page_index]), pages[page_index]
+
+    def read_pages(self, comic_path: str, page_indices: List[int],
+                   page_map: Optional[Dict] = None) -> Dict[int, Tuple[bytes, str]]:
+        """
+        Raw bytes of several pages with one archive open (batch reader endpoint).
+        CB7 pages come out of one pass over the solid block.
+
+        Returns: {page_index: (bytes, archive member name)}, out-of-range pages left out
+        """
+        file_path = Path(comic_path)
+
+        with self._open_archive(file_path) as archive:
+            if is_page_map_current(file_path, page_map):
+                names = [entry[0] for entry in page_map["pages"]]
+            else:
+                names = archive.get_pages()
+
+            wanted = [(index, names[index]) for index in page_indices if 0 <= index < len(names)]
+            files = archive.iter_files([name for _, name in wanted])
+            return {index: (data, name) for (index, _), (name, data) in zip(wanted, files)}
 
     @staticmethod
     def get_page_count(comic_path: str) -> int:
@@ -197,13 +578,14 @@ class ImageService:
         except Exception:
             return 0
 
-    def generate_thumbnail(self, comic_path: str, output_path: Path) -> bool:
+    def generate_thumbnail(self, comic_path: str, output_path: Path, width: Optional[int] = None) -> bool:
         """
         Generate a thumbnail from the comic cover and save it to the specific output path.
 
         Args:
             comic_path: Source comic file
             output_path: Destination for the .webp thumbnail
+            width: Rendition width (default: the base thumbnail size)
 
         Returns:
             True if successful, False otherwise
@@ -212,12 +594,14 @@ class ImageService:
             # 1. Extract Cover
             # We pass transcode_webp=False because we are about to resize it anyway.
             # We don't want to compress -> decompress -> resize -> compress.
-            cover_bytes, is_correct_format, _ = self.get_page_image(comic_path, 0, transcode_webp=False)
+            cover_bytes, is_correct_format, _, _ = self.get_page_image(comic_path, 0, transcode_webp=False)
             if not cover_bytes or not is_correct_format:
                 return False
 
-            # 2. Process Image
-            img = Image.open(BytesIO(cover_bytes))
+            box = self.rendition_size(width) if width else self.thumbnail_size
+
+            # 2. Process Image (reduced-scale decode for JPEG)
+            img = self._open_cover(cover_bytes, box)
 
             # Handle Color Modes (CMYK, Palettes, etc.)
             if img.mode in ('RGBA', 'LA', 'P'):
@@ -230,14 +614,18 @@ class ImageService:
                 img = img.convert('RGB')
 
             # 3. Resize
-            width, height = self.thumbnail_size
-            img.thumbnail((width, height), Image.Resampling.LANCZOS)
+            img.thumbnail(box, Image.Resampling.LANCZOS)
 
             # 4. Save to Destination
-            # Ensure directory exists
+            # Temp file + rename: concurrent requests never serve a half-written file
+            output_path = Path(output_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
-
-            img.save(output_path, format='WEBP', quality=85, method=6)
+            tmp_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                img.save(tmp_path, format='WEBP', quality=85, method=6)
+                os.replace(tmp_path, output_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
             return True
 
         except Exception as e:
@@ -276,7 +664,7 @@ class ImageService:
             return False
 
     def extract_palette(self, comic_path: str, num_colors=5) -> Optional[Dict[str, str]]:
-        """Extract color palette using ColorThief"""
+        """Extract color palette (median cut, see app.services.palette)"""
         try:
 
             path = Path(comic_path)
@@ -285,24 +673,13 @@ class ImageService:
                 return None
 
             # 1. Get Cover Bytes
-            cover_bytes, success, _ = self.get_page_image(comic_path, 0, transcode_webp=False)
+            cover_bytes, success, _, _ = self.get_page_image(comic_path, 0, transcode_webp=False)
             if not success or not cover_bytes:
                 return None
 
-            color_thief = ColorThief(BytesIO(cover_bytes))
-            palette = color_thief.get_palette(color_count=num_colors, quality=10)
-
-            # Convert to HEX
-            def rgb_to_hex(rgb_tuple):
-                return f"#{rgb_tuple[0]:02x}{rgb_tuple[1]:02x}{rgb_tuple[2]:02x}"
-
-            return {
-                'primary': rgb_to_hex(palette[0]),
-                'secondary': rgb_to_hex(palette[1]),
-                'accent1': rgb_to_hex(palette[2]),
-                'accent2': rgb_to_hex(palette[3]),
-                'accent3': rgb_to_hex(palette[4]) if len(palette) > 4 else None
-            }
+            # Same as process_cover: decode at reduced scale, palette from the array
+            img = self._open_cover(cover_bytes, (150, 150))
+            return palette_to_dict(get_palette(img, color_count=num_colors, quality=10))
 
         except Exception as e:
             print(f"Color palette extraction failed for {comic_path}: {e}")
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from sqlalchemy.orm import Session
 import logging
 
@@ -8,6 +9,8 @@ from app.models.series import Series
 from app.models.reading_list import ReadingList
 from app.models.collection import Collection
 
+from app.services.bulk import chunked
+from app.services.cover_store import cover_store, CoverStore
 from app.services.enrichment import EnrichmentService
 from app.services.images import ImageService
 
@@ -90,11 +93,63 @@ class MaintenanceService:
                 Collection.auto_generated == True).delete(synchronize_session=False)
             self.db.commit()  # Yield Lock
 
+            # 8. Covers: move flat files into the sharded store, then drop unreferenced ones
+            stats["covers_migrated"] = self.migrate_cover_storage()
+            stats["covers_pruned"] = self.prune_covers()
+
         else:
             self.logger.info(f"Skipping deep tag cleanup for scoped scan (Library {library_id})")
 
         return stats
 
+    def migrate_cover_storage(self, store: CoverStore = cover_store) -> int:
+        """
+        Move legacy flat thumbnails (storage/cover/comic_<id>[_w<width>].webp) into the
+        content-addressed store and point the comics at them.
+        Files are only hashed and renamed (no decoding), so this is cheap even for large libraries.
+        A comic that already has a cover_hash keeps it: its legacy files are adopted only if their
+        content hashes to it, and dropped as stale otherwise.
+        Returns the number of comics moved.
+        """
+        legacy = defaultdict(dict)
+        for comic_id, width, path in store.iter_legacy_files():
+            legacy[comic_id][width] = path
+
+        migrated = 0
+        for chunk in chunked(list(legacy)):
+            known = dict(self.db.query(Comic.id, Comic.cover_hash).filter(Comic.id.in_(chunk)).all())
+            updates = []
+
+            for comic_id in chunk:
+                files = legacy[comic_id]
+                cover_hash = store.adopt(files, expected_hash=known[comic_id]) if comic_id in known else None
+
+                if not cover_hash:
+                    # Comic is gone, only odd renditions were left, or the files are older than
+                    # the stored cover (missing renditions are regenerated on demand)
+                    for path in files.values():
+                        path.unlink(missing_ok=True)
+                    continue
+
+                if not known[comic_id]:
+                    updates.append({
+                        "id": comic_id,
+                        "cover_hash": cover_hash,
+                        "thumbnail_path": str(store.path_for(cover_hash))
+                    })
+                migrated += 1
+
+            if updates:
+                self.db.bulk_update_mappings(Comic, updates)
+            self.db.commit()  # Yield Lock
+
+        return migrated
+
+    def prune_covers(self, store: CoverStore = cover_store) -> int:
+        """Delete stored covers that no comic points at any more (deleted/re-covered comics)"""
+        referenced = {h for (h,) in self.db.query(Comic.cover_hash).filter(Comic.cover_hash != None).distinct()}
+        return store.prune(referenced)
+
     def refresh_reading_list_descriptions(self) -> dict:
         """Populate missing descriptions for auto-generated lists."""
         lists = self.db.query(ReadingList).filter(ReadingList.auto_generated == True).all()
@@ -0,0 +1,197 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import portalocker
+from PIL import Image
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.models.comic import Comic
+from app.services.cover_store import CoverStore, cover_store
+from app.services.images import ImageService, get_thumbnail_widths
+from app.services.thumbnailer import apply_thumbnail_results
+
+logger = logging.getLogger(__name__)
+
+# Threads generating missing covers for the thumbnail endpoint (per web worker)
+ONDEMAND_MAX_WORKERS = 2
+
+# Distinct covers queued at once; past that, requests get the placeholder straight away
+ONDEMAND_MAX_PENDING = 32
+
+# How long a request waits for its cover before falling back to the placeholder
+ONDEMAND_WAIT_SECONDS = 10.0
+
+# Outcome of a generation task
+READY = "ready"
+PENDING = "pending"  # Another process holds the lock and is generating it
+FAILED = "failed"
+
+
+class OnDemandThumbnails:
+    """
+    Generates missing covers for the thumbnail endpoint off the event loop.
+
+    - Bounded: a small thread pool, and at most max_pending distinct covers queued.
+    - Single-flight per comic: requests in this process share one task, and a non-blocking
+      file lock per comic keeps other web workers from generating the same cover.
+    - Same output as the THUMBNAIL job: every configured rendition goes into the
+      content-addressed cover store (atomic writes), and the comic's cover_hash / colors
+      are set. That write is best effort: on a locked DB the files are still served.
+    """
+
+    def __init__(self, lock_dir: Optional[Path] = None, max_workers: int = ONDEMAND_MAX_WORKERS,
+                 max_pending: int = ONDEMAND_MAX_PENDING, store: Optional[CoverStore] = None,
+                 session_factory: Optional[Callable] = None):
+        self.lock_dir = Path(lock_dir or settings.cache_dir / "thumbnail_locks")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.store = store or cover_store
+        self.session_factory = session_factory
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._image_service: Optional[ImageService] = None
+        self._placeholders: Dict[Optional[int], bytes] = {}
+
+        self.generated = 0
+        self.failed = 0
+        self.joined = 0  # Requests that shared an in-flight task
+        self.busy = 0  # Tasks that found another process generating the cover
+        self.rejected = 0  # Requests turned away because the queue was full
+
+    def submit(self, comic_id: int, comic_path: str) -> Optional[Future]:
+        """
+        Future resolving to (READY / PENDING / FAILED, cover_hash) for this comic, shared with any
+        request already waiting on it. None if too many covers are queued already.
+        """
+        key = comic_id
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.joined += 1
+                return future
+
+            if len(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                return None
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="thumbnail")
+
+            future = self._executor.submit(self._generate, comic_id, comic_path)
+            self._inflight[key] = future
+
+        # Outside the lock: runs immediately if the task already finished
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def _forget(self, key, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _lock_path(self, comic_id: int) -> Path:
+        return self.lock_dir / f"comic_{comic_id}.lock"
+
+    def _generate(self, comic_id: int, comic_path: str) -> Tuple[str, Optional[str]]:
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(self._lock_path(comic_id), "a") as lock_file:
+            try:
+                portalocker.lock(lock_file, portalocker.LOCK_EX | portalocker.LOCK_NB)
+            except portalocker.LockException:
+                self.busy += 1
+                return PENDING, None
+
+            try:
+                widths = get_thumbnail_widths()
+
+                # Another worker may have finished it while this task was queued
+                cover_hash = self._stored_hash(comic_id)
+                if cover_hash and all(self.store.path_for(cover_hash, w).exists() for w in widths):
+                    return READY, cover_hash
+
+                if self._image_service is None:
+                    self._image_service = ImageService()
+
+                result = self._image_service.render_cover(comic_path, widths=widths)
+                if not result.get("success"):
+                    self.failed += 1
+                    return FAILED, None
+
+                cover_hash, _ = self.store.put(result["renditions"])
+                self._save_hash(comic_id, cover_hash, result.get("palette"))
+                self.generated += 1
+                return READY, cover_hash
+            finally:
+                portalocker.unlock(lock_file)
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _stored_hash(self, comic_id: int) -> Optional[str]:
+        session = self._session()
+        try:
+            return session.query(Comic.cover_hash).filter(Comic.id == comic_id).scalar()
+        finally:
+            session.close()
+
+    def _save_hash(self, comic_id: int, cover_hash: str, palette: Optional[Dict]) -> None:
+        """Point the comic at its stored cover (skipped on a locked DB: the next request or job retries)"""
+        session = self._session()
+        try:
+            apply_thumbnail_results(session, [{"comic_id": comic_id, "cover_hash": cover_hash, "palette": palette,
+                                               "thumbnail_path": str(self.store.path_for(cover_hash))}])
+            session.commit()
+        except OperationalError as e:
+            session.rollback()
+            logger.warning(f"Stored cover of comic {comic_id}, but could not save its hash: {e}")
+        finally:
+            session.close()
+
+    def placeholder(self, width: Optional[int] = None) -> bytes:
+        """Plain WebP in the rendition's box, served while a cover is being generated"""
+        data = self._placeholders.get(width)
+        if data is None:
+            service = ImageService()
+            size = service.rendition_size(width or int(service.thumbnail_size[0]))
+
+            output = BytesIO()
+            Image.new('RGB', size, (17, 24, 39)).save(output, format='WEBP', quality=50)
+            data = self._placeholders[width] = output.getvalue()
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "in_flight": len(self._inflight),
+            "max_pending": self.max_pending,
+            "generated": self.generated,
+            "failed": self.failed,
+            "joined": self.joined,
+            "busy_elsewhere": self.busy,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the threads (app shutdown); queued covers are dropped"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._inflight.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance (per process)
+ondemand_thumbnails = OnDemandThumbnails()
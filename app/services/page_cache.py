@@ -0,0 +1,225 @@
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.settings_loader import get_cached_setting
+
+logger = logging.getLogger(__name__)
+
+# Output mime type <-> file suffix (the suffix is how a hit knows what it serves)
+_SUFFIXES = {
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+}
+_MIME_TYPES = {suffix: mime for mime, suffix in _SUFFIXES.items()}
+
+# The size cap is checked after this many writes (per worker), not on every page
+PAGE_CACHE_CHECK_EVERY = 32
+
+_TMP_PREFIX = ".tmp_"
+
+
+class PageCache:
+    """
+    On-disk cache of processed reader pages (sharpen / grayscale / WebP transcode output).
+
+    Layout: 'comic_{id}_{mtime}/{page:05d}_{variant}.{ext}', where the variant encodes the
+    filter flags (and device rendition) and the suffix the output type. The source file's mtime is in the key, so
+    a replaced book never serves stale pages (and its old entry is dropped).
+
+    Shared by all Uvicorn workers through the filesystem:
+    - Files are written to a temp name and renamed into place (atomic).
+    - File mtime is the LRU clock (touched on every hit).
+    - The size cap is enforced every PAGE_CACHE_CHECK_EVERY writes by evicting the oldest files.
+    """
+
+    def __init__(self, root: Path, check_every: int = PAGE_CACHE_CHECK_EVERY):
+        self.root = root
+        self.check_every = check_every
+
+        # Counters (per worker process)
+        self._stats_lock = threading.Lock()
+        self._writes_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(get_cached_setting("system.page_cache_enabled", True))
+
+    @staticmethod
+    def max_bytes() -> int:
+        return int(get_cached_setting("system.page_cache_size_mb", 1024)) * 1024 * 1024
+
+    @staticmethod
+    def variant(sharpen: bool, grayscale: bool, webp: bool,
+                width: Optional[int] = None, output_format: Optional[str] = None) -> str:
+        """Filter flags, plus the device rendition (width + negotiated format) if any"""
+        key = f"s{int(sharpen)}g{int(grayscale)}w{int(webp)}"
+        return f"{key}_{width}{output_format}" if width else key
+
+    def get(self, comic_id: int, file_path: str, page_index: int,
+            variant: str) -> Optional[Tuple[Path, str]]:
+        """(path, mime_type) of a cached page, or None on a miss"""
+        found = self._find(comic_id, file_path, page_index, variant)
+        if found:
+            self._count("hits")
+            self._touch(found[0])
+        else:
+            self._count("misses")
+        return found
+
+    def contains(self, comic_id: int, file_path: str, page_index: int, variant: str) -> bool:
+        """Lookup without touching the counters or the LRU clock (prefetch)"""
+        return self._find(comic_id, file_path, page_index, variant) is not None
+
+    def put(self, comic_id: int, file_path: str, page_index: int, variant: str,
+            data: bytes, mime_type: str) -> None:
+        """Store a processed page. Failures are logged, never raised (the page is already served)."""
+        suffix = _SUFFIXES.get(mime_type)
+        if not suffix:
+            return
+
+        try:
+            entry_dir = self._entry_dir(comic_id, file_path)
+            if not entry_dir.exists():
+                entry_dir.mkdir(parents=True, exist_ok=True)
+
+                # Drop pages cached for older versions of this file
+                for old_dir in self.root.glob(f"comic_{comic_id}_*"):
+                    if old_dir != entry_dir:
+                        shutil.rmtree(old_dir, ignore_errors=True)
+
+            path = entry_dir / f"{page_index:05d}_{variant}{suffix}"
+            tmp_path = entry_dir / f"{_TMP_PREFIX}{path.name}.{uuid.uuid4().hex[:8]}"
+            try:
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+            self._count("writes")
+
+        except OSError as e:
+            logger.error(f"Failed to cache page {page_index} of comic {comic_id}: {e}")
+            return
+
+        with self._stats_lock:
+            self._writes_since_check += 1
+            due = self._writes_since_check >= self.check_every
+            if due:
+                self._writes_since_check = 0
+
+        if due:
+            self._enforce_size_limit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters (this worker) + current disk usage (all workers)"""
+        files = self._scan_files()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.is_enabled(),
+                "files": len(files),
+                "size_bytes": sum(size for _, _, size in files),
+                "max_bytes": self.max_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        """Remove every cached page"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # --- Internal helpers ---
+
+    def _find(self, comic_id: int, file_path: str, page_index: int,
+              variant: str) -> Optional[Tuple[Path, str]]:
+        try:
+            stem = self._entry_dir(comic_id, file_path) / f"{page_index:05d}_{variant}"
+            for suffix, mime_type in _MIME_TYPES.items():
+                path = stem.with_suffix(suffix)
+                if path.exists():
+                    return path, mime_type
+        except OSError:
+            pass
+        return None
+
+    def _entry_dir(self, comic_id: int, file_path) -> Path:
+        mtime_ms = int(os.path.getmtime(file_path) * 1000)
+        return self.root / f"comic_{comic_id}_{mtime_ms}"
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _scan_files(self) -> List[tuple]:
+        """(last_used, path, size) for every cached page"""
+        files = []
+        if not self.root.exists():
+            return files
+
+        for entry_dir in os.scandir(self.root):
+            if not entry_dir.is_dir():
+                continue
+            try:
+                for entry in os.scandir(entry_dir.path):
+                    if entry.name.startswith(_TMP_PREFIX):
+                        continue
+                    stat_result = entry.stat()
+                    files.append((stat_result.st_mtime, entry.path, stat_result.st_size))
+            except OSError:
+                # Evicted by another worker while we were looking
+                continue
+        return files
+
+    def _enforce_size_limit(self) -> None:
+        """Evict least recently used pages until the cache fits the configured size"""
+        files = self._scan_files()
+        total = sum(size for _, _, size in files)
+        limit = self.max_bytes()
+        if total <= limit:
+            return
+
+        for _, path, size in sorted(files):
+            if total <= limit:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            self._count("evictions")
+            self._count("evicted_bytes", size)
+
+            # Books with no pages left don't keep an empty directory around
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+
+# Global instance (counters are per worker, the cache itself is shared on disk)
+page_cache = PageCache(settings.cache_dir / "pages")
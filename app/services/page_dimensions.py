@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.services.images import ImageService
+
+logger = logging.getLogger(__name__)
+
+# Books per worker; an entry is a few hundred [w, h, spread] triples
+PAGE_DIMENSIONS_MAX_ENTRIES = 256
+
+
+class PageDimensionsCache:
+    """
+    Per-worker LRU of page dimensions read when a RAR/7z book is opened (the scan only probes ZIP).
+
+    Read-only: reader-init serves these without writing them to the comics table, so a GET never
+    competes with a running scan's writer. Keyed by (comic id, file mtime): a replaced file is re-read.
+    fill() runs as a background task; concurrent opens of the same book share one pass.
+    """
+
+    def __init__(self, max_entries: int = PAGE_DIMENSIONS_MAX_ENTRIES):
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self._filling = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+
+    def get(self, comic_id: int, file_path: str) -> Optional[list]:
+        """Dimensions read earlier in this worker, or None (schedule fill())"""
+        key = self._key(comic_id, file_path)
+        with self._lock:
+            dimensions = self._entries.get(key) if key else None
+            if dimensions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dimensions
+
+    def fill(self, comic_id: int, file_path: str, page_map: Optional[Dict] = None) -> None:
+        """Background task: one pass over the book"""
+        key = self._key(comic_id, file_path)
+        with self._lock:
+            if key is None or key in self._entries or key in self._filling:
+                return
+            self._filling.add(key)
+
+        try:
+            dimensions = ImageService().read_page_dimensions(file_path, page_map)
+            if dimensions:
+                with self._lock:
+                    self._entries[key] = dimensions
+                    self.fills += 1
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Could not read page dimensions of {file_path}: {e}")
+        finally:
+            with self._lock:
+                self._filling.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "fills": self.fills,
+            }
+
+    @staticmethod
+    def _key(comic_id: int, file_path: str) -> Optional[tuple]:
+        try:
+            return comic_id, os.path.getmtime(file_path)
+        except OSError:
+            return None
+
+
+# Global instance (per worker)
+page_dimensions_cache = PageDimensionsCache()
@@ -0,0 +1,166 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Palettes are computed on a copy no larger than this (plenty for 5 colors)
+PALETTE_SAMPLE_SIZE = (150, 150)
+
+# MMCQ parameters (same as ColorThief / Leptonica)
+SIGBITS = 5
+RSHIFT = 8 - SIGBITS
+MAX_ITERATION = 1000
+FRACT_BY_POPULATIONS = 0.75
+
+RGB = Tuple[int, int, int]
+
+
+class _Box:
+    """Inclusive box in quantized (5-bit) RGB space, over a shared 32x32x32 histogram"""
+    __slots__ = ("lo", "hi", "count", "volume")
+
+    def __init__(self, histo: np.ndarray, lo, hi):
+        self.lo = tuple(int(v) for v in lo)
+        self.hi = tuple(int(v) for v in hi)
+        self.count = int(histo[self.slices].sum())
+        self.volume = int(np.prod([h - l + 1 for l, h in zip(self.lo, self.hi)]))
+
+    @property
+    def slices(self):
+        return tuple(slice(l, h + 1) for l, h in zip(self.lo, self.hi))
+
+    def average(self, histo: np.ndarray) -> RGB:
+        """Population-weighted centre of the occupied bins (MMCQ's vbox.avg)"""
+        mult = 1 << RSHIFT
+        if not self.count:
+            return tuple(int(mult * (l + h + 1) / 2) for l, h in zip(self.lo, self.hi))
+
+        sub = histo[self.slices]
+        result = []
+        for axis in range(3):
+            other = tuple(a for a in range(3) if a != axis)
+            weights = sub.sum(axis=other)
+            centers = (np.arange(self.lo[axis], self.hi[axis] + 1) + 0.5) * mult
+            result.append(int(float((weights * centers).sum()) / self.count))
+        return tuple(result)
+
+
+def _sample_pixels(img: Image.Image, quality: int) -> np.ndarray:
+    """(N, 3) array of every `quality`-th opaque, non-white pixel (ColorThief's filter)"""
+    if img.width > PALETTE_SAMPLE_SIZE[0] or img.height > PALETTE_SAMPLE_SIZE[1]:
+        img = img.copy()
+        img.thumbnail(PALETTE_SAMPLE_SIZE)
+
+    rgba = np.asarray(img.convert('RGBA')).reshape(-1, 4)[::quality]
+    opaque = rgba[:, 3] >= 125
+    not_white = ~np.all(rgba[:, :3] > 250, axis=1)
+    return rgba[opaque & not_white, :3]
+
+
+def _median_cut(histo: np.ndarray, box: _Box):
+    """Split a box at (roughly) its population median along its widest axis"""
+    if box.count == 1:
+        return box, None
+
+    widths = [h - l + 1 for l, h in zip(box.lo, box.hi)]
+    axis = widths.index(max(widths))  # ties: r, then g, then b
+    other = tuple(a for a in range(3) if a != axis)
+
+    # Population per plane along the axis, as a running total
+    partial = np.cumsum(histo[box.slices].sum(axis=other))
+    total = int(partial[-1])
+    lo, hi = box.lo[axis], box.hi[axis]
+
+    def partial_at(i):
+        return int(partial[i - lo]) if lo <= i <= hi else 0
+
+    i = lo + int(np.argmax(partial > total / 2))
+    left, right = i - lo, hi - i
+    if left <= right:
+        d2 = min(hi - 1, int(i + right / 2))
+    else:
+        d2 = max(lo, int(i - 1 - left / 2))
+
+    # Avoid 0-count boxes
+    while not partial_at(d2):
+        d2 += 1
+    while total - partial_at(d2) == 0 and partial_at(d2 - 1):
+        d2 -= 1
+
+    hi1 = list(box.hi)
+    hi1[axis] = d2
+    lo2 = list(box.lo)
+    lo2[axis] = d2 + 1
+    return _Box(histo, box.lo, hi1), _Box(histo, lo2, box.hi)
+
+
+def _iterate(histo: np.ndarray, boxes: List[_Box], key, target: float) -> None:
+    """Repeatedly split the highest-priority box until `target` new colors are reached"""
+    n_color = 1
+    for _ in range(MAX_ITERATION):
+        # Stable sort + pop() matches MMCQ's priority queue tie-breaking
+        boxes.sort(key=key)
+        box = boxes.pop()
+        if not box.count:
+            boxes.append(box)
+            continue
+
+        first, second = _median_cut(histo, box)
+        boxes.append(first)
+        if second:
+            boxes.append(second)
+            n_color += 1
+        if n_color >= target:
+            return
+
+
+def get_palette(img: Image.Image, color_count: int = 5, quality: int = 10) -> List[RGB]:
+    """
+    Palette from an already-decoded Pillow image (dominant color first).
+
+    A NumPy port of ColorThief's MMCQ (modified median cut): same 5-bit quantization,
+    split order and ordering, so stored palettes don't shift. The histogram is built with
+    one bincount and box counts/cuts are array sums, instead of re-encoding the image to
+    JPEG and walking pixels/bins in Python.
+
+    quality: Use every N-th pixel (1 = all), same meaning as ColorThief.
+    """
+    pixels = _sample_pixels(img, max(1, quality))
+    if not len(pixels):
+        return []
+
+    quantized = (pixels >> RSHIFT).astype(np.intp)
+    histo = np.bincount(
+        (quantized[:, 0] << (2 * SIGBITS)) + (quantized[:, 1] << SIGBITS) + quantized[:, 2],
+        minlength=1 << (3 * SIGBITS)
+    ).reshape((1 << SIGBITS,) * 3)
+
+    boxes = [_Box(histo, quantized.min(axis=0), quantized.max(axis=0))]
+
+    # First set of colors by population, then by population x volume
+    _iterate(histo, boxes, lambda b: b.count, FRACT_BY_POPULATIONS * color_count)
+    _iterate(histo, boxes, lambda b: b.count * b.volume, color_count - len(boxes))
+
+    boxes.sort(key=lambda b: b.count * b.volume)
+    return [box.average(histo) for box in reversed(boxes)]
+
+
+def to_hex(rgb: RGB) -> str:
+    return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
+
+
+def palette_to_dict(colors: List[RGB]) -> Optional[Dict[str, Optional[str]]]:
+    """Shape used by Comic.color_palette / color_primary / color_secondary"""
+    if not colors:
+        return None
+
+    # Flat covers can yield fewer than 3 colors; repeat the last one for the required keys
+    colors = list(colors) + [colors[-1]] * max(0, 3 - len(colors))
+
+    return {
+        'primary': to_hex(colors[0]),
+        'secondary': to_hex(colors[1]),
+        'accent1': to_hex(colors[2]),
+        'accent2': to_hex(colors[3]) if len(colors) > 3 else None,
+        'accent3': to_hex(colors[4]) if len(colors) > 4 else None
+    }
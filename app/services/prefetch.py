@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+from app.services.archive import archive_pool
+from app.services.extraction_cache import extraction_cache
+from app.services.images import ImageService
+from app.services.page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+# Pages ahead of the one being read, and pages at the start of the next book
+PREFETCH_AHEAD = 4
+PREFETCH_NEXT_COMIC_PAGES = 2
+
+# Queued pages per user / in total (per worker); more requests are dropped, not queued
+PREFETCH_MAX_PER_USER = 8
+PREFETCH_MAX_PENDING = 64
+
+# Prefetch threads run at this nice level (Linux), below request handlers
+PREFETCH_NICE = 10
+
+
+def _lower_thread_priority() -> None:
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICE)
+    except (AttributeError, OSError):
+        pass  # Not supported here (non-Linux): the single thread is the only limit
+
+
+class PagePrefetcher:
+    """
+    Renders upcoming reader pages into the processed-page cache before they are asked for.
+
+    Only sessions with server-side filters (webp / sharpen / grayscale / width) are prefetched:
+    plain pages are already served straight from the archive (or the extraction cache).
+
+    One low-priority thread per worker, so prefetch never takes more than a core away from
+    foreground requests. Queued pages are capped per user and in total; duplicates of a
+    page that is already queued are ignored.
+    """
+
+    def __init__(self, max_per_user: int = PREFETCH_MAX_PER_USER, max_pending: int = PREFETCH_MAX_PENDING):
+        self.max_per_user = max_per_user
+        self.max_pending = max_pending
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._per_user: Dict[str, int] = {}
+
+        self.prefetched = 0
+        self.skipped = 0  # Already cached (or served zero-copy anyway)
+        self.dropped = 0  # Over the per-user / total limit
+        self.failed = 0
+
+    def schedule(self, username: str, comic_id: int, file_path: str, page_map: Optional[Dict],
+                 pages: Iterable[int], sharpen: bool = False, grayscale: bool = False,
+                 webp: bool = False, width: Optional[int] = None, output_format: Optional[str] = None) -> int:
+        """
+        Queue pages of one book. Returns how many were queued.
+        width / output_format: Device rendition, as already snapped / negotiated by the page endpoint.
+        """
+        if not (sharpen or grayscale or webp or width) or not page_cache.is_enabled():
+            return 0
+
+        variant = page_cache.variant(sharpen, grayscale, webp, width, output_format)
+        queued = 0
+
+        with self._lock:
+            for page_index in pages:
+                key = (comic_id, page_index, variant)
+                if key in self._queued:
+                    continue
+
+                if self._per_user.get(username, 0) >= self.max_per_user or len(self._queued) >= self.max_pending:
+                    self.dropped += 1
+                    continue
+
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch",
+                                                        initializer=_lower_thread_priority)
+
+                self._queued.add(key)
+                self._per_user[username] = self._per_user.get(username, 0) + 1
+                self._executor.submit(self._run, username, key, file_path, page_map,
+                                      dict(sharpen=sharpen, grayscale=grayscale, transcode_webp=webp,
+                                           max_width=width, output_format=output_format))
+                queued += 1
+
+        return queued
+
+    def _run(self, username: str, key: tuple, file_path: str, page_map: Optional[Dict], options: Dict) -> None:
+        try:
+            self._prefetch_page(key, file_path, page_map, options)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Prefetch of page {key[1]} of comic {key[0]} failed: {e}")
+        finally:
+            with self._lock:
+                self._queued.discard(key)
+                remaining = self._per_user.get(username, 1) - 1
+                if remaining > 0:
+                    self._per_user[username] = remaining
+                else:
+                    self._per_user.pop(username, None)
+
+    def _prefetch_page(self, key: tuple, file_path: str, page_map: Optional[Dict], options: Dict) -> None:
+        """options: process_page_bytes keyword arguments (filters + device rendition)"""
+        comic_id, page_index, variant = key
+
+        if page_cache.contains(comic_id, file_path, page_index, variant):
+            self.skipped += 1
+            return
+
+        # Same rule as the page endpoint: stored CBZ pages that need no work are streamed as-is
+        if not options["sharpen"] and not options["grayscale"] and not options["max_width"]:
+            stored_page = ImageService.get_stored_page_range(file_path, page_index, page_map)
+            if stored_page and not ImageService.should_transcode(stored_page[1], stored_page[2],
+                                                                 options["transcode_webp"]):
+                self.skipped += 1
+                return
+
+        image_service = ImageService(archive_pool=archive_pool)
+        image_bytes = None
+
+        if extraction_cache.applies_to(file_path) and extraction_cache.is_enabled():
+            cached_page = extraction_cache.get_page(comic_id, file_path, page_index, page_map)
+            if cached_page:
+                image_bytes, success, mime_type, transformed = image_service.process_page_bytes(
+                    cached_page.read_bytes(), cached_page.name, **options
+                )
+
+        if image_bytes is None:
+            image_bytes, success, mime_type, transformed = image_service.get_page_image(
+                file_path, page_index, page_map=page_map, **options
+            )
+
+        if image_bytes and transformed:
+            page_cache.put(comic_id, file_path, page_index, variant, image_bytes, mime_type)
+            self.prefetched += 1
+        elif image_bytes and success:
+            self.skipped += 1  # Served as-is anyway (e.g. already fits the device width)
+        else:
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": len(self._queued),
+                "users": len(self._per_user),
+                "max_per_user": self.max_per_user,
+                "max_pending": self.max_pending,
+                "prefetched": self.prefetched,
+                "skipped": self.skipped,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the thread (app shutdown); queued pages are dropped unless wait=True"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        with self._lock:
+            self._queued.clear()
+            self._per_user.clear()
+
+
+# Global instance (per worker)
+page_prefetcher = PagePrefetcher()
@@ -1,7 +1,8 @@
 import logging
 from sqlalchemy.orm import Session
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from app.models import ReadingList, ReadingListItem, Comic
+from app.services.bulk import insert_ignore, delete_for_comics
 from app.services.enrichment import EnrichmentService
 
 class ReadingListService:
@@ -11,6 +12,11 @@ class ReadingListService:
         self.logger = logging.getLogger(__name__)
         self.enrichment = EnrichmentService()
 
+        # Bulk ingest state (see preload / queue_comic_lists / flush_queued)
+        self.list_ids: Dict[str, int] = {}
+        self.pending_items: List[Dict] = []
+        self.pending_replace: List[int] = []
+
     def get_or_create_reading_list(self, name: str) -> ReadingList:
         name = name.strip()
 
@@ -84,4 +90,45 @@ class ReadingListService:
             self.db.delete(rl)
             # Invalidate cache if we delete
             if rl.name in self.list_cache:
-                del self.list_cache[rl.name]
\ No newline at end of file
+                del self.list_cache[rl.name]
+            self.list_ids.pop(rl.name, None)
+
+    # --- Bulk ingest (scanner) ---
+
+    def preload(self):
+        """Load every reading list name -> id once per scan"""
+        self.list_ids = dict(self.db.query(ReadingList.name, ReadingList.id).all())
+
+    def queue_comic_lists(self, comic_id: int, alternate_series: Optional[str],
+                          alternate_number: Optional[str], replace: bool = False):
+        """Queue the list membership of one comic; nothing is written until flush_queued()"""
+        if replace:
+            self.pending_replace.append(comic_id)
+
+        if not (alternate_series and alternate_number and alternate_series.strip()):
+            return
+
+        try:
+            position = float(alternate_number)
+        except ValueError:
+            return
+
+        name = alternate_series.strip()
+        if name not in self.list_ids:
+            # New lists are rare and need enrichment, so they still go through the ORM
+            self.list_ids[name] = self.get_or_create_reading_list(name).id
+
+        self.pending_items.append({"reading_list_id": self.list_ids[name], "comic_id": comic_id, "position": position})
+
+    def flush_queued(self):
+        if self.pending_replace:
+            delete_for_comics(self.db, ReadingListItem.__table__, self.pending_replace)
+            self.pending_replace = []
+
+        insert_ignore(self.db, ReadingListItem.__table__, self.pending_items)
+        self.pending_items = []
+
+    def discard_queued(self):
+        """Drop queued rows without writing them (after a failed flush was rolled back)"""
+        self.pending_items = []
+        self.pending_replace = []
@@ -4,10 +4,10 @@ import json
 import traceback
 import logging
 from datetime import datetime, timezone
+from typing import List, Optional
 from sqlalchemy import asc
 from sqlalchemy.exc import OperationalError
 
-from app.core.settings_loader import get_cached_setting
 from app.database import SessionLocal
 from app.models import ScanJob, Library
 from app.models.job import JobType, JobStatus
@@ -16,6 +16,9 @@ from app.services.scanner import LibraryScanner
 from app.services.maintenance import MaintenanceService
 from app.services.thumbnailer import ThumbnailService
 
+# A scoped scan touching more paths than this is cheaper (and safer) as a full walk
+SCOPED_SCAN_MAX_PATHS = 1000
+
 
 class ScanManager:
     _instance = None
@@ -114,27 +117,79 @@ class ScanManager:
             finally:
                 db.close()
 
-    def add_task(self, library_id: int, force: bool = False) -> dict:
-        """Create a new job record"""
+    def _progress_reporter(self, job_id: int, interval: float = 2.0):
+        """
+        on_progress(done, total) callback that stores {"progress": {...}} on the running job,
+        at most every `interval` seconds (any web worker can then show it via /api/jobs/active).
+        """
+        last_report = 0.0
+
+        def report(done: int, total: int):
+            nonlocal last_report
+            now = time.monotonic()
+            if done < total and now - last_report < interval:
+                return
+            last_report = now
+
+            db = SessionLocal()
+            try:
+                db.query(ScanJob).filter(ScanJob.id == job_id, ScanJob.status == JobStatus.RUNNING).update(
+                    {"result_summary": json.dumps({"progress": {"done": done, "total": total}})}
+                )
+                db.commit()
+            except OperationalError as e:
+                # Progress is best effort; never hold up the job on a locked DB
+                self.logger.debug(f"Skipped progress update for job {job_id}: {e}")
+            finally:
+                db.close()
+
+        return report
 
-        self.logger.debug(f"Adding SCAN job for library {library_id} to queue (force: {force})")
+    def add_task(self, library_id: int, force: bool = False, paths: Optional[List[str]] = None) -> dict:
+        """
+        Create a new job record.
+        paths: Optional scope (files/folders inside the library). None = full scan.
+        """
 
+        self.logger.debug(f"Adding SCAN job for library {library_id} to queue (force: {force}, "
+                          f"paths: {len(paths) if paths is not None else 'all'})")
+
+        if paths is not None and len(paths) > SCOPED_SCAN_MAX_PATHS:
+            paths = None
 
         db = SessionLocal()
         try:
-            # STRICT BLOCKING
-            existing = db.query(ScanJob).filter(
+            active = db.query(ScanJob).filter(
                 ScanJob.library_id == library_id,
                 ScanJob.job_type == JobType.SCAN,
                 ScanJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING])
-            ).first()
+            ).all()
 
-            if existing:
-                return {"status": "ignored", "job_id": existing.id, "message": "Scan active"}
+            # A pending job hasn't started walking yet: fold this request into it
+            pending = next((j for j in active if j.status == JobStatus.PENDING), None)
+            if pending:
+                if pending.scan_paths is None:
+                    return {"status": "ignored", "job_id": pending.id, "message": "Scan active"}
+
+                if paths is None:
+                    # Full scan requested: widen the pending scoped job
+                    pending.scan_paths = None
+                else:
+                    merged = list(dict.fromkeys(pending.scan_paths + list(paths)))
+                    pending.scan_paths = merged if len(merged) <= SCOPED_SCAN_MAX_PATHS else None
+                pending.force_scan = pending.force_scan or force
+                db.commit()
+                return {"status": "merged", "job_id": pending.id, "message": "Merged into queued scan"}
+
+            # STRICT BLOCKING for full scans.
+            # Scoped changes arriving mid-scan are queued behind it: the running walk may have passed them already.
+            if active and paths is None:
+                return {"status": "ignored", "job_id": active[0].id, "message": "Scan active"}
 
             job = ScanJob(
                 library_id=library_id,
                 force_scan=force,
+                scan_paths=list(paths) if paths is not None else None,
                 job_type=JobType.SCAN,
                 status=JobStatus.PENDING
             )
@@ -189,7 +244,8 @@ class ScanManager:
                         "id": job.id,
                         "library_id": job.library_id,
                         "type": job.job_type,
-                        "force": job.force_scan
+                        "force": job.force_scan,
+                        "paths": job.scan_paths
                     }
                     db.close()  # Close immediately
 
@@ -242,6 +298,7 @@ class ScanManager:
         job_id = job_data['id']
         library_id = job_data['library_id']
         force = job_data['force']
+        paths = job_data.get('paths')
 
         results = {}
         error = None
@@ -253,7 +310,7 @@ class ScanManager:
             if library:
                 self.logger.info(f"Starting SCAN job {job_id}")
                 scanner = LibraryScanner(library, db_scan)
-                results = scanner.scan(force=force)
+                results = scanner.scan(force=force, paths=paths)
             else:
                 error = "Library not found"
         except Exception as e:
@@ -271,7 +328,13 @@ class ScanManager:
             summary = {
                 "imported": results.get("imported", 0),
                 "updated": results.get("updated", 0),
+                "moved": results.get("moved", 0),
                 "deleted": results.get("deleted", 0),
+                "skipped": results.get("skipped", 0),
+                "directories_skipped": results.get("directories_skipped", 0),
+                "scoped_paths": results.get("scoped_paths"),
+                "commits": results.get("commits"),
+                "thumbnails": results.get("thumbnails"),
                 "errors": results.get("errors", 0),
                 "elapsed": results.get("elapsed", 0)
             }
@@ -279,6 +342,8 @@ class ScanManager:
 
             # 3. Queue Pipeline: THUMBNAIL -> CLEANUP
             # We queue both now so they run in sequence via priority
+            # Covers streamed during the scan make THUMBNAIL a backfill for new / changed files, but a
+            # forced scan only streams those: the forced THUMBNAIL job still regenerates every other cover
             db_queue = SessionLocal()
             try:
                 # Add Thumbnail Job
@@ -316,16 +381,12 @@ class ScanManager:
             self.logger.info(f"Starting THUMBNAIL job {job_id}")
 
             service = ThumbnailService(db_thumb, library_id)
-            use_parallel = get_cached_setting('system.parallel_image_processing', False)
 
-            self.logger.info(f"Parallel image processing is set to {use_parallel}")
-
-            # UNIFIED LOGIC:
-            # If Parallel is ON: Let the service auto-detect worker count (0)
-            # If Parallel is OFF: Force exactly 1 worker
-            workers = 0 if use_parallel else 1
-
-            stats = service.process_missing_thumbnails_parallel(force=force, worker_limit=workers)
+            # Worker count comes from the shared image pool (system.parallel_image_processing)
+            stats = service.process_missing_thumbnails_parallel(
+                force=force,
+                on_progress=self._progress_reporter(job_id)
+            )
 
         except Exception as e:
             error = str(e)
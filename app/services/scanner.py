@@ -1,23 +1,135 @@
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple, NamedTuple, Callable
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 import json
+import multiprocessing
 import os
 import time
 import logging
 
 from app.config import settings
+from app.core.settings_loader import get_cached_setting
 from app.models.library import Library
 from app.models.series import Series
 from app.models.comic import Volume, Comic
-from app.services.archive import ComicArchive
+from app.models.scan_directory import ScanDirectory
+from app.models.tags import comic_characters, comic_teams, comic_locations, comic_genres
+from app.models.credits import ComicCredit
+from app.models.reading_list import ReadingListItem
+from app.models.collection import CollectionItem
+from app.models.reading_progress import ReadingProgress
+from app.models.pull_list import PullListItem
+from app.services.archive import ComicArchive, compute_fingerprint
+from app.services.bulk import AdaptiveCommitBatcher, chunked
 from app.services.metadata import parse_comicinfo
 from app.services.tags import TagService
 from app.services.credits import CreditService
 from app.services.reading_list import ReadingListService
 from app.services.collection import CollectionService
-from app.services.images import ImageService
+from app.services.images import ImageService, get_thumbnail_widths
+from app.services.thumbnailer import ScanThumbnailStream, apply_thumbnail_results
+
+# Below this many new/changed files, the serial path is faster than starting a pool
+PARALLEL_MIN_ITEMS = 20
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+DELETE_CHUNK_SIZE = 500
+
+# How long the writer waits on the worker pool before committing what it has
+IDLE_COMMIT_WAIT = 0.05
+
+
+class ExistingComic(NamedTuple):
+    """What the scanner needs to know about a comic already in the DB (kept small on purpose)"""
+    id: int
+    file_modified_at: Optional[float]
+    file_size: Optional[int]
+    needs_page_index: bool  # page_map (or CBZ page_dimensions) not built yet
+    fingerprint: Optional[str]
+
+
+def extract_comic_metadata(file_path: Path, include_cover: bool = False) -> Optional[Dict]:
+    """
+    Open a comic archive and build its metadata dict (page count, page map, ComicInfo).
+    Pure I/O + parsing: Does NOT touch the database, so it is safe to run in worker processes.
+    include_cover: Also return the raw cover bytes ('cover_bytes') for the thumbnail stream,
+                   so the archive isn't opened a second time just for the cover.
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        with ComicArchive(file_path) as archive:
+            pages = archive.get_pages()
+
+            if not pages:
+                logger.warning(f"Warning: No valid image pages found in {file_path.name}")
+                return None
+
+            comicinfo_xml = archive.get_comicinfo()
+
+            # 1. Establish Physical Truth of page count
+            physical_count = len(pages)
+            metadata = {'page_count': physical_count}
+
+            # Persist the sorted page index so the reader can skip get_pages()
+            metadata['page_map'] = archive.get_page_map(pages)
+
+            # Page sizes from image headers only (no decoding) for spread layout in the reader
+            metadata['page_dimensions'] = ImageService().probe_page_dimensions(archive, pages)
+
+            if include_cover:
+                metadata['cover_bytes'] = archive.read_file(pages[0])
+
+        # Lets a later scan recognise this file after a move/rename
+        metadata['fingerprint'] = compute_fingerprint(file_path)
+
+        if comicinfo_xml:
+            parsed = parse_comicinfo(comicinfo_xml)
+            metadata.update(parsed)
+
+            # Force overwrite: Always use physical count for this field.
+            # We trust the file system over the XML tag for navigational safety in the reader.
+            metadata['page_count'] = physical_count
+
+            metadata['raw_metadata'] = parsed
+
+        return metadata
+
+    except Exception as e:
+        logger.error(f"Error extracting metadata from {file_path}: {e}")
+        return None
+
+
+def read_page_index(file_path: str) -> Optional[Dict]:
+    """
+    Index columns only (page_map, and page_dimensions for ZIP), for comics scanned before they existed.
+    Pool-safe like extract_comic_metadata. None if the archive can't be read.
+    """
+    try:
+        with ComicArchive(Path(file_path)) as archive:
+            pages = archive.get_pages()
+            index = {'page_map': archive.get_page_map(pages)}
+
+            dimensions = ImageService().probe_page_dimensions(archive, pages)
+            if dimensions is not None:
+                index['page_dimensions'] = dimensions
+            return index
+
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error reading page index of {file_path}: {e}")
+        return None
+
+
+def _metadata_worker(task: Tuple[int, str, bool]) -> Tuple[int, Optional[Dict]]:
+    """
+    Pool worker: extracts metadata for one file.
+    Returns the task index so the writer can match results arriving out of order.
+    """
+    index, file_path, include_cover = task
+    return index, extract_comic_metadata(Path(file_path), include_cover=include_cover)
+
 
 class LibraryScanner:
     """Scans library directories and imports comics with batch processing"""
@@ -25,7 +137,7 @@ class LibraryScanner:
     def __init__(self, library: Library, db: Session):
         self.library = library
         self.db = db
-        self.supported_extensions = ['.cbz', '.cbr']
+        self.supported_extensions = [ext.lower() for ext in settings.supported_extensions]
         self.tag_service = TagService(db)
         self.credit_service = CreditService(db)
         self.reading_list_service = ReadingListService(db)
@@ -38,10 +150,20 @@ class LibraryScanner:
         self.series_cache: Dict[str, Series] = {}
         self.volume_cache: Dict[str, Volume] = {}
 
-    def scan(self, force: bool = False) -> dict:
+        # Set while a thumbnail stream runs: metadata extraction also returns cover bytes
+        self.include_cover = False
+
+        # (comic_id, file_path, metadata, replace) queued for the next link flush, to retry one by one
+        self.queued_links: List[Tuple[int, str, Dict, bool]] = []
+
+    def scan(self, force: bool = False, paths: Optional[List[str]] = None) -> dict:
         """
         Scan the library path and import comics using intelligent batch commits.
         OPTIMIZED: Separates File I/O from DB Transactions to prevent SQLite Locking.
+        PIPELINE: Walk (this thread) -> Extract metadata (process pool) -> Write (this thread, one session).
+
+        paths: Optional scope (changed files/folders, e.g. from watcher events).
+               Only comics at or under these paths are imported, updated, moved or deleted.
         """
         library_path = Path(self.library.path)
 
@@ -53,129 +175,286 @@ class LibraryScanner:
         errors = []
         imported = 0
         updated = 0
+        moved = 0
         skipped = 0
 
-        # Batch configuration
-        BATCH_SIZE = 50
-        pending_changes = 0
-
-        self.logger.info(f"Scanning {library_path} (force={force})")
-
-        # Start timing
-        start_time = time.time()
+        # Batch configuration: commit by time budget (write lock held <= N ms), adapting to contention
+        batcher = AdaptiveCommitBatcher(budget_ms=int(get_cached_setting("scanning.commit_budget_ms", 200)))
+
+        thumbnails: Optional[ScanThumbnailStream] = None
+
+        # Work items written since the last commit (with their comic id), and items of a
+        # batch whose commit failed, written once more into the next batch
+        batch_items = []
+        retry_items = []
+        retried = set()
+
+        # Finished covers, kept until the commit that applies them succeeds
+        covers = []
+
+        def flush_pending():
+            self._flush_links(errors)
+            if thumbnails:
+                covers.extend(thumbnails.collect())
+                self._apply_thumbnails(covers)
+
+        def commit_batch():
+            nonlocal imported, updated
+            self.logger.debug(f"Committing batch of {batcher.pending} items...")
+            try:
+                batcher.commit(self.db, before=flush_pending)
+            except Exception as e:
+                # e.g. "database is locked" past the busy timeout: roll this batch back instead of
+                # aborting the scan, and write its comics again into the next batch (once)
+                self.logger.warning(f"Batch commit failed, retrying {len(batch_items)} item(s) with the next batch: {e}")
+                self.db.rollback()
+                batcher.discard()
+                self._reset_write_state()
+
+                dropped = {comic_id for _, comic_id in batch_items}
+                if thumbnails:
+                    thumbnails.discard(dropped)
+                found_comics[:] = [c for c in found_comics if c["id"] not in dropped]
+
+                # Covers of comics committed earlier are applied again with the next commit
+                covers[:] = [c for c in covers if c["comic_id"] not in dropped]
+
+                for item, _ in batch_items:
+                    if item[3] == "update":
+                        updated -= 1
+                    else:
+                        imported -= 1
 
-        # 1. OPTIMIZATION: Pre-fetch all existing comics for this library.
-        # This avoids executing a SELECT query for every single file in the loop.
-        self.logger.debug("Pre-fetching existing file list...")
-        db_comics = self.db.query(Comic).join(Volume).join(Series).filter(
-            Series.library_id == self.library.id
-        ).all()
+                    if str(item[0]) in retried:
+                        errors.append({"file": str(item[0]), "error": f"Commit failed: {e}"})
+                    else:
+                        retried.add(str(item[0]))
+                        retry_items.append(item)
+            else:
+                covers.clear()
+            batch_items.clear()
 
-        # Map file_path -> Comic object for O(1) lookup
-        existing_map = {c.file_path: c for c in db_comics}
+        def commit_if_idle():
+            # Don't hold the write lock while waiting on the workers
+            if batcher.pending:
+                commit_batch()
 
-        # Track paths found on disk to identify deletions later
-        scanned_paths_on_disk = set()
+        def write_item(item):
+            nonlocal imported, updated
+            file_path, file_mtime, file_size_bytes, action, metadata, cover_bytes = item
+            file_path_str = str(file_path)
 
-        # Walk through directory
-        for file_path in library_path.rglob('*'):
-            if file_path.suffix.lower() in self.supported_extensions:
-                file_path_str = str(file_path)
-                scanned_paths_on_disk.add(file_path_str)
+            try:
+                # Full object loaded lazily, only for files that actually changed
+                existing = self.db.get(Comic, existing_map[file_path_str].id) if action == "update" else None
 
-                try:
-                    file_mtime = os.path.getmtime(file_path)
-                    file_size_bytes = os.path.getsize(file_path)
+                if file_path_str in retried:
+                    # Rolled back with its batch, but released savepoints may have kept the row:
+                    # write it again as an update if it's there (links are replaced, not duplicated)
+                    existing = self.db.query(Comic).filter(Comic.file_path == file_path_str).first()
 
-                    # Check against our pre-fetched map
-                    existing = existing_map.get(file_path_str)
+                # --- PHASE 2: DB WRITE (Short Transaction) ---
+                # Now we open the transaction. Operations here must be fast.
+                with self.db.begin_nested():
 
-                    # --- PHASE 1: FILE I/O (No DB Lock) ---
-                    # We determine if work is needed and extract metadata BEFORE opening the DB transaction.
-                    # This prevents holding the write lock while unzipping large files.
+                    comic = None
 
-                    action = "skip"
-                    metadata = None
+                    if existing is not None:
 
-                    if existing:
-                        # Check modification time
-                        if not force and existing.file_modified_at and existing.file_modified_at >= file_mtime:
-                            action = "skip"
+                        if force:
+                            self.logger.info(f"Force scanning: {file_path.name}")
                         else:
-                            action = "update"
-                            # Heavy I/O happens here, completely safe
-                            metadata = self._extract_metadata(file_path)
-                    else:
-                        action = "import"
-                        # Heavy I/O happens here, completely safe
-                        metadata = self._extract_metadata(file_path)
+                            self.logger.info(f"Updating modified: {file_path.name}")
 
-                    if action == "skip":
-                        skipped += 1
-                        continue
+                        # Pass pre-extracted metadata
+                        comic = self._update_comic(existing, file_path, file_mtime, file_size_bytes, metadata)
+                        if comic:
+                            if action == "update":
+                                updated += 1
+                            else:
+                                imported += 1
+                            batcher.add()
 
-                    if not metadata:
-                        # Failed to extract, log and continue
-                        errors.append({"file": str(file_path), "error": "Failed to extract metadata"})
-                        continue
+                    elif action == "import":
+                        # Pass pre-extracted metadata
+                        comic = self._import_comic(file_path, file_mtime, file_size_bytes, metadata)
+                        if comic:
+                            imported += 1
+                            batcher.add()
 
-                    # --- PHASE 2: DB WRITE (Short Transaction) ---
-                    # Now we open the transaction. Operations here must be fast.
-                    with self.db.begin_nested():
+                    # FORCE FLUSH: Validate constraints immediately
+                    if comic:
+                        self.db.flush()
+
+                # Only queue links once the comic row is safely flushed
+                if comic:
+                    batch_items.append((item, comic.id))
+                    self._queue_links(comic.id, metadata, replace=existing is not None, file_path=file_path_str)
+
+                    # The cover is rendered in the background, applied with a later commit
+                    if thumbnails and cover_bytes:
+                        thumbnails.submit(comic.id, cover_bytes)
+
+                # --- BATCH COMMIT ---
+                if comic:
+                    found_comics.append({
+                        "id": comic.id,
+                        "filename": comic.filename,
+                        "series": comic.volume.series.name if comic.volume and comic.volume.series else "Unknown",
+                        "pages": comic.page_count
+                    })
+
+                # 2. OPTIMIZATION: Batch Commit
+                # Commit once the batch is full or the write lock has been held for the budget
+                if batcher.should_commit():
+                    commit_batch()
+
+            except Exception as e:
+                # Logic: The savepoint has already rolled back the DB changes for this specific file.
+                # The session is clean and ready for the next file.
+                errors.append({"file": file_path_str, "error": str(e)})
+                self.logger.error(f"Error processing {file_path}: {e}")
+
+        # None = whole library
+        scope_roots = self._resolve_scope(library_path, paths) if paths is not None else None
+
+        if scope_roots is None:
+            self.logger.info(f"Scanning {library_path} (force={force})")
+        else:
+            self.logger.info(f"Scanning {len(scope_roots)} changed path(s) in {library_path} (force={force})")
 
-                        comic = None
+        # Start timing
+        start_time = time.time()
 
-                        if action == "update":
+        # 1. OPTIMIZATION: Pre-fetch a lightweight snapshot of existing comics for this library.
+        # This avoids executing a SELECT query for every single file in the loop,
+        # without hydrating full Comic objects (summary, metadata_json, palette...) just to compare mtimes.
+        # Map file_path -> ExistingComic tuple for O(1) lookup
+        self.logger.debug("Pre-fetching existing file list...")
+        existing_map = self._load_existing_snapshot()
 
-                            if force:
-                                self.logger.info(f"Force scanning: {file_path.name}")
-                            else:
-                                self.logger.info(f"Updating modified: {file_path.name}")
+        # Scoped scan: comics outside the scope are neither visited nor considered missing
+        if scope_roots is not None:
+            existing_map = {path: snap for path, snap in existing_map.items() if self._in_scope(path, scope_roots)}
 
-                            # Pass pre-extracted metadata
-                            comic = self._update_comic(existing, file_path, file_mtime, file_size_bytes, metadata)
-                            if comic:
-                                updated += 1
-                                pending_changes += 1
+        # Comics scanned before page maps / page dimensions existed need one archive read to build their index
+        missing_page_index = {path for path, snap in existing_map.items() if snap.needs_page_index}
 
-                        elif action == "import":
-                            # Pass pre-extracted metadata
-                            comic = self._import_comic(file_path, file_mtime, file_size_bytes, metadata)
-                            if comic:
-                                imported += 1
-                                pending_changes += 1
-                                existing_map[file_path_str] = comic
+        # Comics scanned before fingerprints existed get one cheap head/tail read
+        missing_fingerprint = {path for path, snap in existing_map.items() if not snap.fingerprint}
 
-                        # FORCE FLUSH: Validate constraints immediately
-                        if comic:
-                            self.db.flush()
+        # Track paths found on disk to identify deletions later
+        scanned_paths_on_disk = set()
 
-                    # --- BATCH COMMIT ---
-                    if comic:
-                        found_comics.append({
-                            "id": comic.id,
-                            "filename": comic.filename,
-                            "series": comic.volume.series.name if comic.volume and comic.volume.series else "Unknown",
-                            "pages": comic.page_count
-                        })
-
-                    # 2. OPTIMIZATION: Batch Commit
-                    # Only hit the disk once every BATCH_SIZE items
-                    if pending_changes >= BATCH_SIZE:
-                        self.logger.debug(f"Committing batch of {pending_changes} items...")
-                        self.db.commit()
-                        pending_changes = 0
-
-                except Exception as e:
-                    # Logic: The savepoint has already rolled back the DB changes for this specific file.
-                    # The session is clean and ready for the next file.
-                    errors.append({"file": str(file_path), "error": str(e)})
-                    self.logger.error(f"Error processing {file_path}: {e}")
-
-        # Commit remaining
-        if pending_changes > 0:
-            self.logger.debug(f"Committing final batch of {pending_changes} items...")
-            self.db.commit()
+        # 2. WALK (Producer): Decide what needs work without opening any archive.
+        # scandir-based: one stat per file, and folders whose mtime is unchanged aren't listed at all.
+        directory_index = self._load_directory_index()
+        if scope_roots is None:
+            files_on_disk, unchanged_paths, directory_snapshot, dirs_skipped = self._walk_library(
+                library_path, existing_map.keys(), directory_index, errors,
+                force=force, dirty_paths=missing_page_index | missing_fingerprint
+            )
+        else:
+            files_on_disk, unchanged_paths, directory_snapshot, dirs_skipped = self._walk_scope(
+                scope_roots, existing_map.keys(), directory_index, errors,
+                force=force, dirty_paths=missing_page_index | missing_fingerprint
+            )
+
+        # Files in skipped folders are known, present and unchanged
+        scanned_paths_on_disk.update(unchanged_paths)
+        skipped += len(unchanged_paths)
+
+        # work_items: (file_path, mtime, size, action)
+        work_items = []
+        fingerprint_backfill = []
+        page_index_backfill = []
+
+        for file_path_str, file_mtime, file_size_bytes in files_on_disk:
+            scanned_paths_on_disk.add(file_path_str)
+
+            # Check against our pre-fetched map
+            existing = existing_map.get(file_path_str)
+
+            if existing:
+                # Check modification time
+                if not force and existing.file_modified_at and existing.file_modified_at >= file_mtime:
+                    skipped += 1
+                    if file_path_str in missing_fingerprint:
+                        fingerprint_backfill.append((existing.id, file_path_str))
+                    if file_path_str in missing_page_index:
+                        page_index_backfill.append((existing.id, file_path_str))
+                    continue
+                work_items.append((Path(file_path_str), file_mtime, file_size_bytes, "update"))
+            else:
+                work_items.append((Path(file_path_str), file_mtime, file_size_bytes, "import"))
+
+        self._backfill_fingerprints(fingerprint_backfill, errors)
+        self._backfill_page_index(page_index_backfill, errors)
+
+        # Moved/renamed files: a known comic vanished and a new path has the same content.
+        # Re-point the existing row so reading progress, lists and thumbnails survive.
+        disappeared = {path: snap for path, snap in existing_map.items() if path not in scanned_paths_on_disk}
+        if disappeared and any(action == "import" for *_, action in work_items):
+            work_items, moved = self._relink_moved_comics(work_items, disappeared, existing_map, errors)
+
+        self.logger.info(f"Found {len(work_items)} new or modified file(s), {skipped} unchanged "
+                         f"({dirs_skipped} unchanged folder(s) not listed)")
+
+        def cover_changed(item) -> bool:
+            """New files and files whose content changed; a forced rescan of the same file keeps its cover"""
+            file_path, file_mtime, file_size_bytes, action = item
+            if action == "import":
+                return True
+            snapshot = existing_map[str(file_path)]
+            return snapshot.file_modified_at != file_mtime or snapshot.file_size != file_size_bytes
+
+        # Name -> id lookups for credits/tags/lists, loaded once instead of one SELECT per name
+        if work_items:
+            self._preload_link_names()
+
+            # Covers are rendered alongside the writes from bytes the workers already read
+            # (the THUMBNAIL job after the scan is only a backfill for anything missed)
+            if any(cover_changed(item) for item in work_items):
+                thumbnails = self._start_thumbnail_stream()
+            self.include_cover = thumbnails is not None
+
+        try:
+            # 3. EXTRACT (Process Pool) -> WRITE (This thread, single session) -> THUMBNAILS (Process Pool)
+            # Heavy archive I/O + XML parsing happens in the workers, completely outside the DB transaction.
+            # Results stream back as they finish, so the writer commits while workers keep extracting.
+            for item, metadata in self._iter_metadata(work_items, on_idle=commit_if_idle, wants_cover=cover_changed):
+                file_path, file_mtime, file_size_bytes, action = item
+
+                # Comics of a batch whose commit failed go first into the next one
+                while retry_items:
+                    write_item(retry_items.pop(0))
+
+                if not metadata:
+                    # Failed to extract, log and continue
+                    errors.append({"file": str(file_path), "error": "Failed to extract metadata"})
+                    continue
+
+                cover_bytes = metadata.pop('cover_bytes', None)
+                write_item((file_path, file_mtime, file_size_bytes, action, metadata, cover_bytes))
+
+            # Commit remaining (including a last retry of a batch whose commit failed)
+            while retry_items or batcher.pending > 0:
+                while retry_items:
+                    write_item(retry_items.pop(0))
+                if batcher.pending > 0:
+                    commit_batch()
+
+            # Wait for the last covers (write lock not held), applied with the final commit below
+            if thumbnails:
+                self._apply_thumbnails(covers + thumbnails.close())
+        finally:
+            # Aborted scan: still hand the image pool back (no-op after the close above)
+            if thumbnails:
+                thumbnails.close()
+            self.include_cover = False
+
+        # Remember folder mtimes so the next scan can skip unchanged ones
+        self._save_directory_index(directory_snapshot, errors, scope_roots=scope_roots, directory_index=directory_index)
 
         # Find and remove comics whose files no longer exist
         # We pass the set we built during the loop
@@ -200,29 +479,413 @@ class LibraryScanner:
             "found": len(found_comics),
             "imported": imported,
             "updated": updated,
+            "moved": moved,
             "deleted": deleted,
             "skipped": skipped,
+            "directories_skipped": dirs_skipped,
+            "scoped_paths": len(scope_roots) if scope_roots is not None else None,
+            "commits": batcher.stats(),
+            "thumbnails": thumbnails.stats() if thumbnails else None,
             "errors": len(errors),
             "comics": found_comics[:10],
             "error_details": errors[:5],
             "elapsed": elapsed_time
         }
 
-    def _cleanup_missing_files(self, scanned_paths_on_disk: set, existing_map: dict) -> int:
+    def _reset_write_state(self):
+        """After a rolled-back batch: drop cached ORM objects and name ids that may belong to it"""
+        self.series_cache.clear()
+        self.volume_cache.clear()
+        self.tag_service = TagService(self.db)
+        self.credit_service = CreditService(self.db)
+        self.reading_list_service = ReadingListService(self.db)
+        self.collection_service = CollectionService(self.db)
+        self.queued_links = []
+        self._preload_link_names()
+
+    def _walk_library(self, library_path: Path, known_paths, directory_index: Dict[str, Tuple[Optional[float], int]],
+                      errors: List[dict], force: bool = False, dirty_paths: Optional[set] = None,
+                      start_dirs: Optional[List[str]] = None) -> tuple:
+        """
+        Walk the library with os.scandir, reusing each DirEntry's stat result.
+        start_dirs: Walk only these folders (and below) instead of the library root.
+
+        A folder whose mtime matches the last successful scan (and still holds the same
+        number of known comics) is not listed: its files are reported as unchanged and
+        we only descend into its known subfolders (one stat each).
+        NOTE: A folder's mtime changes when entries are added/removed/renamed, not when a
+        file is rewritten in place. Force scans always list everything.
+
+        Returns: (files, unchanged_paths, directory_snapshot, dirs_skipped)
+            files: [(path, mtime, size)] for every comic in listed folders
+            unchanged_paths: known comic paths inside skipped folders
+            directory_snapshot: {dir_path: (mtime, file_count)} to persist after the scan
+        """
+        dirty_paths = dirty_paths or set()
+
+        # Known comics grouped by folder, and known subfolders grouped by parent
+        known_by_dir: Dict[str, List[str]] = {}
+        for path in known_paths:
+            known_by_dir.setdefault(os.path.dirname(path), []).append(path)
+
+        children_by_dir: Dict[str, List[str]] = {}
+        for dir_path in directory_index:
+            children_by_dir.setdefault(os.path.dirname(dir_path), []).append(dir_path)
+
+        files = []
+        unchanged_paths = []
+        directory_snapshot = {}
+        dirs_skipped = 0
+
+        stack = list(start_dirs) if start_dirs is not None else [str(library_path)]
+
+        while stack:
+            dir_path = stack.pop()
+
+            try:
+                # Stat BEFORE listing: if the folder changes mid-scan, the stored mtime is older
+                # than the real one and the next scan lists it again.
+                dir_mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                # Folder vanished; its comics are cleaned up as missing
+                continue
+
+            previous = directory_index.get(dir_path)
+            known_files = known_by_dir.get(dir_path, [])
+
+            unchanged = (
+                not force
+                and previous is not None
+                and previous[0] is not None
+                and previous[0] == dir_mtime
+                and previous[1] == len(known_files)
+                and not any(path in dirty_paths for path in known_files)
+            )
+
+            if unchanged:
+                dirs_skipped += 1
+                unchanged_paths.extend(known_files)
+                directory_snapshot[dir_path] = (dir_mtime, previous[1])
+                stack.extend(children_by_dir.get(dir_path, []))
+                continue
+
+            file_count = 0
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                stack.append(entry.path)
+                                continue
+
+                            if os.path.splitext(entry.name)[1].lower() not in self.supported_extensions:
+                                continue
+
+                            stat = entry.stat()
+                            files.append((entry.path, stat.st_mtime, stat.st_size))
+                            file_count += 1
+
+                        except OSError as e:
+                            errors.append({"file": entry.path, "error": str(e)})
+                            self.logger.error(f"Error processing {entry.path}: {e}")
+
+            except OSError as e:
+                errors.append({"file": dir_path, "error": str(e)})
+                self.logger.error(f"Error listing {dir_path}: {e}")
+                continue
+
+            directory_snapshot[dir_path] = (dir_mtime, file_count)
+
+        return files, unchanged_paths, directory_snapshot, dirs_skipped
+
+    def _resolve_scope(self, library_path: Path, paths: List[str]) -> Optional[set]:
+        """
+        Normalise a scan scope to absolute paths inside the library.
+        Returns None (full scan) if the scope is empty of usable paths or covers the library root.
+        Paths nested under another scoped folder are dropped (the folder walk covers them).
+        """
+        root = os.path.normpath(str(library_path))
+        roots = set()
+
+        for path in paths:
+            path = os.path.normpath(str(path))
+            if path == root:
+                return None
+            if path.startswith(root + os.sep):
+                roots.add(path)
+
+        if not roots:
+            return None
+
+        return {path for path in roots if not self._in_scope(os.path.dirname(path), roots)}
+
+    @staticmethod
+    def _in_scope(path: str, scope_roots: set) -> bool:
+        """True if path is a scope root or lies under one (checks each ancestor: O(depth))"""
+        while True:
+            if path in scope_roots:
+                return True
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+    def _walk_scope(self, scope_roots: set, known_paths, directory_index: Dict[str, Tuple[Optional[float], int]],
+                    errors: List[dict], force: bool = False, dirty_paths: Optional[set] = None) -> tuple:
+        """
+        Walk only the scoped paths: folders via _walk_library, files with a single stat.
+        Vanished paths yield nothing, so their comics are handled as missing (or moved).
+        Returns the same tuple as _walk_library.
+        """
+        scoped_dirs = [path for path in sorted(scope_roots) if os.path.isdir(path)]
+
+        # One walk over all scoped folders (known_paths is already limited to the scope)
+        files, unchanged_paths, directory_snapshot, dirs_skipped = self._walk_library(
+            Path(self.library.path), known_paths, directory_index, errors,
+            force=force, dirty_paths=dirty_paths, start_dirs=scoped_dirs
+        )
+
+        # Scoped files: one stat each. Missing ones were deleted (or moved away).
+        for path in sorted(scope_roots):
+            if os.path.splitext(path)[1].lower() in self.supported_extensions and os.path.isfile(path):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_mtime, stat.st_size))
+
+        return files, unchanged_paths, directory_snapshot, dirs_skipped
+
+    def _load_directory_index(self) -> Dict[str, Tuple[Optional[float], int]]:
+        """Folder mtimes from the last successful scan: {path: (mtime, file_count)}"""
+        rows = self.db.query(ScanDirectory.path, ScanDirectory.mtime, ScanDirectory.file_count).filter(
+            ScanDirectory.library_id == self.library.id
+        ).all()
+        return {row.path: (row.mtime, row.file_count or 0) for row in rows}
+
+    def _save_directory_index(self, directory_snapshot: Dict[str, Tuple[float, int]], errors: List[dict],
+                              scope_roots: Optional[set] = None,
+                              directory_index: Optional[Dict[str, Tuple[Optional[float], int]]] = None) -> None:
+        """
+        Replace the stored folder index with this scan's snapshot.
+        Folders containing a file that failed are stored without an mtime so they get retried.
+
+        Scoped scans only replace rows for folders inside the scope. Folders merely holding
+        a scoped file keep their old mtime, so the next full scan still lists them.
+        """
+        failed_dirs = {os.path.dirname(e["file"]) for e in errors if e.get("file")}
+
+        if scope_roots is None:
+            self.db.query(ScanDirectory).filter(ScanDirectory.library_id == self.library.id).delete(
+                synchronize_session=False
+            )
+        else:
+            stale = set(directory_snapshot)
+            stale.update(path for path in (directory_index or {}) if self._in_scope(path, scope_roots))
+            stale = list(stale)
+            for start in range(0, len(stale), DELETE_CHUNK_SIZE):
+                self.db.query(ScanDirectory).filter(
+                    ScanDirectory.library_id == self.library.id,
+                    ScanDirectory.path.in_(stale[start:start + DELETE_CHUNK_SIZE])
+                ).delete(synchronize_session=False)
+
+        self.db.bulk_insert_mappings(ScanDirectory, [
+            {
+                "library_id": self.library.id,
+                "path": dir_path,
+                "mtime": None if dir_path in failed_dirs else mtime,
+                "file_count": file_count
+            }
+            for dir_path, (mtime, file_count) in directory_snapshot.items()
+        ])
+        self.db.commit()
+
+    def _load_existing_snapshot(self) -> Dict[str, "ExistingComic"]:
+        """
+        Compact view of every comic in this library: {file_path: (id, mtime, size, needs_page_index, fingerprint)}.
+        Tuple query, so no ORM objects end up in the session identity map.
+        """
+        rows = self.db.query(
+            Comic.file_path,
+            Comic.id,
+            Comic.file_modified_at,
+            Comic.file_size,
+            # RAR/7z dimensions are read when the book is opened (page_dimensions_cache), not by a rescan
+            or_(Comic.page_map.is_(None),
+                and_(Comic.page_dimensions.is_(None), func.lower(Comic.file_path).like("%.cbz"))),
+            Comic.fingerprint
+        ).join(Volume).join(Series).filter(
+            Series.library_id == self.library.id
+        ).all()
+
+        return {row[0]: ExistingComic(row[1], row[2], row[3], bool(row[4]), row[5]) for row in rows}
+
+    def _backfill_fingerprints(self, items: List[Tuple[int, str]], errors: List[dict]) -> None:
+        """Fingerprint unchanged comics imported before fingerprints existed (one bulk UPDATE)"""
+        if not items:
+            return
+
+        mappings = []
+        for comic_id, file_path_str in items:
+            try:
+                mappings.append({"id": comic_id, "fingerprint": compute_fingerprint(Path(file_path_str))})
+            except OSError as e:
+                errors.append({"file": file_path_str, "error": f"Failed to fingerprint: {e}"})
+
+        self.db.bulk_update_mappings(Comic, mappings)
+        self.db.commit()
+        self.logger.debug(f"Backfilled {len(mappings)} fingerprint(s)")
+
+    def _backfill_page_index(self, items: List[Tuple[int, str]], errors: List[dict]) -> None:
+        """
+        Build page_map / page_dimensions for unchanged comics scanned before they existed.
+        Index columns only, one bulk UPDATE per chunk: no re-parse, no credit/tag rewrite.
+        """
+        if not items:
+            return
+
+        mappings = []
+        for (comic_id, file_path_str), index in zip(items, self._iter_page_index(items)):
+            if index is None:
+                errors.append({"file": file_path_str, "error": "Failed to build page index"})
+                continue
+            mappings.append({"id": comic_id, **index})
+
+        for chunk in chunked(mappings):
+            self.db.bulk_update_mappings(Comic, chunk)
+            self.db.commit()
+        self.logger.debug(f"Backfilled {len(mappings)} page index(es)")
+
+    def _iter_page_index(self, items: List[Tuple[int, str]]) -> Iterator[Optional[Dict]]:
+        """read_page_index for each item, in order (process pool for large backfills)"""
+        paths = [file_path_str for _, file_path_str in items]
+        workers = self._get_metadata_workers(len(paths))
+
+        if workers > 1:
+            try:
+                pool = multiprocessing.Pool(processes=workers)
+            except Exception as e:
+                self.logger.warning(f"Could not start page index worker pool, falling back to serial: {e}")
+                pool = None
+
+            if pool:
+                with pool:
+                    yield from pool.imap(read_page_index, paths, chunksize=8)
+                return
+
+        for file_path_str in paths:
+            yield read_page_index(file_path_str)
+
+    def _relink_moved_comics(self, work_items: list, disappeared: Dict[str, "ExistingComic"],
+                             existing_map: Dict[str, "ExistingComic"], errors: List[dict]) -> Tuple[list, int]:
+        """
+        Match new files against comics whose path disappeared, by content fingerprint.
+        Matches update file_path/filename in place (same id => progress, list entries,
+        thumbnail and cached pages are kept) and are removed from work_items.
+        Ambiguous fingerprints (duplicate files) are left to the normal delete + import.
+
+        Returns: (remaining work_items, moved count)
+        """
+        # fingerprint -> disappeared paths carrying it
+        candidates: Dict[str, List[str]] = {}
+        for path, snap in disappeared.items():
+            if snap.fingerprint:
+                candidates.setdefault(snap.fingerprint, []).append(path)
+
+        if not candidates:
+            return work_items, 0
+
+        # Size is part of the fingerprint: skip hashing files that can't match
+        candidate_sizes = {disappeared[paths[0]].file_size for paths in candidates.values()}
+
+        # fingerprint -> new files carrying it
+        new_files: Dict[str, list] = {}
+        for item in work_items:
+            file_path, _, file_size_bytes, action = item
+            if action != "import" or file_size_bytes not in candidate_sizes:
+                continue
+
+            try:
+                fingerprint = compute_fingerprint(file_path)
+            except OSError:
+                continue
+            if fingerprint in candidates:
+                new_files.setdefault(fingerprint, []).append(item)
+
+        relinked = set()
+        for fingerprint, items in new_files.items():
+            old_paths = candidates[fingerprint]
+            if len(old_paths) != 1 or len(items) != 1:
+                continue
+
+            old_path = old_paths[0]
+            file_path, file_mtime, file_size_bytes, _ = items[0]
+            snapshot = existing_map[old_path]
+
+            try:
+                with self.db.begin_nested():
+                    comic = self.db.get(Comic, snapshot.id)
+                    comic.file_path = str(file_path)
+                    comic.filename = file_path.name
+                    comic.file_modified_at = file_mtime
+                    comic.file_size = file_size_bytes
+
+                    # Same bytes, so page offsets are still valid; only the mtime stamp moves
+                    if comic.page_map:
+                        comic.page_map = {**comic.page_map, "mtime": file_mtime}
+
+                    self.db.flush()
+            except Exception as e:
+                errors.append({"file": str(file_path), "error": f"Failed to relink moved comic: {e}"})
+                continue
+
+            self.logger.info(f"Detected move: {os.path.basename(old_path)} -> {file_path.name}")
+
+            # The old path is now accounted for; the new one is known under the same id
+            del existing_map[old_path]
+            existing_map[str(file_path)] = snapshot._replace(file_modified_at=file_mtime, file_size=file_size_bytes)
+            relinked.add(str(file_path))
+
+        if relinked:
+            self.db.commit()
+
+        return [item for item in work_items if str(item[0]) not in relinked], len(relinked)
+
+    def _cleanup_missing_files(self, scanned_paths_on_disk: set, existing_map: Dict[str, "ExistingComic"]) -> int:
         """Remove comics from DB whose files no longer exist"""
-        deleted = 0
+        missing_ids = []
 
-        # Iterate over the map of comics we knew about at start
-        for file_path, comic in existing_map.items():
+        # Iterate over the snapshot of comics we knew about at start
+        for file_path, snapshot in existing_map.items():
             if file_path not in scanned_paths_on_disk:
-                self.logger.info(f"Removing deleted comic: {comic.filename}")
-                self.db.delete(comic)
-                deleted += 1
+                self.logger.info(f"Removing deleted comic: {os.path.basename(file_path)}")
+                missing_ids.append(snapshot.id)
 
-        if deleted > 0:
+        if missing_ids:
+            self._delete_comics(missing_ids)
             self.db.commit()
 
-        return deleted
+        return len(missing_ids)
+
+    def _delete_comics(self, comic_ids: List[int]) -> None:
+        """
+        Bulk delete comics by id, in chunks.
+        Query.delete() skips ORM cascades (and SQLite doesn't enforce FK cascades here),
+        so dependent rows are removed explicitly first.
+        """
+        dependent_tables = [comic_characters, comic_teams, comic_locations, comic_genres]
+        dependent_models = [ComicCredit, ReadingListItem, CollectionItem, ReadingProgress, PullListItem]
+
+        for start in range(0, len(comic_ids), DELETE_CHUNK_SIZE):
+            chunk = comic_ids[start:start + DELETE_CHUNK_SIZE]
+
+            for table in dependent_tables:
+                self.db.execute(table.delete().where(table.c.comic_id.in_(chunk)))
+
+            for model in dependent_models:
+                self.db.query(model).filter(model.comic_id.in_(chunk)).delete(synchronize_session=False)
+
+            self.db.query(Comic).filter(Comic.id.in_(chunk)).delete(synchronize_session=False)
 
     def _import_comic(self, file_path: Path, file_mtime: float, file_size_bytes: int, metadata: Dict) -> Optional[
         Comic]:
@@ -254,6 +917,9 @@ class LibraryScanner:
             file_modified_at=file_mtime,
             file_size=file_size_bytes,
             page_count=metadata['page_count'],
+            page_map=metadata.get('page_map'),
+            page_dimensions=metadata.get('page_dimensions'),
+            fingerprint=metadata.get('fingerprint'),
 
             # Basic info
             number=clean_number,
@@ -295,34 +961,8 @@ class LibraryScanner:
         # but keeps the transaction open for the batch.
         self.db.flush()
 
-        # Add credits
-        self.credit_service.add_credits_to_comic(comic, metadata)
-
-        # Tags
-        if metadata.get('characters'):
-            comic.characters = self.tag_service.get_or_create_characters(metadata.get('characters'))
-
-        if metadata.get('teams'):
-            comic.teams = self.tag_service.get_or_create_teams(metadata.get('teams'))
-
-        if metadata.get('locations'):
-            comic.locations = self.tag_service.get_or_create_locations(metadata.get('locations'))
-
-        if metadata.get('genre'):
-            comic.genres = self.tag_service.get_or_create_genres(metadata.get('genre'))
-
-        # Reading lists
-        self.reading_list_service.update_comic_reading_lists(
-            comic,
-            metadata.get('alternate_series'),
-            metadata.get('alternate_number')
-        )
-
-        # Collections
-        self.collection_service.update_comic_collections(
-            comic,
-            metadata.get('series_group')
-        )
+        # Credits, tags, reading lists and collections are queued by the scan loop
+        # and bulk-written once per batch (see _queue_links / _flush_links)
 
         # Touch Parent Series to update 'updated_at'
         # This ensures it shows up in "Recently Updated"
@@ -359,6 +999,9 @@ class LibraryScanner:
         comic.file_modified_at = file_mtime
         comic.file_size = file_size_bytes
         comic.page_count = metadata['page_count']
+        comic.page_map = metadata.get('page_map')
+        comic.page_dimensions = metadata.get('page_dimensions')
+        comic.fingerprint = metadata.get('fingerprint')
         comic.number = clean_number
         comic.title = metadata.get('title')
         comic.summary = metadata.get('summary')
@@ -382,34 +1025,7 @@ class LibraryScanner:
         comic.metadata_json = json.dumps(metadata.get('raw_metadata', {}))
         comic.updated_at = datetime.now(timezone.utc)
 
-        # Update credits
-        self.credit_service.add_credits_to_comic(comic, metadata)
-
-        # Tags
-        comic.characters.clear()
-        comic.teams.clear()
-        comic.locations.clear()
-        comic.genres.clear()
-
-        if metadata.get('characters'):
-            comic.characters = self.tag_service.get_or_create_characters(metadata.get('characters'))
-        if metadata.get('teams'):
-            comic.teams = self.tag_service.get_or_create_teams(metadata.get('teams'))
-        if metadata.get('locations'):
-            comic.locations = self.tag_service.get_or_create_locations(metadata.get('locations'))
-        if metadata.get('genre'):
-            comic.genres = self.tag_service.get_or_create_genres(metadata.get('genre'))
-
-        self.reading_list_service.update_comic_reading_lists(
-            comic,
-            metadata.get('alternate_series'),
-            metadata.get('alternate_number')
-        )
-
-        self.collection_service.update_comic_collections(
-            comic,
-            metadata.get('series_group')
-        )
+        # Credits, tags, reading lists and collections are replaced in bulk by the scan loop
 
         # Touch Parent Series
         series.updated_at = datetime.now(timezone.utc)
@@ -418,37 +1034,153 @@ class LibraryScanner:
 
         return comic
 
-    def _extract_metadata(self, file_path: Path) -> Optional[Dict]:
-        """Extract metadata from comic archive"""
+    def _preload_link_names(self):
+        self.credit_service.preload()
+        self.tag_service.preload()
+        self.reading_list_service.preload()
+        self.collection_service.preload()
+
+    def _queue_links(self, comic_id: int, metadata: Dict, replace: bool = False, file_path: str = ""):
+        """Queue credits, tags, reading list and collection rows for the next batch write"""
+        self.queued_links.append((comic_id, file_path, metadata, replace))
+        self._queue_link_rows(comic_id, metadata, replace)
+
+    def _queue_link_rows(self, comic_id: int, metadata: Dict, replace: bool):
+        self.credit_service.queue_comic_credits(comic_id, metadata, replace)
+        self.tag_service.queue_comic_tags(comic_id, metadata, replace)
+        self.reading_list_service.queue_comic_lists(
+            comic_id,
+            metadata.get('alternate_series'),
+            metadata.get('alternate_number'),
+            replace
+        )
+        self.collection_service.queue_comic_collection(comic_id, metadata.get('series_group'), replace)
+
+    def _flush_links(self, errors: Optional[List[dict]] = None):
+        """
+        Write everything queued since the last batch: one DELETE per table for updated comics,
+        one INSERT per lookup table for new names, one executemany INSERT per association table.
+
+        The bulk write runs in a savepoint. If it fails, the batch's comics are still committed:
+        their links are retried one comic per savepoint, and only the failing comics are reported.
+        """
+        queued, self.queued_links = self.queued_links, []
+
         try:
-            with ComicArchive(file_path) as archive:
-                pages = archive.get_pages()
+            with self.db.begin_nested():
+                self._write_queued_links()
+            return
+        except Exception as e:
+            self.logger.warning(f"Bulk link write for {len(queued)} comic(s) failed, retrying one by one: {e}")
+            self._discard_queued_links()
+
+        for comic_id, file_path, metadata, replace in queued:
+            try:
+                with self.db.begin_nested():
+                    self._queue_link_rows(comic_id, metadata, replace)
+                    self._write_queued_links()
+            except Exception as e:
+                self._discard_queued_links()
+                self.logger.error(f"Failed to write credits/tags for {file_path or comic_id}: {e}")
+                if errors is not None:
+                    errors.append({"file": file_path, "error": f"Failed to write credits/tags: {e}"})
+
+    def _write_queued_links(self):
+        self.credit_service.flush_queued()
+        self.tag_service.flush_queued()
+        self.reading_list_service.flush_queued()
+        self.collection_service.flush_queued()
+
+    def _discard_queued_links(self):
+        """Drop the rolled-back rows and reload name ids (names inserted by the failed write are gone)"""
+        for service in (self.credit_service, self.tag_service, self.reading_list_service, self.collection_service):
+            service.discard_queued()
+        self._preload_link_names()
+
+    def _extract_metadata(self, file_path: Path, include_cover: bool = False) -> Optional[Dict]:
+        """Extract metadata from comic archive"""
+        return extract_comic_metadata(file_path, include_cover=include_cover)
 
-                if not pages:
-                    self.logger.warning(f"Warning: No valid image pages found in {file_path.name}")
-                    return None
+    def _start_thumbnail_stream(self) -> Optional[ScanThumbnailStream]:
+        """Thumbnail stream for this scan (scanning.stream_thumbnails), on the shared image worker pool"""
+        if not get_cached_setting("scanning.stream_thumbnails", True):
+            return None
 
-                comicinfo_xml = archive.get_comicinfo()
+        try:
+            return ScanThumbnailStream(widths=get_thumbnail_widths())
+        except Exception as e:
+            self.logger.warning(f"Could not start thumbnail stream, covers will be backfilled after the scan: {e}")
+            return None
 
-                # 1. Establish Physical Truth of page count
-                physical_count = len(pages)
-                metadata = {'page_count': physical_count}
+    def _apply_thumbnails(self, results: List[Dict]) -> None:
+        """Write finished stream results (thumbnail path, cover hash, colors) in one bulk UPDATE"""
+        if results:
+            apply_thumbnail_results(self.db, results)
 
-                if comicinfo_xml:
-                    parsed = parse_comicinfo(comicinfo_xml)
-                    metadata.update(parsed)
+    def _get_metadata_workers(self, item_count: int) -> int:
+        """
+        Resolve the worker count for metadata extraction.
+        Mirrors the thumbnail worker logic: 0 = Auto (50% of cores).
+        """
+        # Not worth spinning up processes for a handful of files
+        if item_count < PARALLEL_MIN_ITEMS:
+            return 1
 
-                    # Force overwrite: Always use physical count for this field.
-                    # We trust the file system over the XML tag for navigational safety in the reader.
-                    metadata['page_count'] = physical_count
+        requested_workers = int(get_cached_setting("scanning.metadata_workers", 0))
+        max_cores = multiprocessing.cpu_count() or 1
 
-                    metadata['raw_metadata'] = parsed
+        if requested_workers <= 0:
+            # AUTO MODE: Leave headroom for the web workers
+            return max(1, max_cores // 2)
 
-                return metadata
+        return min(requested_workers, max_cores)
 
-        except Exception as e:
-            self.logger.error(f"Error extracting metadata from {file_path}: {e}")
-            return None
+    def _iter_metadata(self, work_items: List[tuple],
+                       on_idle: Optional[Callable[[], None]] = None,
+                       wants_cover: Optional[Callable[[tuple], bool]] = None) -> Iterator[Tuple[tuple, Optional[Dict]]]:
+        """
+        Yield (work_item, metadata) for every item.
+        PARALLEL: Fans out archive opening + ComicInfo parsing to a process pool.
+        SERIAL: Fallback for small batches, 1 configured worker, or if the pool can't start.
+        on_idle: Called when no result is ready, before blocking on the pool (lets the writer commit).
+        wants_cover: Items whose cover bytes are read (while include_cover is set); default all.
+        """
+        def include_cover(item) -> bool:
+            return self.include_cover and (wants_cover is None or wants_cover(item))
+
+        workers = self._get_metadata_workers(len(work_items))
+
+        if workers > 1:
+            try:
+                pool = multiprocessing.Pool(processes=workers)
+            except Exception as e:
+                self.logger.warning(f"Could not start metadata worker pool, falling back to serial: {e}")
+                pool = None
+
+            if pool:
+                self.logger.info(f"Extracting metadata with {workers} worker(s)")
+                with pool:
+                    tasks = [(index, str(item[0]), include_cover(item)) for index, item in enumerate(work_items)]
+                    # Unordered: a slow omnibus doesn't hold up the writer.
+                    # chunksize=1 keeps the pool's own iterator, whose next() takes a timeout.
+                    results = pool.imap_unordered(_metadata_worker, tasks)
+                    while True:
+                        try:
+                            index, metadata = results.next(timeout=IDLE_COMMIT_WAIT)
+                        except multiprocessing.TimeoutError:
+                            if on_idle:
+                                on_idle()
+                            try:
+                                index, metadata = results.next()
+                            except StopIteration:
+                                break
+                        except StopIteration:
+                            break
+                        yield work_items[index], metadata
+                return
+
+        for item in work_items:
+            yield item, self._extract_metadata(item[0], include_cover=include_cover(item))
 
     def _get_or_create_series(self, name: str) -> Series:
         """Get existing series or create new one with Caching"""
@@ -495,23 +1227,6 @@ class LibraryScanner:
         self.volume_cache[cache_key] = volume
         return volume
 
-    def _generate_thumbnail(self, comic: Comic) -> None:
-        try:
-            storage_path = Path("./storage/cover")
-            thumbnail_filename = f"comic_{comic.id}.webp"
-            target_path = storage_path / thumbnail_filename
-
-            # Use service to generate and save directly to target
-            success = self.image_service.generate_thumbnail(comic.file_path, target_path)
-
-            if success:
-                comic.thumbnail_path = str(target_path)
-                # Note: No commit needed here as batch loop handles it,
-                # or flush() in import_comic handles the object state.
-
-        except Exception as e:
-            print(f"Failed to generate thumbnail for {comic.filename}: {e}")
-
     def _normalize_number(self, number: str) -> str:
         """Normalize weird comic numbers"""
         if not number:
@@ -65,6 +65,25 @@ class SettingsService:
             "label": "Scan Batch Window (Sec)",
             "description": "Time to wait for file operations to settle."
         },
+        {
+            "key": "scanning.metadata_workers", "value": "0",
+            "category": "scanning", "data_type": "select",
+            "label": "Metadata Extraction Workers",
+            "description": "CPU cores used to open archives and read ComicInfo during scans. 1 = serial.",
+            "options": generate_worker_options()
+        },
+        {
+            "key": "scanning.commit_budget_ms", "value": "200",
+            "category": "scanning", "data_type": "int",
+            "label": "Write Transaction Budget (ms)",
+            "description": "Longest time a scan holds the database write lock before committing. Lower keeps the reader responsive during big imports."
+        },
+        {
+            "key": "scanning.stream_thumbnails", "value": "true",
+            "category": "scanning", "data_type": "bool",
+            "label": "Generate Covers During Scan",
+            "description": "Render thumbnails while the scan runs, from the cover it already read. New issues show covers without waiting for the scan to finish."
+        },
         {
             "key": "ui.login_background_style", "value": "random_covers",
             "category": "appearance", "data_type": "select",
@@ -171,6 +190,48 @@ class SettingsService:
             "description": "Control how many CPU cores are used for thumbnail generation.",
             "options": generate_worker_options()
         },
+        {
+            "key": "system.thumbnail_widths",
+            "value": "160,320,640",
+            "category": "system",
+            "data_type": "string",
+            "label": "Thumbnail Sizes (px wide)",
+            "description": "Comma separated cover thumbnail widths generated per comic. Clients pick one with ?w=. 320 is always kept."
+        },
+        {
+            "key": "system.extraction_cache_enabled",
+            "value": "false",
+            "category": "system",
+            "data_type": "bool",
+            "label": "Enable CBR/CB7 Page Cache",
+            "description": "Extract CBR/CB7 books to disk on first read so later pages load as fast as CBZ."
+        },
+        {
+            "key": "system.extraction_cache_size_mb",
+            "value": "2048",
+            "category": "system",
+            "data_type": "int",
+            "label": "CBR/CB7 Page Cache Size (MB)",
+            "description": "Least recently read books are removed when the cache grows past this size.",
+            "depends_on": { "key": "system.extraction_cache_enabled", "value": True }
+        },
+        {
+            "key": "system.page_cache_enabled",
+            "value": "true",
+            "category": "system",
+            "data_type": "bool",
+            "label": "Enable Processed Page Cache",
+            "description": "Keep sharpened, grayscale and WebP-converted reader pages on disk so re-reading a book doesn't process them again."
+        },
+        {
+            "key": "system.page_cache_size_mb",
+            "value": "1024",
+            "category": "system",
+            "data_type": "int",
+            "label": "Processed Page Cache Size (MB)",
+            "description": "Least recently read pages are removed when the cache grows past this size.",
+            "depends_on": { "key": "system.page_cache_enabled", "value": True }
+        },
         {
             "key": "system.task.scan.interval",
             "value": "daily",
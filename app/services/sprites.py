@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import portalocker
+from PIL import Image
+
+from app.config import settings
+from app.services.images import ImageService
+
+# One grid page worth of covers
+SPRITE_MAX_ITEMS = 100
+SPRITE_COLUMNS = 10
+
+# Oldest sheets are dropped past this many (each is a few hundred KB)
+SPRITE_CACHE_MAX_FILES = 500
+
+SPRITE_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class SpriteCache:
+    """
+    Cover sprite sheets: one WebP per ordered page of comic ids, plus its JSON layout.
+
+    The key covers the ids, the cell width and every source cover's path + mtime, so a
+    regenerated cover gives a new key instead of a stale sheet. Sheets are immutable.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_files: int = SPRITE_CACHE_MAX_FILES):
+        self.root = Path(root or settings.cache_dir / "sprites")
+        self.max_files = max_files
+
+        # Per-key locks for builds in progress (this worker)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @staticmethod
+    def make_key(covers: List[Tuple[int, Optional[Path]]], width: int) -> str:
+        parts = [str(width)]
+        for comic_id, path in covers:
+            try:
+                stamp = f"{path}:{path.stat().st_mtime_ns}" if path else "-"
+            except OSError:
+                stamp = "-"
+            parts.append(f"{comic_id}={stamp}")
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+    def image_path(self, key: str) -> Path:
+        return self.root / f"{key}.webp"
+
+    def layout_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get_layout(self, key: str) -> Optional[Dict]:
+        """Cached layout, only if its sheet is still there"""
+        try:
+            if self.image_path(key).exists():
+                return json.loads(self.layout_path(key).read_text())
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def get_or_build(self, key: str, covers: List[Tuple[int, Optional[Path]]], width: int) -> Dict:
+        """
+        Cached layout, else build the sheet. Single-flight: concurrent misses for the same key
+        (threads of this worker, then other workers through a lock file) wait for one build.
+        """
+        layout = self.get_layout(key)
+        if layout is not None:
+            return layout
+
+        with self._key_lock(key), self._file_lock(key):
+            # Built by whoever held the lock before us
+            layout = self.get_layout(key)
+            if layout is None:
+                available = [(comic_id, path) for comic_id, path in covers if path]
+                sheet, layout = build_sprite(available, width)
+                layout["missing"] += [comic_id for comic_id, path in covers if not path]
+                self.put(key, sheet, layout)
+
+        with self._locks_guard:
+            self._locks.pop(key, None)
+        return layout
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / f".{key}.lock", "a") as lock_file:
+            portalocker.lock(lock_file, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                portalocker.unlock(lock_file)
+
+    def put(self, key: str, sheet: bytes, layout: Dict) -> None:
+        """Write sheet then layout (each atomically), so a readable layout always has its sheet"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        for path, data in ((self.image_path(key), sheet), (self.layout_path(key), json.dumps(layout).encode())):
+            tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+        self._trim()
+
+    def _trim(self) -> None:
+        sheets = list(self.root.glob("*.webp"))
+        if len(sheets) <= self.max_files:
+            return
+
+        sheets.sort(key=lambda p: p.stat().st_mtime)
+        for path in sheets[:len(sheets) - self.max_files]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+            path.with_name(f".{path.stem}.lock").unlink(missing_ok=True)
+
+
+def build_sprite(covers: List[Tuple[int, Optional[Path]]], width: int,
+                 columns: int = SPRITE_COLUMNS) -> Tuple[bytes, Dict]:
+    """
+    Paste covers into a grid of fixed cells (the rendition box for `width`), in order.
+    Each cover keeps its aspect ratio and sits top-left in its cell; the layout has its
+    exact rectangle. Covers that are missing or unreadable are listed in "missing".
+    """
+    cell_w, cell_h = ImageService().rendition_size(width)
+    tiles = []
+    missing = []
+
+    for comic_id, path in covers:
+        try:
+            with Image.open(path) as img:
+                img.draft('RGB', (cell_w, cell_h))
+                tile = img.convert('RGB')
+            tile.thumbnail((cell_w, cell_h), Image.Resampling.LANCZOS)
+            tiles.append((comic_id, tile))
+        except Exception:
+            missing.append(comic_id)
+
+    columns = max(1, min(columns, len(tiles)))
+    rows = max(1, -(-len(tiles) // columns))
+    sheet = Image.new('RGB', (columns * cell_w, rows * cell_h), (17, 24, 39))
+
+    items = []
+    for n, (comic_id, tile) in enumerate(tiles):
+        x, y = (n % columns) * cell_w, (n // columns) * cell_h
+        sheet.paste(tile, (x, y))
+        items.append({"comic_id": comic_id, "x": x, "y": y, "w": tile.width, "h": tile.height})
+
+    output = BytesIO()
+    sheet.save(output, format='WEBP', quality=80, method=4)
+
+    layout = {
+        "width": sheet.width,
+        "height": sheet.height,
+        "cell": {"w": cell_w, "h": cell_h},
+        "items": items,
+        "missing": missing,
+    }
+    return output.getvalue(), layout
+
+
+# Global instance
+sprite_cache = SpriteCache()
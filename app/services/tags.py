@@ -1,10 +1,20 @@
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from app.models import Character, Team, Location, Genre
+from app.models.tags import comic_characters, comic_teams, comic_locations, comic_genres
+from app.services.bulk import insert_ignore, ensure_names, delete_for_comics
 
 class TagService:
     """Service for managing tags with Caching and Deferred Commits"""
 
+    # Bulk ingest: metadata key -> (model, association table, FK column)
+    BULK_TAGS = {
+        'characters': (Character, comic_characters, 'character_id'),
+        'teams': (Team, comic_teams, 'team_id'),
+        'locations': (Location, comic_locations, 'location_id'),
+        'genre': (Genre, comic_genres, 'genre_id'),
+    }
+
     def __init__(self, db: Session):
         self.db = db
         # Cache to store objects by name to avoid DB lookups
@@ -13,6 +23,11 @@ class TagService:
         self.location_cache: Dict[str, Location] = {}
         self.genre_cache: Dict[str, Genre] = {}
 
+        # Bulk ingest state (see preload / queue_comic_tags / flush_queued)
+        self.name_ids: Dict[str, Dict[str, int]] = {}
+        self.pending_links: Dict[str, List[Tuple[int, str]]] = {key: [] for key in self.BULK_TAGS}
+        self.pending_replace: List[int] = []
+
     def get_or_create_character(self, name: str) -> Character:
         name = name.strip()
         if not name:
@@ -118,3 +133,53 @@ class TagService:
         unique_names = list(dict.fromkeys(name_list))
         return [self.get_or_create_genre(n) for n in unique_names if n]
 
+    # --- Bulk ingest (scanner) ---
+    # Names are resolved to ids from dicts preloaded once per scan; links for a whole
+    # batch are written with one executemany per table instead of per-comic ORM flushes.
+
+    def preload(self):
+        """Load every tag name -> id once (a few thousand rows at most)"""
+        self.name_ids = {
+            key: dict(self.db.query(model.name, model.id).all())
+            for key, (model, _, _) in self.BULK_TAGS.items()
+        }
+
+    def queue_comic_tags(self, comic_id: int, metadata: Dict, replace: bool = False):
+        """Queue the tag links of one comic; nothing is written until flush_queued()"""
+        if replace:
+            self.pending_replace.append(comic_id)
+
+        for key in self.BULK_TAGS:
+            for name in self._split_names(metadata.get(key)):
+                self.pending_links[key].append((comic_id, name))
+
+    def flush_queued(self):
+        """Write queued tags: replace old links, insert new names, then insert links"""
+        if self.pending_replace:
+            for _, table, _ in self.BULK_TAGS.values():
+                delete_for_comics(self.db, table, self.pending_replace)
+            self.pending_replace = []
+
+        for key, (model, table, column) in self.BULK_TAGS.items():
+            links = self.pending_links[key]
+            if not links:
+                continue
+
+            name_ids = self.name_ids.setdefault(key, {})
+            ensure_names(self.db, model, (name for _, name in links), name_ids)
+
+            insert_ignore(self.db, table, [
+                {"comic_id": comic_id, column: name_ids[name]} for comic_id, name in links
+            ])
+            self.pending_links[key] = []
+
+    def discard_queued(self):
+        """Drop queued rows without writing them (after a failed flush was rolled back)"""
+        self.pending_links = {key: [] for key in self.BULK_TAGS}
+        self.pending_replace = []
+
+    @staticmethod
+    def _split_names(names: Optional[str]) -> List[str]:
+        if not names:
+            return []
+        return list(dict.fromkeys(n.strip() for n in names.split(',') if n.strip()))
@@ -0,0 +1,127 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Per-worker budget: ~1500 base (320px) covers, enough for the home rails and login backgrounds
+THUMBNAIL_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Larger files (big renditions) are streamed from disk instead of being held in memory
+THUMBNAIL_CACHE_MAX_ITEM_BYTES = 512 * 1024
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """Strong validator from the file's mtime and size (the cover's version)"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+class ThumbnailCache:
+    """
+    Per-worker LRU of thumbnail bytes, keyed by file path.
+
+    Content-addressed store files never change under the same name, so hits for them
+    skip the filesystem entirely (immutable=True). Other paths (legacy / self-healed files)
+    are re-validated with one stat per hit, so a regenerated cover is picked up at once.
+    """
+
+    def __init__(self, max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES,
+                 max_item_bytes: int = THUMBNAIL_CACHE_MAX_ITEM_BYTES):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: Path, immutable: bool = False) -> Optional[Tuple[str, Optional[bytes]]]:
+        """
+        (etag, data) for an existing thumbnail, None if the file doesn't exist.
+        data is None for files too large to cache (serve them from disk).
+        """
+        key = str(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and immutable:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        try:
+            stat_result = os.stat(key)
+        except OSError:
+            self._drop(key)
+            return None
+
+        etag = make_etag(stat_result)
+        if entry is not None and entry[0] == etag:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+        with self._lock:
+            self.misses += 1
+
+        if stat_result.st_size > self.max_item_bytes:
+            return etag, None
+
+        try:
+            with open(key, "rb") as f:
+                # fstat: the validator matches the bytes actually read, even if the file was just replaced
+                etag = make_etag(os.fstat(f.fileno()))
+                data = f.read()
+        except OSError:
+            self._drop(key)
+            return None
+
+        self._put(key, etag, data)
+        return etag, data
+
+    def _put(self, key: str, etag: str, data: bytes) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+
+            self._entries[key] = (etag, data)
+            self._size += len(data)
+
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Global instance (per worker)
+thumbnail_cache = ThumbnailCache()
@@ -1,68 +1,57 @@
 import logging
+import time
+from functools import partial
 from pathlib import Path
-import multiprocessing
-from multiprocessing import Queue
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Optional, Callable
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
 
 from app.core.settings_loader import get_cached_setting
-from app.database import SessionLocal, engine
 from app.models.comic import Comic, Volume
 from app.models.library import Library
 from app.models.series import Series
-from app.services.images import ImageService
+from app.services.bulk import AdaptiveCommitBatcher
+from app.services.images import ImageService, get_thumbnail_widths
+from app.services.image_pool import image_worker_pool, IMAGE_QUEUE_DEPTH
 
+# Per worker process: reused across tasks (workers are recycled by the pool)
+_worker_image_service: Optional[ImageService] = None
 
-def _apply_batch(db, batch, stats_queue):
-    """
-    Apply a batch of updates to the DB.
-    This runs inside the dedicated Writer process.
-    """
-    from app.models.comic import Comic
-
-    for item in batch:
-
-        comic_id = item.get("comic_id")
-
-        if item.get("error"):
-            stats_queue.put({"comic_id": comic_id, "status": "error"})
-            continue
 
-        # Fetch object to update
-        comic = db.query(Comic).get(comic_id)
-        if not comic:
-            stats_queue.put({"comic_id": comic_id, "status": "missing"})
-            continue
+def _get_worker_image_service() -> ImageService:
+    global _worker_image_service
+    if _worker_image_service is None:
+        _worker_image_service = ImageService()
+    return _worker_image_service
 
-        # Update fields
-        comic.thumbnail_path = item.get("thumbnail_path")
-        palette = item.get("palette")
 
-        if palette:
-            comic.color_primary = palette.get("primary")
-            comic.color_secondary = palette.get("secondary")
-            comic.color_palette = palette
+def _apply_batch(db, batch: List[Dict[str, Any]], batcher: AdaptiveCommitBatcher = None) -> None:
+    """
+    Apply a batch of successful worker results to the DB in one bulk UPDATE + commit.
+    Comics deleted in the meantime are skipped (see apply_thumbnail_results).
+    """
+    if batcher:
+        batcher.add(len(batch))
 
-        stats_queue.put({"comic_id": comic_id, "status": "processed"})
+    apply_thumbnail_results(db, batch)
 
     # Commit the batch (Single Transaction)
-    db.commit()
+    if batcher:
+        batcher.commit(db)
+    else:
+        db.commit()
 
 
-def _thumbnail_worker(task: Tuple[int, str]) -> Dict[str, Any]:
+def _thumbnail_worker(task: Tuple[int, str], widths: Optional[List[int]] = None) -> Dict[str, Any]:
     """
-    Pure CPU worker: generates thumbnail + palette.
+    Pure CPU worker: generates thumbnail renditions + palette.
     Does NOT touch the database.
     """
     comic_id, file_path = task
-    # Import here to avoid issues after fork
-    from app.services.images import ImageService
-
-    image_service = ImageService()
-    target_path = Path(f"./storage/cover/comic_{comic_id}.webp")
+    from app.services.cover_store import cover_store
 
     try:
-        result = image_service.process_cover(str(file_path), target_path)
+        result = _get_worker_image_service().render_cover(str(file_path), widths=widths)
 
         if not result.get("success"):
             return {
@@ -71,9 +60,14 @@ def _thumbnail_worker(task: Tuple[int, str]) -> Dict[str, Any]:
                 "message": "Image processing failed"
             }
 
+        # Content-addressed: identical covers end up as the same files
+        cover_hash, deduplicated = cover_store.put(result["renditions"])
+
         return {
             "comic_id": comic_id,
-            "thumbnail_path": str(target_path),
+            "thumbnail_path": str(cover_store.path_for(cover_hash)),
+            "cover_hash": cover_hash,
+            "deduplicated": deduplicated,
             "palette": result.get("palette"),
             "error": False,
         }
@@ -87,61 +81,133 @@ def _thumbnail_worker(task: Tuple[int, str]) -> Dict[str, Any]:
         }
 
 
-def _thumbnail_writer(queue: Queue, stats_queue: Queue, batch_size: int = 25) -> None:
+def _cover_bytes_worker(task: Tuple[int, bytes], widths: Optional[List[int]] = None) -> Dict[str, Any]:
     """
-    Dedicated writer process: reads worker results and applies DB updates.
-    OPTIMIZED: batch_size lowered to 25 to prevent holding the lock too long.
+    Pool worker for covers the scanner already read: renders + stores renditions from bytes.
+    Same result shape as _thumbnail_worker.
     """
-
-    # CRITICAL Dispose inherited connections
-    engine.dispose()
-
-    from app.database import SessionLocal
-
-    db = SessionLocal()
-    processed = 0
-    errors = 0
-    skipped = 0
-    batch = []
+    comic_id, cover_bytes = task
+    from app.services.cover_store import cover_store
 
     try:
-        while True:
-            # Block until an item is available
-            item = queue.get()
-
-            # Sentinel value means "All workers are done"
-            if item is None:
-                break
+        result = _get_worker_image_service().render_cover_bytes(cover_bytes, widths=widths)
+        if not result.get("success"):
+            return {"comic_id": comic_id, "error": True, "message": "Image processing failed"}
 
-            batch.append(item)
+        cover_hash, deduplicated = cover_store.put(result["renditions"])
+        return {
+            "comic_id": comic_id,
+            "thumbnail_path": str(cover_store.path_for(cover_hash)),
+            "cover_hash": cover_hash,
+            "deduplicated": deduplicated,
+            "palette": result.get("palette"),
+            "error": False,
+        }
 
-            # If batch is full, write it
-            if len(batch) >= batch_size:
-                _apply_batch(db, batch, stats_queue)
-                processed += sum(1 for i in batch if not i.get("error"))
-                errors += sum(1 for i in batch if i.get("error"))
-                batch.clear()
+    except Exception as e:
+        return {"comic_id": comic_id, "error": True, "message": str(e)}
 
-        # Flush remaining items
-        if batch:
-            _apply_batch(db, batch, stats_queue)
-            processed += sum(1 for i in batch if not i.get("error"))
-            errors += sum(1 for i in batch if i.get("error"))
 
-    finally:
+class ScanThumbnailStream:
+    """
+    Thumbnails generated while a scan is still running.
+    The scanner submits (comic_id, cover bytes) right after writing a comic; the shared image
+    worker pool renders them and the scanner applies finished results with its next commit.
+    No archive is re-opened and new issues get covers as soon as their batch is committed.
+    Holds the image pool until close(); callers close it in a finally block (see LibraryScanner.scan).
+    """
 
+    def __init__(self, widths: Optional[List[int]] = None):
+        self.pool = image_worker_pool.acquire()
+        self.workers = image_worker_pool.workers
+        self.worker = partial(_cover_bytes_worker, widths=widths)
+        self.pending = []  # (comic_id, AsyncResult) still queued or rendering
+        self.finished = []  # (comic_id, AsyncResult) done, waiting for the next collect()
+        self.generated = 0
+        self.errors = 0
+        self.deduplicated = 0
+        self._closed = False
+
+    def submit(self, comic_id: int, cover_bytes: bytes) -> None:
+        # Bounded: at most workers * IMAGE_QUEUE_DEPTH covers (and their bytes) queued or rendering
+        self._sort_finished()
+        while len(self.pending) >= self.workers * IMAGE_QUEUE_DEPTH:
+            self.pending[0][1].wait()
+            self._sort_finished()
+        self.pending.append((comic_id, self.pool.apply_async(self.worker, ((comic_id, cover_bytes),))))
+
+    def discard(self, comic_ids) -> None:
+        """Forget covers of comics whose rows were rolled back (their ids may be reused)"""
+        self.pending = [(comic_id, r) for comic_id, r in self.pending if comic_id not in comic_ids]
+        self.finished = [(comic_id, r) for comic_id, r in self.finished if comic_id not in comic_ids]
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Finished results (without waiting); errors are only counted"""
+        self._sort_finished()
+        finished, self.finished = self.finished, []
+        return self._count([r.get() for _, r in finished])
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Wait for everything still running and hand the pool back"""
+        try:
+            results = [r.get() for _, r in self.finished + self.pending]
+        finally:
+            self.pending, self.finished = [], []
+            self._release()
+        return self._count(results)
+
+    def _sort_finished(self) -> None:
+        """Move tasks that are done from pending to finished"""
+        running = []
+        for comic_id, r in self.pending:
+            (self.finished if r.ready() else running).append((comic_id, r))
+        self.pending = running
+
+    def _release(self) -> None:
+        if not self._closed:
+            self._closed = True
+            image_worker_pool.release()
+
+    def _count(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ok = [r for r in results if not r.get("error")]
+        self.generated += len(ok)
+        self.errors += len(results) - len(ok)
+        self.deduplicated += sum(1 for r in ok if r.get("deduplicated"))
+        return ok
+
+    def stats(self) -> Dict[str, int]:
+        return {"generated": self.generated, "errors": self.errors, "deduplicated": self.deduplicated}
+
+
+def thumbnail_update_mapping(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker result -> Comic columns (for apply_thumbnail_results)"""
+    mapping = {"id": item["comic_id"], "thumbnail_path": item["thumbnail_path"], "cover_hash": item["cover_hash"]}
+    palette = item.get("palette")
+    if palette:
+        mapping.update(color_primary=palette.get("primary"), color_secondary=palette.get("secondary"),
+                       color_palette=palette)
+    return mapping
+
+
+def apply_thumbnail_results(db, results: List[Dict[str, Any]]) -> None:
+    """
+    Write worker results with Core UPDATE executemany (one per column set), no commit.
+    Unlike ORM bulk updates there is no rowcount check: a comic deleted in the meantime
+    just matches no row instead of raising StaleDataError for the whole batch.
+    """
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for item in results:
+        mapping = thumbnail_update_mapping(item)
+        comic_id = mapping.pop("id")
+        params = {f"b_{column}": value for column, value in mapping.items()}
+        groups.setdefault(tuple(sorted(mapping)), []).append({"b_id": comic_id, **params})
 
-        # CRITICAL Close DB *BEFORE* signaling summary.
-        # This guarantees the lock is released before the parent process wakes up.
-        db.close()
+    table = Comic.__table__
+    for columns, params in groups.items():
+        stmt = update(table).where(table.c.id == bindparam("b_id")) \
+            .values({column: bindparam(f"b_{column}") for column in columns})
+        db.execute(stmt, params)
 
-        # Signal completion
-        stats_queue.put({
-            "summary": True,
-            "processed": processed,
-            "errors": errors,
-            "skipped": skipped,
-        })
 
 class ThumbnailService:
     def __init__(self, db: Session, library_id: int = None):
@@ -154,11 +220,10 @@ class ThumbnailService:
         """
         Force regenerate thumbnails for ALL comics in a series.
         Refactored: Delegates to the parallel engine for safety.
-        Forces 1 worker to keep it 'serial-like' if you prefer, or
-        let it use multiple cores to finish the series instantly.
+        Runs one cover at a time on the shared pool, so it starts instantly
+        and never crowds out a running library job.
         """
 
-        # Using 2 workers is usually safe and twice as fast for a series or 1 for serial behavior
         return self.process_missing_thumbnails_parallel(
             force=True,
             series_id=series_id,
@@ -188,10 +253,14 @@ class ThumbnailService:
 
         return query.all()
 
-    def process_missing_thumbnails_parallel(self, force: bool = False, series_id: int = None, worker_limit: int = 0) -> Dict[str, int]:
+    def process_missing_thumbnails_parallel(self, force: bool = False, series_id: int = None, worker_limit: int = 0,
+                                            on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
-        Parallel thumbnail generation.
-        The writer process handles batching automatically.
+        Parallel thumbnail generation on the shared image worker pool.
+        Results are written from this thread in short bulk-UPDATE batches (time budgeted).
+
+        worker_limit: Max covers in flight at once (0 = the pool's default queue depth, 1 = serial)
+        on_progress: Called as (done, total) as covers finish
         """
 
         # 1. BUILD QUERY based on inputs
@@ -231,63 +300,39 @@ class ThumbnailService:
         if not tasks:
             return stats
 
-        # Queues
-        result_queue: Queue = multiprocessing.Queue()
-        stats_queue: Queue = multiprocessing.Queue()
+        # Widths are read once here (workers don't query settings)
+        worker = partial(_thumbnail_worker, widths=get_thumbnail_widths())
 
-        # Start Writer (Handles DB Updates)
-        writer_proc = multiprocessing.Process(
-            target=_thumbnail_writer,
-            args=(result_queue, stats_queue),
-            kwargs={'batch_size': 25}  # Safe batch size
-        )
-        writer_proc.start()
+        batcher = AdaptiveCommitBatcher(budget_ms=int(get_cached_setting("scanning.commit_budget_ms", 200)),
+                                        initial_size=25)
+        batch = []
+        batch_started = None
+        stats["deduplicated"] = 0
+
+        for payload in image_worker_pool.imap_unordered(worker, tasks, max_in_flight=worker_limit or None,
+                                                        on_progress=on_progress):
+            if payload.get("error"):
+                stats["errors"] += 1
+                continue
 
-        # Determine Worker Count
-        if worker_limit > 0:
-            workers = worker_limit  # Respect the override (e.g., 1)
+            stats["processed"] += 1
+            stats["deduplicated"] += 1 if payload.get("deduplicated") else 0
 
-            if worker_limit == 1:
-                self.logger.info(f"Using exactly 1 worker for thumbnail generation (SERIAL MODE)")
-            else:
-                self.logger.info(f"Using exactly {worker_limit} worker(s) for thumbnail generation")
+            if not batch:
+                batch_started = time.perf_counter()
+            batch.append(payload)
 
-        else:
-            requested_workers = int(get_cached_setting("system.parallel_image_workers", 0))
-            self.logger.info(f"Requested {'(Auto)' if requested_workers <= 0 else requested_workers} worker(s) for parallel thumbnail generation")
-
-            if requested_workers <= 0:
-                # AUTO MODE:
-                # Use 50% of cores, with a minimum of 1.
-                # This prevents system starvation when multiple web workers are active.
-                total_cores = multiprocessing.cpu_count() or 1
-                workers = max(1, total_cores // 2)
-            else:
-                max_cores = multiprocessing.cpu_count() or 1
-                workers = min(requested_workers, max_cores)
-
-            self.logger.info(f"Using {workers} worker(s) for parallel thumbnail generation")
-
-        # Start Workers (CPU bound)
-        with multiprocessing.Pool(processes=workers) as pool:
-            for payload in pool.imap_unordered(_thumbnail_worker, tasks):
-                # Send worker result to writer
-                result_queue.put(payload)
-
-        # All worker tasks done; tell writer to finish
-        result_queue.put(None)
-
-        # Wait for stats
-        summary_received = False
-        while not summary_received:
-            item = stats_queue.get()
-            if item.get("summary"):
-                stats["processed"] += item.get("processed", 0)
-                stats["errors"] += item.get("errors", 0)
-                stats["skipped"] += item.get("skipped", 0)
-                summary_received = True
-
-        writer_proc.join()
+            # Buffered in memory (no lock held); written once full or old enough
+            if len(batch) >= batcher.size or time.perf_counter() - batch_started >= batcher.budget:
+                _apply_batch(self.db, batch, batcher)
+                batch = []
+
+        # Flush remaining items
+        if batch:
+            _apply_batch(self.db, batch, batcher)
+
+        stats["commits"] = batcher.stats()
+        stats["workers"] = image_worker_pool.workers
 
         return stats
 
@@ -4,9 +4,10 @@ import threading
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from app.config import settings
 from app.database import SessionLocal
 from app.models.library import Library
-from app.services.scan_manager import scan_manager
+from app.services.scan_manager import scan_manager, SCOPED_SCAN_MAX_PATHS
 
 from app.core.settings_loader import get_cached_setting
 
@@ -15,7 +16,8 @@ class LibraryEventHandler(FileSystemEventHandler):
     """
         Handles file system events for a specific library.
         Uses a 'Batching Window' strategy: The first event starts a timer.
-        Subsequent events are ignored until the timer fires.
+        Subsequent events only add their paths until the timer fires, then one
+        scan is queued scoped to the changed paths (full scan if there are too many).
     """
 
     def __init__(self, library_id: int, batch_window_seconds: int = 600): # Default 10 mins
@@ -25,6 +27,10 @@ class LibraryEventHandler(FileSystemEventHandler):
         self._lock = threading.Lock()
         self._stopped = False
 
+        # Changed comic files / folders seen during the current window
+        self._pending_paths = set()
+        self._overflow = False
+
         self.logger = logging.getLogger(__name__)
 
         # Files to completely ignore
@@ -32,6 +38,8 @@ class LibraryEventHandler(FileSystemEventHandler):
         self.ignored_names = {'.ds_store', 'thumbs.db', 'desktop.ini'}
         # Directories to ignore
         self.ignored_dirs = {'storage', '.git', '__pycache__'}
+        # Only these files can change the library contents (same list the scanner imports)
+        self.comic_extensions = {ext.lower() for ext in settings.supported_extensions}
 
 
     def stop(self):
@@ -41,6 +49,7 @@ class LibraryEventHandler(FileSystemEventHandler):
             if self._timer:
                 self._timer.cancel()
                 self._timer = None
+            self._pending_paths.clear()
 
     def _trigger_scan(self):
         """Trigger the scan and reset the timer"""
@@ -50,38 +59,68 @@ class LibraryEventHandler(FileSystemEventHandler):
                 return
             self._timer = None
 
-        self.logger.info(f"Watcher: Batch window ended for Library {self.library_id}. Queuing scan...")
-        scan_manager.add_task(self.library_id, force=False)
+            paths = None if self._overflow else sorted(self._pending_paths)
+            self._pending_paths = set()
+            self._overflow = False
 
-    def on_any_event(self, event):
-        """Called on any file event (create, modify, move, delete)"""
-        if event.is_directory:
-            return
+        if paths is None:
+            self.logger.info(f"Watcher: Batch window ended for Library {self.library_id}. Too many changes, queuing full scan...")
+        else:
+            self.logger.info(f"Watcher: Batch window ended for Library {self.library_id}. Queuing scan of {len(paths)} path(s)...")
+        scan_manager.add_task(self.library_id, force=False, paths=paths)
 
-        path = Path(event.src_path)
+    def _is_relevant(self, raw_path: str, is_directory: bool) -> bool:
+        """Filter out thumbnails, temp files, system files and non-comic files"""
+        path = Path(raw_path)
 
         # --- FILTER NOISE ---
         # Ignore thumbnails and temp files
         if path.suffix.lower() in self.ignored_extensions:
-            return
+            return False
 
         # Ignore system files
         if path.name.lower() in self.ignored_names:
-            return
+            return False
 
         # Ignore internal storage/git folders if they somehow got into the watch path
         # Check if any part of the path matches ignored dirs
         if any(part in self.ignored_dirs for part in path.parts):
-            return
+            return False
         # -----------------------
 
+        return is_directory or path.suffix.lower() in self.comic_extensions
+
+    def on_any_event(self, event):
+        """Called on any file event (create, modify, move, delete)"""
+        # A folder's 'modified' event just echoes changes to its files
+        if event.is_directory and event.event_type not in ('created', 'deleted', 'moved'):
+            return
+
+        # Moves need both ends: the source is 'deleted', the destination 'created' (or relinked)
+        paths = [event.src_path]
+        if getattr(event, 'dest_path', None):
+            paths.append(event.dest_path)
+
+        paths = [p for p in paths if self._is_relevant(p, event.is_directory)]
+        if not paths:
+            return
+
         # Coalescing Logic (Batching)
-        # If a timer is already running, do nothing (let it gather more changes).
-        # If no timer, start one.
+        # Accumulate paths; if no timer is running, start one.
         with self._lock:
-            if not self._stopped and not self._timer:
+            if self._stopped:
+                return
+
+            if not self._overflow:
+                self._pending_paths.update(str(p) for p in paths)
+                if len(self._pending_paths) > SCOPED_SCAN_MAX_PATHS:
+                    # Too many to be worth scoping: fall back to a full scan
+                    self._overflow = True
+                    self._pending_paths.clear()
+
+            if not self._timer:
 
-                self.logger.debug(f"Watcher: Change detected in Library {self.library_id} ({event.event_type}: {path.name}). Starting {self.batch_window_seconds}s batch window.")
+                self.logger.debug(f"Watcher: Change detected in Library {self.library_id} ({event.event_type}: {Path(paths[0]).name}). Starting {self.batch_window_seconds}s batch window.")
 
                 # Start timer
                 self._timer = threading.Timer(self.batch_window_seconds, self._trigger_scan)
@@ -0,0 +1,90 @@
+"""
+Cover thumbnail benchmark: full decode vs reduced-scale (draft) JPEG decode.
+
+Runs ImageService.process_cover (the path used by the thumbnail workers) over a sample
+of comics and prints covers/sec for both modes.
+
+Usage:
+    python scripts/benchmark_covers.py /path/to/library [--limit 200]
+    python scripts/benchmark_covers.py --synthetic 50      # generated 2000x3000 JPEG covers
+"""
+import argparse
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+from app.services.images import ImageService  # noqa: E402
+
+
+def make_synthetic_library(root: Path, count: int) -> list:
+    """Write CBZs whose cover is a noisy 2000x3000 JPEG (roughly a real scan's size/entropy)"""
+    noise = Image.effect_noise((2000, 3000), 64).convert("RGB")
+    buf = BytesIO()
+    noise.save(buf, "JPEG", quality=90)
+    cover = buf.getvalue()
+
+    paths = []
+    for n in range(count):
+        path = root / f"book_{n:04d}.cbz"
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+            zf.writestr("000.jpg", cover)
+        paths.append(path)
+    return paths
+
+
+def run(paths: list, reduced: bool, out_dir: Path) -> float:
+    service = ImageService()
+    service.reduced_decoding = reduced
+
+    start = time.perf_counter()
+    for n, path in enumerate(paths):
+        service.process_cover(str(path), out_dir / f"cover_{n}.webp")
+    elapsed = time.perf_counter() - start
+
+    return len(paths) / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("library", nargs="?", help="Folder containing .cbz/.cbr files")
+    parser.add_argument("--limit", type=int, default=200, help="Max comics to sample")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N synthetic comics instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        if args.synthetic:
+            paths = make_synthetic_library(tmp, args.synthetic)
+        elif args.library:
+            paths = sorted(p for p in Path(args.library).rglob("*") if p.suffix.lower() in (".cbz", ".cbr"))
+            paths = paths[:args.limit]
+        else:
+            parser.error("Give a library path or --synthetic N")
+
+        if not paths:
+            parser.error("No comics found")
+
+        # Warm the OS file cache so both runs read from memory
+        for path in paths:
+            path.read_bytes()
+
+        full = run(paths, reduced=False, out_dir=tmp)
+        reduced = run(paths, reduced=True, out_dir=tmp)
+
+    print(f"Comics sampled:        {len(paths)}")
+    print(f"Full decode:           {full:.1f} covers/sec")
+    print(f"Reduced-scale decode:  {reduced:.1f} covers/sec")
+    if full:
+        print(f"Speedup:               {reduced / full:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
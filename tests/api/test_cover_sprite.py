@@ -0,0 +1,108 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.models.comic import Comic, Volume
+from app.models.library import Library
+from app.models.series import Series
+from app.services.cover_store import CoverStore
+from app.services.sprites import SpriteCache
+
+
+# --- HELPERS ---
+
+def webp(size, color):
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, "WEBP")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def covers(tmp_path, monkeypatch):
+    store = CoverStore(tmp_path / "cover")
+    monkeypatch.setattr("app.api.comics.cover_store", store)
+    monkeypatch.setattr("app.api.comics.sprite_cache", SpriteCache(tmp_path / "sprites"))
+    monkeypatch.setattr("app.api.comics.get_thumbnail_widths", lambda: [160, 320, 640])
+    return store
+
+
+def add_comics(db, count):
+    lib = Library(name="Sprite Lib", path="/lib")
+    db.add(lib)
+    db.commit()
+    series = Series(name="Saga", library_id=lib.id)
+    db.add(series)
+    db.commit()
+    vol = Volume(series_id=series.id, volume_number=1)
+    db.add(vol)
+    db.commit()
+
+    comics = [Comic(volume_id=vol.id, filename=f"{n}.cbz", file_path=f"/lib/{n}.cbz") for n in range(count)]
+    db.add_all(comics)
+    db.commit()
+    return comics
+
+
+def test_sprite_layout_and_cache(admin_client, db, covers):
+    comics = add_comics(db, 3)
+
+    # First: 160px rendition stored. Second: base thumbnail only (scaled into the cell). Third: no cover.
+    comics[0].cover_hash = covers.put({320: webp((303, 455), "red"), 160: webp((152, 228), "red")})[0]
+    comics[1].cover_hash = covers.put({320: webp((303, 455), "blue")})[0]
+    db.commit()
+
+    ids = ",".join(str(c.id) for c in reversed(comics))
+    resp = admin_client.get(f"/api/comics/covers/sprite?ids={ids}&w=150")
+    assert resp.status_code == 200
+    layout = resp.json()
+
+    assert layout["cell"] == {"w": 160, "h": 228}
+    assert [i["comic_id"] for i in layout["items"]] == [comics[1].id, comics[0].id]
+    assert layout["items"][1] == {"comic_id": comics[0].id, "x": 160, "y": 0, "w": 152, "h": 228}
+    assert layout["missing"] == [comics[2].id]
+
+    # Same covers -> same sheet
+    assert admin_client.get(f"/api/comics/covers/sprite?ids={ids}&w=150").json()["sprite_url"] == layout["sprite_url"]
+
+    image = admin_client.get(layout["sprite_url"])
+    assert image.status_code == 200
+    assert "immutable" in image.headers["cache-control"]
+    with Image.open(BytesIO(image.content)) as sheet:
+        assert sheet.size == (layout["width"], layout["height"]) == (320, 228)
+        assert sheet.getpixel((160 + 76, 114))[0] > 200  # red cover in the second cell
+
+    # A re-generated cover gives a new sheet
+    comics[1].cover_hash = covers.put({320: webp((303, 455), "green")})[0]
+    db.commit()
+    assert admin_client.get(f"/api/comics/covers/sprite?ids={ids}&w=150").json()["sprite_url"] != layout["sprite_url"]
+
+
+def test_sprite_rejects_bad_requests(admin_client, covers):
+    assert admin_client.get("/api/comics/covers/sprite?ids=1,x").status_code == 400
+    assert admin_client.get("/api/comics/covers/sprite?ids=" + ",".join(map(str, range(101)))).status_code == 400
+    assert admin_client.get("/api/comics/covers/sprite/not-a-key.webp").status_code == 404
+
+
+def test_concurrent_identical_misses_build_once(tmp_path):
+    import threading
+    import time
+    from unittest.mock import patch
+
+    cache = SpriteCache(tmp_path / "sprites")
+    builds = []
+
+    def slow_build(covers, width):
+        builds.append(width)
+        time.sleep(0.1)
+        return webp((10, 10), "red"), {"items": [], "missing": []}
+
+    with patch("app.services.sprites.build_sprite", slow_build):
+        threads = [threading.Thread(target=cache.get_or_build, args=("a" * 32, [(1, None)], 160)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert builds == [160]
+    assert cache.get_layout("a" * 32) == {"items": [], "missing": [1]}
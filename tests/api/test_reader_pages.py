@@ -0,0 +1,256 @@
+import os
+import zipfile
+
+import pytest
+
+from app.models.comic import Comic, Volume
+from app.models.series import Series
+from app.models.library import Library
+from app.services.archive import ComicArchive
+
+
+# --- HELPERS ---
+
+def add_comic(db, cbz_path):
+    """Insert a comic with a page map built the same way the scanner does"""
+    lib = Library(name="Test Lib", path=str(cbz_path.parent))
+    db.add(lib)
+    db.commit()
+
+    series = Series(name="Test Series", library_id=lib.id)
+    db.add(series)
+    db.commit()
+
+    vol = Volume(series_id=series.id, volume_number=1)
+    db.add(vol)
+    db.commit()
+
+    with ComicArchive(cbz_path) as archive:
+        page_map = archive.get_page_map()
+
+    comic = Comic(
+        volume_id=vol.id,
+        filename=cbz_path.name,
+        file_path=str(cbz_path),
+        page_count=len(page_map["pages"]),
+        page_map=page_map
+    )
+    db.add(comic)
+    db.commit()
+    return comic
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_page_bytes_match_archive(auth_client, db, tmp_path, compression):
+    """STORED pages are streamed from the file, DEFLATED pages go through the archive; both must be exact"""
+    pages = {"001.jpg": os.urandom(150_000), "002.png": os.urandom(1000)}
+
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w", compression=compression) as zf:
+        for name, data in pages.items():
+            zf.writestr(name, data)
+
+    comic = add_comic(db, cbz)
+
+    resp = auth_client.get(f"/api/reader/{comic.id}/page/0")
+    assert resp.status_code == 200
+    assert resp.content == pages["001.jpg"]
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["content-length"] == str(len(pages["001.jpg"]))
+
+    resp = auth_client.get(f"/api/reader/{comic.id}/page/1")
+    assert resp.status_code == 200
+    assert resp.content == pages["002.png"]
+    assert resp.headers["content-type"] == "image/png"
+
+    resp = auth_client.get(f"/api/reader/{comic.id}/page/5")
+    assert resp.status_code == 404
+
+
+def test_processed_pages_are_cached(auth_client, db, tmp_path, monkeypatch):
+    """Grayscale output is stored once, then served from the page cache"""
+    from io import BytesIO
+    from PIL import Image
+    from app.services.page_cache import PageCache
+
+    cache = PageCache(tmp_path / "pages")
+    monkeypatch.setattr("app.api.reader.page_cache", cache)
+    monkeypatch.setattr(PageCache, "is_enabled", staticmethod(lambda: True))
+
+    buf = BytesIO()
+    Image.new("RGB", (40, 60), "red").save(buf, "JPEG")
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w") as zf:
+        zf.writestr("001.jpg", buf.getvalue())
+
+    comic = add_comic(db, cbz)
+
+    first = auth_client.get(f"/api/reader/{comic.id}/page/0?grayscale=true")
+    second = auth_client.get(f"/api/reader/{comic.id}/page/0?grayscale=true")
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content and first.headers["content-type"] == "image/jpeg"
+    assert Image.open(BytesIO(second.content)).mode == "L"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (1, 1, 1)
+
+    # Already fits the device width: served as-is, and not copied into the cache
+    small = auth_client.get(f"/api/reader/{comic.id}/page/0?width=480")
+    assert small.status_code == 200 and small.content == buf.getvalue()
+    assert cache.stats()["writes"] == 1
+
+
+def test_device_sized_pages_follow_accept(auth_client, db, tmp_path, monkeypatch):
+    """?width= downscales to a bucket, the format comes from Accept, each rendition is cached once"""
+    from io import BytesIO
+    from PIL import Image
+    from app.services.page_cache import PageCache
+
+    cache = PageCache(tmp_path / "pages")
+    monkeypatch.setattr("app.api.reader.page_cache", cache)
+    monkeypatch.setattr(PageCache, "is_enabled", staticmethod(lambda: True))
+
+    buf = BytesIO()
+    Image.new("RGB", (2000, 3000), "blue").save(buf, "PNG")
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("001.png", buf.getvalue())
+
+    comic = add_comic(db, cbz)
+    url = f"/api/reader/{comic.id}/page/0?width=360&dpr=2"
+
+    webp = auth_client.get(url, headers={"Accept": "image/webp,image/*;q=0.8"})
+    assert webp.headers["content-type"] == "image/webp" and "Accept" in webp.headers["vary"]
+    assert Image.open(BytesIO(webp.content)).size == (720, 1080)
+
+    jpeg = auth_client.get(url, headers={"Accept": "image/avif;q=0, image/png"})
+    assert jpeg.headers["content-type"] == "image/jpeg"
+
+    again = auth_client.get(url, headers={"Accept": "image/webp"})
+    assert again.content == webp.content
+    assert (cache.stats()["writes"], cache.stats()["hits"]) == (2, 1)
+
+
+def test_init_prefetch_skips_device_sized_sessions(auth_client, db, tmp_path, normal_user, monkeypatch):
+    """Device-sized pages are prefetched by the page endpoint (it sees the image Accept), not by init"""
+    calls = []
+    monkeypatch.setattr("app.api.reader.page_prefetcher.schedule", lambda *a, **kw: calls.append(kw) or 0)
+
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w") as zf:
+        for n in range(3):
+            zf.writestr(f"{n:03d}.jpg", os.urandom(100))
+
+    comic = add_comic(db, cbz)
+    normal_user.accessible_libraries.append(comic.volume.series.library)
+    db.commit()
+
+    assert auth_client.get(f"/api/reader/{comic.id}/read-init?webp=true&width=390").status_code == 200
+    assert calls == []
+
+    assert auth_client.get(f"/api/reader/{comic.id}/read-init?webp=true").status_code == 200
+    assert calls and calls[0]["webp"] and not calls[0].get("width")
+
+
+def test_refused_formats_are_not_passed_through(auth_client, db, tmp_path):
+    """A stored WebP page goes out zero-copy only if the client accepts WebP; otherwise as JPEG"""
+    from io import BytesIO
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new("RGBA", (40, 60), "green").save(buf, "WEBP")
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("001.webp", buf.getvalue())
+
+    comic = add_comic(db, cbz)
+    url = f"/api/reader/{comic.id}/page/0"
+
+    as_is = auth_client.get(url, headers={"Accept": "image/webp,image/*;q=0.8"})
+    assert as_is.content == buf.getvalue() and "Accept" in as_is.headers["vary"]
+
+    jpeg = auth_client.get(url, headers={"Accept": "image/jpeg"})
+    assert jpeg.status_code == 200 and jpeg.headers["content-type"] == "image/jpeg"
+    assert Image.open(BytesIO(jpeg.content)).format == "JPEG"
+
+
+def test_negotiate_page_format():
+    from app.services.images import accepts_page_format, negotiate_page_format, pick_page_width
+
+    assert accepts_page_format(None, "image/avif") and accepts_page_format("image/*", "image/webp")
+    assert not accepts_page_format("image/jpeg, image/png", "image/webp")
+    assert accepts_page_format("image/jpeg", "image/webp", prefer_webp=True)
+
+    assert negotiate_page_format("image/avif,image/webp,*/*") in ("avif", "webp")
+    assert negotiate_page_format("image/webp;q=0, */*") == "jpeg"
+    assert negotiate_page_format("*/*", prefer_webp=True) == "webp"
+    assert negotiate_page_format(None) == "jpeg"
+    assert (pick_page_width(390, 3), pick_page_width(100), pick_page_width(5000)) == (1440, 480, 2560)
+
+
+def parse_multipart(resp):
+    """[(headers, body)] of a multipart/mixed response"""
+    boundary = resp.headers["content-type"].split("boundary=")[1].encode()
+    parts = []
+    for chunk in resp.content.split(b"--" + boundary)[1:-1]:
+        head, body = chunk[2:].split(b"\r\n\r\n", 1)
+        headers = dict(line.split(": ", 1) for line in head.decode().split("\r\n"))
+        parts.append((headers, body[:-2]))
+    return parts
+
+
+def test_batch_pages(auth_client, db, tmp_path, normal_user):
+    """One request returns consecutive pages in order, clipped to the end of the book"""
+    pages = {f"{n:03d}.jpg": os.urandom(1000 + n) for n in range(3)}
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in pages.items():
+            zf.writestr(name, data)
+
+    comic = add_comic(db, cbz)
+
+    # Library access is enforced
+    assert auth_client.get(f"/api/reader/{comic.id}/pages").status_code == 404
+    normal_user.accessible_libraries.append(comic.volume.series.library)
+    db.commit()
+
+    resp = auth_client.get(f"/api/reader/{comic.id}/pages?start=1&count=5")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("multipart/mixed")
+
+    parts = parse_multipart(resp)
+    assert [h["X-Page-Index"] for h, _ in parts] == ["1", "2"]
+    assert [body for _, body in parts] == [pages["001.jpg"], pages["002.jpg"]]
+    assert all(h["Content-Type"] == "image/jpeg" and h["Content-Length"] == str(len(b)) for h, b in parts)
+
+    assert auth_client.get(f"/api/reader/{comic.id}/pages?start=7").status_code == 404
+    assert auth_client.get(f"/api/reader/{comic.id}/pages?count=50").status_code == 422
+
+    # So is the age rating, as in reader-init
+    comic.age_rating = "Mature 17+"
+    normal_user.max_age_rating = "Teen"
+    db.commit()
+    assert auth_client.get(f"/api/reader/{comic.id}/pages").status_code == 404
+
+
+def test_range_response_aborts_when_file_shrinks(tmp_path):
+    """A short read must not end the body cleanly after Content-Length was promised"""
+    import anyio
+    from app.core.responses import FileRangeResponse
+
+    path = tmp_path / "book.cbz"
+    path.write_bytes(b"x" * 100)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await FileRangeResponse(str(path), 50, 200)({"type": "http", "method": "GET"}, None, send)
+
+    with pytest.raises(OSError):
+        anyio.run(run)
+
+    # Headers + the bytes that existed, but never a final (more_body=False) message
+    assert sent[0]["type"] == "http.response.start"
+    assert all(m.get("more_body", True) for m in sent[1:])
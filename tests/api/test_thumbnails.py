@@ -0,0 +1,106 @@
+import os
+import zipfile
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.models.comic import Comic
+from app.services.cover_store import CoverStore
+from app.services.ondemand_thumbnails import OnDemandThumbnails
+from app.services.thumbnail_cache import ThumbnailCache
+
+
+@pytest.fixture
+def thumbs(tmp_path, monkeypatch):
+    store = CoverStore(tmp_path / "cover")
+    cache = ThumbnailCache()
+    monkeypatch.setattr("app.api.comics.cover_store", store)
+    monkeypatch.setattr("app.api.comics.thumbnail_cache", cache)
+    return store, cache
+
+
+def test_stored_cover_etag_and_memory_cache(client, db, thumbs):
+    store, cache = thumbs
+    cover_hash, _ = store.put({320: b"stored cover"})
+    comic = Comic(filename="1.cbz", file_path="/lib/1.cbz", cover_hash=cover_hash)
+    db.add(comic)
+    db.commit()
+
+    resp = client.get(f"/api/comics/{comic.id}/thumbnail")
+    assert resp.status_code == 200 and resp.content == b"stored cover"
+    assert resp.headers["cache-control"] == "no-cache"
+    etag = resp.headers["etag"]
+
+    # Pinned to the current hash: cached for good; a stale hash is only revalidated
+    pinned = client.get(f"/api/comics/{comic.id}/thumbnail?v={cover_hash}")
+    assert pinned.headers["cache-control"] == "public, max-age=31536000, immutable"
+    stale = client.get(f"/api/comics/{comic.id}/thumbnail?v=old")
+    assert stale.headers["cache-control"] == "no-cache"
+
+    resp = client.get(f"/api/comics/{comic.id}/thumbnail", headers={"If-None-Match": f'"other", {etag}'})
+    assert resp.status_code == 304 and resp.headers["etag"] == etag and not resp.content
+
+    # Stored covers are immutable: the later hits didn't touch the disk
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_flat_cover_is_revalidated(client, db, thumbs, tmp_path):
+    path = tmp_path / "legacy.webp"
+    path.write_bytes(b"old")
+    comic = Comic(filename="2.cbz", file_path="/lib/2.cbz", thumbnail_path=str(path))
+    db.add(comic)
+    db.commit()
+
+    first = client.get(f"/api/comics/{comic.id}/thumbnail")
+    assert first.content == b"old" and first.headers["cache-control"] == "no-cache"
+
+    # Regenerated cover: new validator, new bytes, old ETag no longer matches
+    path.write_bytes(b"new cover")
+    os.utime(path, ns=(1, 2_000_000_000_000_000_000))
+    resp = client.get(f"/api/comics/{comic.id}/thumbnail", headers={"If-None-Match": first.headers["etag"]})
+    assert resp.status_code == 200 and resp.content == b"new cover"
+    assert resp.headers["etag"] != first.headers["etag"]
+
+
+def test_missing_cover_is_generated_into_the_store(client, db, thumbs, tmp_path, monkeypatch):
+    store, _ = thumbs
+    ondemand = OnDemandThumbnails(lock_dir=tmp_path / "locks", store=store, session_factory=lambda: db)
+    monkeypatch.setattr("app.api.comics.ondemand_thumbnails", ondemand)
+
+    buf = BytesIO()
+    Image.new("RGB", (640, 960), (200, 30, 30)).save(buf, "JPEG")
+    with zipfile.ZipFile(tmp_path / "3.cbz", "w") as zf:
+        zf.writestr("001.jpg", buf.getvalue())
+    comic = Comic(filename="3.cbz", file_path=str(tmp_path / "3.cbz"))
+    db.add(comic)
+    db.commit()
+    comic_id = comic.id
+
+    try:
+        resp = client.get(f"/api/comics/{comic_id}/thumbnail")
+    finally:
+        ondemand.shutdown()
+
+    # Hash-sharded store file, recorded on the comic; no flat comic_<id>.webp
+    cover_hash = db.get(Comic, comic_id).cover_hash
+    assert resp.status_code == 200 and resp.content == store.path_for(cover_hash).read_bytes()
+    assert not list(store.iter_legacy_files())
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ThumbnailCache(max_bytes=10, max_item_bytes=8)
+    paths = []
+    for name, data in (("a", b"aaaa"), ("b", b"bbbb"), ("c", b"cccc"), ("big", b"x" * 9)):
+        paths.append(tmp_path / name)
+        paths[-1].write_bytes(data)
+
+    a, b, c, big = paths
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # a is now the most recent
+    cache.get(c)
+
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    assert cache.get(big)[1] is None  # Too large: served from disk
+    assert cache.get(tmp_path / "missing") is None
@@ -0,0 +1,69 @@
+import os
+import time
+import zipfile
+
+from app.services.archive import ArchivePool
+
+
+def make_cbz(path, data=b"page"):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("001.jpg", data)
+    return path
+
+
+def test_pool_reuses_open_handles(tmp_path):
+    """Second borrow of the same book is a hit and returns the same parsed archive"""
+    pool = ArchivePool(max_open=4)
+    cbz = make_cbz(tmp_path / "a.cbz")
+
+    with pool.open(cbz) as first:
+        assert first.read_file("001.jpg") == b"page"
+    with pool.open(cbz) as second:
+        assert second is first
+
+    stats = pool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["open"] == 1
+
+
+def test_pool_respects_cap_and_mtime(tmp_path):
+    """Oldest handle is evicted past the cap, and a modified file gets a fresh handle"""
+    pool = ArchivePool(max_open=2)
+    books = [make_cbz(tmp_path / f"{i}.cbz") for i in range(3)]
+
+    for book in books:
+        with pool.open(book):
+            pass
+
+    assert pool.stats()["open"] == 2
+    assert pool.stats()["evictions"] == 1
+
+    # Rewrite the newest book; the old handle must not be served
+    make_cbz(books[2], b"changed")
+    mtime = os.path.getmtime(books[2]) + 5
+    os.utime(books[2], (mtime, mtime))
+
+    with pool.open(books[2]) as archive:
+        assert archive.read_file("001.jpg") == b"changed"
+
+    assert pool.stats()["open"] == 2
+    pool.close_all()
+    assert pool.stats()["open"] == 0
+
+
+def test_idle_handles_close_without_further_opens(tmp_path):
+    """Once reading stops, the timer closes idle handles (no later open() needed)"""
+    pool = ArchivePool(max_open=4, idle_timeout=0.05)
+    cbz = make_cbz(tmp_path / "a.cbz")
+
+    with pool.open(cbz):
+        pass
+    assert pool.stats()["open"] == 1
+
+    deadline = time.monotonic() + 5
+    while pool.stats()["open"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert pool.stats()["open"] == 0 and pool.stats()["evictions"] == 1
+    assert pool._sweeper is None  # Nothing left to watch
@@ -0,0 +1,42 @@
+import time
+
+from app.services.bulk import AdaptiveCommitBatcher
+
+
+class FakeSession:
+    def __init__(self, commit_seconds=0.0):
+        self.commit_seconds = commit_seconds
+        self.commits = 0
+
+    def commit(self):
+        time.sleep(self.commit_seconds)
+        self.commits += 1
+
+
+def test_batcher_commits_on_budget_and_adapts_to_contention():
+    """Batches close on the time budget; slow (contended) commits halve the size, cheap full ones grow it"""
+    batcher = AdaptiveCommitBatcher(budget_ms=40, initial_size=10)
+
+    # Time budget: a single slow item is enough to commit
+    batcher.add()
+    assert not batcher.should_commit()
+    time.sleep(0.05)
+    assert batcher.should_commit()
+    batcher.commit(FakeSession())
+    assert batcher.size == 7  # overran the budget -> shrink
+
+    # Cheap full batch -> grow
+    batcher.add(batcher.size)
+    assert batcher.should_commit()
+    batcher.commit(FakeSession())
+    assert batcher.size == 8
+
+    # Commit that waited on the lock -> back off hard
+    batcher.add()
+    batcher.commit(FakeSession(commit_seconds=0.03))
+    assert batcher.size == 4
+
+    stats = batcher.stats()
+    assert stats["batches"] == 3
+    assert stats["contended"] == 1
+    assert stats["commit_ms_max"] >= 30
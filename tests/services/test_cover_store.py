@@ -0,0 +1,62 @@
+import os
+import time
+
+from app.models.comic import Comic
+from app.services.cover_store import CoverStore
+from app.services.maintenance import MaintenanceService
+
+
+def test_identical_covers_share_files(tmp_path):
+    store = CoverStore(tmp_path)
+
+    first, deduplicated = store.put({320: b"cover", 640: b"cover-large"})
+    assert not deduplicated
+
+    second, deduplicated = store.put({320: b"cover", 640: b"other-encoder-run"})
+    assert deduplicated and second == first
+
+    base = store.path_for(first)
+    assert base.relative_to(tmp_path).parts == (first[:2], first[2:4], f"{first}.webp")
+    assert store.path_for(first, 640).read_bytes() == b"cover-large"
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 2
+
+
+def test_legacy_covers_are_migrated_and_pruned(db, tmp_path):
+    store = CoverStore(tmp_path)
+    comics = [Comic(filename=f"{n}.cbz", file_path=f"/lib/{n}.cbz") for n in range(3)]
+    db.add_all(comics)
+    db.commit()
+
+    # Hash already recorded (its store file is missing): the leftover flat file is an older cover
+    current_hash = store.hash_bytes(b"current cover")
+    comics[2].cover_hash = current_hash
+    db.commit()
+
+    # Two reprints with the same cover, one rendition, a stale file and a file for a deleted comic
+    for comic in comics[:2]:
+        (tmp_path / f"comic_{comic.id}.webp").write_bytes(b"same cover")
+    (tmp_path / f"comic_{comics[0].id}_w640.webp").write_bytes(b"large")
+    (tmp_path / f"comic_{comics[2].id}.webp").write_bytes(b"old cover")
+    (tmp_path / "comic_999.webp").write_bytes(b"gone")
+
+    assert MaintenanceService(db).migrate_cover_storage(store) == 2
+
+    db.expire_all()
+    assert comics[0].cover_hash == comics[1].cover_hash == store.hash_bytes(b"same cover")
+    assert comics[0].thumbnail_path == str(store.path_for(comics[0].cover_hash))
+    assert store.path_for(comics[0].cover_hash, 640).read_bytes() == b"large"
+    assert not list(tmp_path.glob("comic_*"))
+
+    # The stale file was not served under the current (immutable) hash
+    assert comics[2].cover_hash == current_hash
+    assert not store.path_for(current_hash).exists()
+
+    # Unreferenced store files go once they are past the grace period
+    orphan = store.path_for(store.put({320: b"orphan"})[0])
+    assert MaintenanceService(db).prune_covers(store) == 0
+
+    old = time.time() - 2 * 3600
+    os.utime(orphan, (old, old))
+    assert MaintenanceService(db).prune_covers(store) == 1
+    assert not orphan.exists()
+    assert store.path_for(comics[0].cover_hash).exists()
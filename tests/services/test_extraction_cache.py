@@ -0,0 +1,108 @@
+import threading
+import zipfile
+from unittest.mock import patch
+
+from app.services.extraction_cache import ExtractionCache
+
+
+def make_book(path, pages):
+    # extract() works on any ComicArchive, so a CBZ stands in for a CBR here
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in pages:
+            zf.writestr(name, data)
+    return path
+
+
+def test_pages_served_from_extracted_files(tmp_path):
+    """First lookup extracts the whole book, the rest are hits on plain files in page order"""
+    cache = ExtractionCache(tmp_path / "cache")
+    book = make_book(tmp_path / "book.cbz", [("p10.png", b"ten"), ("p2.jpg", b"two")])
+
+    with patch.object(ExtractionCache, "max_bytes", return_value=10_000):
+        first = cache.get_page(1, str(book), 0)
+        second = cache.get_page(1, str(book), 1)
+
+    assert first.read_bytes() == b"two"
+    assert cache._locks == {}  # Per-entry locks don't outlive the extraction
+    assert second.read_bytes() == b"ten"
+    assert second.suffix == ".png"
+    assert cache.get_page(1, str(book), 5) is None
+
+    stats = cache.stats()
+    assert stats["extractions"] == 1
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+def test_archive_is_extracted_in_one_pass(tmp_path):
+    """No per-page reads (one unrar process per page for CBR); nested members are flattened"""
+    cache = ExtractionCache(tmp_path / "cache")
+    book = make_book(tmp_path / "book.cbz", [("art/001.jpg", b"one"), ("art/002.jpg", b"two")])
+
+    with patch.object(ExtractionCache, "max_bytes", return_value=10_000), \
+            patch("app.services.archive.ComicArchive.read_file", side_effect=AssertionError("per-page read")):
+        page = cache.get_page(1, str(book), 1)
+
+    assert page.name == "00001.jpg" and page.read_bytes() == b"two"
+    assert sorted(p.name for p in page.parent.iterdir()) == [".complete", "00000.jpg", "00001.jpg"]
+
+
+def test_eviction_skips_entries_locked_elsewhere(tmp_path):
+    """An entry another worker holds the lock for is left alone, and so is its lock file"""
+    cache = ExtractionCache(tmp_path / "cache")
+    other = ExtractionCache(tmp_path / "cache")
+    books = [make_book(tmp_path / f"{i}.cbz", [("001.jpg", b"x" * 600)]) for i in range(3)]
+
+    with patch.object(ExtractionCache, "max_bytes", return_value=1300):
+        assert cache.get_page(0, str(books[0]), 0) is not None
+        assert cache.get_page(1, str(books[1]), 0) is not None
+
+        busy = cache._entry_dir(0, str(books[0])).name
+        with other._entry_file_lock(busy):
+            assert cache.get_page(2, str(books[2]), 0) is not None
+
+    root = tmp_path / "cache"
+    assert (root / busy).exists() and (root / f".lock_{busy}").exists()
+    assert not list(root.glob("comic_1_*")) and not list(root.glob(".lock_comic_1_*"))
+
+
+def test_lru_eviction_over_size_cap(tmp_path):
+    """Once the cap is exceeded the least recently read book is evicted"""
+    cache = ExtractionCache(tmp_path / "cache")
+    books = [make_book(tmp_path / f"{i}.cbz", [("001.jpg", b"x" * 600)]) for i in range(3)]
+
+    with patch.object(ExtractionCache, "max_bytes", return_value=1300):
+        for comic_id, book in enumerate(books):
+            assert cache.get_page(comic_id, str(book), 0) is not None
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["evicted_bytes"] == 600
+    assert not list((tmp_path / "cache").glob("comic_0_*"))
+
+
+def test_other_worker_extraction_is_reused(tmp_path):
+    """A worker waiting on the entry's lock file reuses the finished entry instead of extracting again"""
+    book = make_book(tmp_path / "book.cbz", [("p1.jpg", b"one")])
+    other = ExtractionCache(tmp_path / "cache")
+    cache = ExtractionCache(tmp_path / "cache")
+
+    with patch.object(ExtractionCache, "max_bytes", return_value=10_000):
+        entry_name = other._entry_dir(1, str(book)).name
+        with other._entry_file_lock(entry_name):
+            waiter = threading.Thread(target=cache.get_page, args=(1, str(book), 0))
+            waiter.start()
+            waiter.join(0.2)
+            assert waiter.is_alive()  # Blocked on the other worker's lock
+
+            # The other worker finishes its entry
+            entry_dir = tmp_path / "cache" / entry_name
+            entry_dir.mkdir()
+            (entry_dir / "00000.jpg").write_bytes(b"one")
+            (entry_dir / ".complete").touch()
+
+        waiter.join(5)
+
+    assert not waiter.is_alive()
+    assert cache.stats()["extractions"] == 0
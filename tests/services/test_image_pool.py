@@ -0,0 +1,132 @@
+import zipfile
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.models.comic import Comic, Volume
+from app.models.series import Series
+from app.models.library import Library
+from app.services.cover_store import CoverStore
+from app.services.image_pool import ImageWorkerPool, image_worker_pool
+from app.services.thumbnailer import ScanThumbnailStream, ThumbnailService, _apply_batch
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """Pool size normally comes from settings; pin it"""
+    size = {"value": 2}
+    monkeypatch.setattr("app.services.image_pool.configured_image_workers", lambda: size["value"])
+    return size
+
+
+def test_pool_is_reused_bounded_and_reports_progress(workers):
+    pool = ImageWorkerPool(max_tasks_per_child=3)
+    progress = []
+
+    try:
+        results = pool.imap_unordered(abs, range(-10, 0), max_in_flight=2, on_progress=lambda d, t: progress.append((d, t)))
+        assert sorted(results) == list(range(1, 11))
+        assert progress[-1] == (10, 10) and len(progress) == 10
+
+        assert sorted(pool.imap_unordered(abs, [-1, -2])) == [1, 2]
+        assert pool.stats()["pool_starts"] == 1  # Second job reused the workers
+
+        # Worker exceptions surface in the caller
+        with pytest.raises(ValueError):
+            list(pool.imap_unordered(int, ["x"]))
+
+        # Settings changed: rebuilt on the next (idle) use
+        workers["value"] = 1
+        assert list(pool.imap_unordered(abs, [-3])) == [3]
+        assert pool.stats()["pool_starts"] == 2 and pool.workers == 1
+    finally:
+        pool.shutdown()
+
+
+def test_series_thumbnails_use_shared_pool(db, tmp_path, workers, monkeypatch):
+    store = CoverStore(tmp_path / "cover")
+    monkeypatch.setattr("app.services.cover_store.cover_store", store)
+    monkeypatch.setattr("app.services.thumbnailer.get_thumbnail_widths", lambda: [320])
+    image_worker_pool.shutdown()  # Workers fork with the patched store
+
+    lib = Library(name="Lib", path=str(tmp_path))
+    db.add(lib)
+    db.commit()
+    series = Series(name="Saga", library_id=lib.id)
+    db.add(series)
+    db.commit()
+    vol = Volume(series_id=series.id, volume_number=1)
+    db.add(vol)
+    db.commit()
+
+    buf = BytesIO()
+    Image.new("RGB", (640, 910), (30, 30, 200)).save(buf, "JPEG")
+    for n in range(3):
+        with zipfile.ZipFile(tmp_path / f"{n}.cbz", "w") as zf:
+            zf.writestr("001.jpg", buf.getvalue() if n else b"broken")
+        db.add(Comic(volume_id=vol.id, filename=f"{n}.cbz", file_path=str(tmp_path / f"{n}.cbz")))
+    db.commit()
+
+    progress = []
+    try:
+        stats = ThumbnailService(db).process_missing_thumbnails_parallel(
+            force=True, series_id=series.id, worker_limit=1, on_progress=lambda d, t: progress.append(d))
+    finally:
+        image_worker_pool.shutdown()
+
+    assert (stats["processed"], stats["errors"], stats["deduplicated"]) == (2, 1, 1)
+    assert progress == [1, 2, 3]
+
+    db.expire_all()
+    hashes = {c.cover_hash for c in db.query(Comic).filter(Comic.filename != "0.cbz")}
+    assert len(hashes) == 1 and store.path_for(hashes.pop()).exists()
+
+
+def test_batch_skips_comics_deleted_meanwhile(db):
+    """A comic deleted while its cover was rendering must not fail the rest of the batch"""
+    kept, deleted = Comic(filename="a.cbz", file_path="/lib/a.cbz"), Comic(filename="b.cbz", file_path="/lib/b.cbz")
+    db.add_all([kept, deleted])
+    db.commit()
+
+    batch = [{"comic_id": c.id, "thumbnail_path": f"/covers/{c.id}.webp", "cover_hash": f"h{c.id}",
+              "palette": {"primary": "#000000", "secondary": "#ffffff"} if c is kept else None}
+             for c in (kept, deleted)]
+    db.delete(deleted)
+    db.commit()
+
+    _apply_batch(db, batch)
+
+    db.expire_all()
+    assert (kept.cover_hash, kept.color_primary) == (f"h{kept.id}", "#000000")
+    assert db.query(Comic).count() == 1
+
+
+def test_stream_bounds_running_covers(monkeypatch):
+    """Finished tasks don't count toward the limit, unfinished ones block the scanner"""
+    class Task:
+        def __init__(self, comic_id):
+            self.comic_id, self.done = comic_id, False
+
+        def ready(self):
+            return self.done
+
+        def wait(self):
+            self.done = True
+
+        def get(self):
+            return {"comic_id": self.comic_id, "error": False}
+
+    pool = SimpleNamespace(apply_async=lambda worker, args: Task(args[0][0]))
+    monkeypatch.setattr("app.services.thumbnailer.image_worker_pool",
+                        SimpleNamespace(acquire=lambda: pool, release=lambda: None, workers=1))
+    monkeypatch.setattr("app.services.thumbnailer.IMAGE_QUEUE_DEPTH", 2)
+
+    stream = ScanThumbnailStream()
+    for comic_id in range(6):
+        stream.submit(comic_id, b"cover")
+        assert sum(not r.ready() for _, r in stream.pending) <= 2
+
+    assert [r["comic_id"] for r in stream.collect()] == [0, 1, 2, 3]
+    assert [r["comic_id"] for r in stream.close()] == [4, 5]
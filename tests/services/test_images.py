@@ -0,0 +1,97 @@
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.images import ImageService, parse_thumbnail_widths, pick_rendition_width, rendition_path
+from app.services.palette import get_palette, palette_to_dict
+
+
+# --- HELPERS ---
+
+def make_cover_cbz(path, size=(2000, 3000), fmt="JPEG"):
+    buf = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buf, fmt)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(f"000.{fmt.lower()}", buf.getvalue())
+    return path
+
+
+def make_palette_cover(seed):
+    """Deterministic 'cover': flat background, a few colored panels, some scan noise"""
+    rng = np.random.default_rng(seed)
+    arr = np.empty((150, 100, 3), dtype=np.uint8)
+    arr[:] = rng.integers(0, 256, 3)
+    for _ in range(6):
+        y, x = rng.integers(0, 130), rng.integers(0, 80)
+        arr[y:y + rng.integers(15, 80), x:x + rng.integers(15, 60)] = rng.integers(0, 256, 3)
+    noise = rng.normal(0, 12, arr.shape)
+    return Image.fromarray(np.clip(arr + noise, 0, 255).astype(np.uint8))
+
+
+def test_jpeg_covers_are_decoded_at_reduced_scale(tmp_path):
+    """draft() shrinks the decode to the smallest DCT scale still >= the thumbnail box"""
+    service = ImageService()
+    cbz = make_cover_cbz(tmp_path / "book.cbz")
+
+    cover_bytes, _, _, _ = service.get_page_image(str(cbz), 0, transcode_webp=False)
+    img = service._open_cover(cover_bytes, service.thumbnail_size)
+    img.load()
+    assert img.size == (500, 750)  # 1/4 scale; 1/8 (250x375) would be below 320x455
+
+    result = service.process_cover(str(cbz), tmp_path / "thumb.webp")
+    assert result["success"]
+    with Image.open(tmp_path / "thumb.webp") as thumb:
+        assert thumb.size == (303, 455)
+    assert result["palette"]["primary"]
+
+
+# Palettes produced by ColorThief 0.2.1 (color_count=5, quality=10) for the same images
+COLORTHIEF_PALETTES = {
+    1: [(120, 130, 191), (53, 197, 39), (15, 219, 199), (34, 97, 103), (44, 180, 233)],
+    2: [(165, 134, 188), (213, 68, 28), (83, 90, 135), (205, 122, 26), (236, 236, 140)],
+    3: [(211, 24, 40), (173, 160, 56), (41, 105, 118), (141, 123, 66), (100, 92, 156)],
+}
+
+
+@pytest.mark.parametrize("seed", sorted(COLORTHIEF_PALETTES))
+def test_palette_matches_colorthief(seed):
+    assert get_palette(make_palette_cover(seed), color_count=5, quality=10) == COLORTHIEF_PALETTES[seed]
+
+
+def test_palette_dict_shape_for_flat_cover():
+    palette = palette_to_dict(get_palette(Image.new("RGB", (100, 150), (200, 30, 30))))
+    assert set(palette) == {"primary", "secondary", "accent1", "accent2", "accent3"}
+    assert palette["primary"] == "#cc1c1c"  # ColorThief gives the same 5-bit bin centre
+    assert palette_to_dict(get_palette(Image.new("RGB", (10, 10), (255, 255, 255)))) is None
+
+
+def test_cover_renditions_from_one_decode(tmp_path):
+    service = ImageService()
+    cbz = make_cover_cbz(tmp_path / "book.cbz")
+    base = tmp_path / "comic_1.webp"
+
+    result = service.process_cover(str(cbz), base, widths=[160, 320, 640])
+    assert result["success"]
+
+    for width, expected in ((160, (152, 228)), (320, (303, 455)), (640, (607, 910))):
+        path = rendition_path(base, width)
+        assert path.name == ("comic_1.webp" if width == 320 else f"comic_1_w{width}.webp")
+        with Image.open(path) as img:
+            assert img.size == expected
+
+    # Lazy single rendition (endpoint fallback)
+    assert service.generate_thumbnail(str(cbz), tmp_path / "lazy.webp", width=160)
+    with Image.open(tmp_path / "lazy.webp") as img:
+        assert img.size == (152, 228)
+
+
+def test_rendition_width_selection():
+    widths = parse_thumbnail_widths("640, 160,junk,5000", base_width=320)
+    assert widths == [160, 320, 640, 1280]
+
+    assert pick_rendition_width(100, widths) == 160
+    assert pick_rendition_width(321, widths) == 640
+    assert pick_rendition_width(3000, widths) == 1280
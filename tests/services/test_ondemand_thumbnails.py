@@ -0,0 +1,101 @@
+import threading
+from unittest.mock import patch
+
+import portalocker
+import pytest
+
+from app.models.comic import Comic
+from app.services.cover_store import CoverStore
+from app.services.ondemand_thumbnails import OnDemandThumbnails, READY, PENDING, FAILED
+
+
+class SlowImageService:
+    """Renders fake covers once released, counting calls"""
+
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.calls = 0
+        self.release = threading.Event()
+
+    def render_cover(self, comic_path, widths=None):
+        self.calls += 1
+        self.release.wait(5)
+        if not self.ok:
+            return {"success": False, "palette": None, "renditions": {}}
+        return {"success": True, "palette": {"primary": "#112233", "secondary": "#445566"},
+                "renditions": {width: f"{comic_path}@{width}".encode() for width in widths}}
+
+
+@pytest.fixture
+def make_service(db, tmp_path):
+    services = []
+
+    def make(**kwargs):
+        service = OnDemandThumbnails(lock_dir=tmp_path / "locks", store=CoverStore(tmp_path / "cover"),
+                                     session_factory=lambda: db, **kwargs)
+        services.append(service)
+        return service
+
+    with patch("app.services.ondemand_thumbnails.get_thumbnail_widths", return_value=[320, 640]):
+        yield make
+
+    for service in services:
+        service.shutdown()
+
+
+def test_concurrent_requests_share_one_generation(db, make_service):
+    comic = Comic(filename="1.cbz", file_path="/lib/1.cbz")
+    db.add(comic)
+    db.commit()
+    comic_id = comic.id
+
+    service = make_service()
+    service._image_service = slow = SlowImageService()
+
+    first = service.submit(comic_id, "/lib/1.cbz")
+    second = service.submit(comic_id, "/lib/1.cbz")
+    assert first is second
+
+    slow.release.set()
+    status, cover_hash = first.result(5)
+    assert status == READY and slow.calls == 1
+    assert service.stats()["joined"] == 1 and service.stats()["in_flight"] == 0
+
+    # Every rendition is in the hash-sharded store, and the comic points at it
+    assert service.store.path_for(cover_hash, 640).read_bytes() == b"/lib/1.cbz@640"
+    comic = db.get(Comic, comic_id)
+    assert (comic.cover_hash, comic.color_primary) == (cover_hash, "#112233")
+    assert comic.thumbnail_path == str(service.store.path_for(cover_hash))
+
+    # Already stored: a later request doesn't render again
+    assert service.submit(comic_id, "/lib/1.cbz").result(5) == (READY, cover_hash)
+    assert slow.calls == 1
+
+
+def test_locked_elsewhere_is_pending_and_failures_are_reported(make_service):
+    service = make_service()
+    service._image_service = slow = SlowImageService(ok=False)
+    slow.release.set()
+    service.lock_dir.mkdir()
+
+    # Another web worker holds the lock for this cover
+    with open(service._lock_path(2), "a") as held:
+        portalocker.lock(held, portalocker.LOCK_EX | portalocker.LOCK_NB)
+        assert service.submit(2, "/lib/2.cbz").result(5) == (PENDING, None)
+        portalocker.unlock(held)
+
+    assert service.submit(2, "/lib/2.cbz").result(5) == (FAILED, None)
+    assert slow.calls == 1
+    assert service.placeholder()[:4] == b"RIFF"
+
+
+def test_queue_is_bounded(make_service):
+    service = make_service(max_pending=1)
+    service._image_service = slow = SlowImageService()
+
+    first = service.submit(1, "/lib/1.cbz")
+    assert service.submit(2, "/lib/2.cbz") is None
+    assert service.stats()["rejected"] == 1
+
+    slow.release.set()
+    assert first.result(5)[0] == READY
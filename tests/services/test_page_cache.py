@@ -0,0 +1,47 @@
+import os
+from unittest.mock import patch
+
+from app.services.page_cache import PageCache
+
+
+def test_pages_are_keyed_by_variant_and_file_version(tmp_path):
+    cache = PageCache(tmp_path / "cache")
+    book = tmp_path / "book.cbz"
+    book.write_bytes(b"v1")
+    variant = cache.variant(sharpen=True, grayscale=False, webp=True)
+
+    assert cache.get(1, str(book), 0, variant) is None
+    cache.put(1, str(book), 0, variant, b"sharp", "image/webp")
+
+    path, mime_type = cache.get(1, str(book), 0, variant)
+    assert path.read_bytes() == b"sharp" and mime_type == "image/webp"
+    assert cache.get(1, str(book), 0, cache.variant(False, True, False)) is None
+
+    # Replaced book: old pages are never served and are dropped on the next write
+    os.utime(book, (1, 1))
+    assert cache.get(1, str(book), 0, variant) is None
+    cache.put(1, str(book), 0, variant, b"new", "image/jpeg")
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (1, 3, 2)
+
+
+def test_lru_eviction_over_size_cap(tmp_path):
+    cache = PageCache(tmp_path / "cache", check_every=1)
+    book = tmp_path / "book.cbz"
+    book.write_bytes(b"book")
+
+    with patch.object(PageCache, "max_bytes", return_value=1300):
+        for page in range(3):
+            cache.put(1, str(book), page, "s1g0w0", b"x" * 600, "image/jpeg")
+            if page == 1:
+                # Page 0 read again: page 1 is now the least recently used
+                os.utime(cache.get(1, str(book), 1, "s1g0w0")[0], (1, 1))
+                cache.get(1, str(book), 0, "s1g0w0")
+
+        stats = cache.stats()
+
+    assert stats["files"] == 2 and stats["evictions"] == 1 and stats["evicted_bytes"] == 600
+    assert cache.get(1, str(book), 1, "s1g0w0") is None
+    assert cache.get(1, str(book), 0, "s1g0w0") is not None
@@ -0,0 +1,123 @@
+import io
+import os
+import zipfile
+
+from PIL import Image
+
+from app.services.archive import ComicArchive, read_indexed_zip_member, is_page_map_current
+from app.services.images import ImageService, PROBE_HEADER_BYTES
+
+
+# --- HELPERS ---
+
+def make_cbz(path, members, compression=zipfile.ZIP_STORED):
+    """Write a small CBZ. 'members' is a list of (name, bytes) in archive order."""
+    with zipfile.ZipFile(path, "w", compression=compression) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return path
+
+
+def test_page_map_matches_sorted_pages(tmp_path):
+    """The stored index must follow the same natural/cover-first order as get_pages()"""
+    cbz = make_cbz(tmp_path / "book.cbz", [
+        ("page10.jpg", b"ten"),
+        ("page2.jpg", b"two"),
+        ("ComicInfo.xml", b"<ComicInfo/>"),
+        ("cover.jpg", b"cover"),
+    ])
+
+    with ComicArchive(cbz) as archive:
+        pages = archive.get_pages()
+        page_map = archive.get_page_map(pages)
+
+    assert [e[0] for e in page_map["pages"]] == pages == ["cover.jpg", "page2.jpg", "page10.jpg"]
+    assert is_page_map_current(cbz, page_map)
+
+
+def test_indexed_read_stored_and_deflated(tmp_path):
+    """Direct offset reads must return the same bytes as zipfile for both compression methods"""
+    payload = os.urandom(2048) + b"\x00" * 4096
+
+    for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        cbz = make_cbz(tmp_path / f"book_{compression}.cbz", [("001.jpg", payload), ("002.jpg", b"x" * 100)],
+                       compression=compression)
+
+        with ComicArchive(cbz) as archive:
+            page_map = archive.get_page_map()
+
+        assert read_indexed_zip_member(cbz, page_map["pages"][0]) == payload
+        assert read_indexed_zip_member(cbz, page_map["pages"][1]) == b"x" * 100
+
+
+def test_stale_page_map_falls_back(tmp_path):
+    """A page map from an older version of the file must be ignored"""
+    cbz = make_cbz(tmp_path / "book.cbz", [("001.jpg", b"old")])
+
+    with ComicArchive(cbz) as archive:
+        page_map = archive.get_page_map()
+
+    # Replace the file contents and bump mtime
+    make_cbz(cbz, [("001.jpg", b"new and longer")])
+    os.utime(cbz, (page_map["mtime"] + 10, page_map["mtime"] + 10))
+
+    assert not is_page_map_current(cbz, page_map)
+
+    image_bytes, success, _, _ = ImageService().get_page_image(str(cbz), 0, page_map=page_map)
+    assert success
+    assert image_bytes == b"new and longer"
+
+
+def test_probe_page_dimensions_reads_headers_only(tmp_path):
+    """Sizes and spread flags come from headers; big APPn blocks fall back to a full read; junk is [0, 0, 0]"""
+    def encode(size, fmt, **kwargs):
+        buf = io.BytesIO()
+        Image.new("RGB", size, "white").save(buf, fmt, **kwargs)
+        return buf.getvalue()
+
+    cbz = tmp_path / "book.cbz"
+    with zipfile.ZipFile(cbz, "w") as zf:
+        zf.writestr("001.jpg", encode((100, 150), "JPEG"))
+        zf.writestr("002.png", encode((300, 200), "PNG"))
+        # ICC profile pushes the JPEG frame header past the probe window
+        zf.writestr("003.jpg", encode((120, 180), "JPEG", icc_profile=os.urandom(PROBE_HEADER_BYTES * 2)))
+        zf.writestr("004.jpg", b"not an image")
+
+    with ComicArchive(cbz) as archive:
+        dimensions = ImageService().probe_page_dimensions(archive, archive.get_pages())
+
+    assert dimensions == [[100, 150, 0], [300, 200, 1], [120, 180, 0], [0, 0, 0]]
+
+
+def test_rar_7z_dimensions_are_read_when_opened(db, tmp_path):
+    """Scan-time probing is ZIP only; other archives get one pass when first opened, kept in memory"""
+    from unittest.mock import patch, PropertyMock
+
+    from app.models.comic import Comic
+    from app.services.page_dimensions import PageDimensionsCache
+
+    def encode(size):
+        buf = io.BytesIO()
+        Image.new("RGB", size, "white").save(buf, "PNG")
+        return buf.getvalue()
+
+    book = make_cbz(tmp_path / "book.cbz", [("001.png", encode((100, 150))), ("002.png", encode((300, 200)))])
+    comic = Comic(filename="book.cbr", file_path=str(book))
+    db.add(comic)
+    db.commit()
+
+    cache = PageDimensionsCache()
+
+    # Stand-in for a RAR/7z: no partial reads
+    with patch.object(ComicArchive, "supports_partial_reads", new_callable=PropertyMock, return_value=False):
+        with ComicArchive(book) as archive:
+            assert ImageService().probe_page_dimensions(archive, archive.get_pages()) is None
+
+        assert cache.get(comic.id, str(book)) is None
+        cache.fill(comic.id, str(book))
+
+    assert cache.get(comic.id, str(book)) == [[100, 150, 0], [300, 200, 1]]
+
+    # Nothing written: a GET never takes the DB writer lock
+    db.expire_all()
+    assert db.get(Comic, comic.id).page_dimensions is None
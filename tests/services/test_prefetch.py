@@ -0,0 +1,65 @@
+import threading
+import zipfile
+from io import BytesIO
+
+from PIL import Image
+
+from app.services.page_cache import PageCache
+from app.services.prefetch import PagePrefetcher
+
+
+def make_book(path, count):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for n in range(count):
+            buf = BytesIO()
+            Image.new("RGB", (40, 60), (n * 40, 0, 0)).save(buf, "JPEG")
+            zf.writestr(f"{n:03d}.jpg", buf.getvalue())
+    return path
+
+
+def test_pages_are_rendered_into_the_page_cache(tmp_path, monkeypatch):
+    cache = PageCache(tmp_path / "pages")
+    monkeypatch.setattr("app.services.prefetch.page_cache", cache)
+    monkeypatch.setattr(PageCache, "is_enabled", staticmethod(lambda: True))
+    book = str(make_book(tmp_path / "book.cbz", 4))
+
+    prefetcher = PagePrefetcher()
+    try:
+        # No filters: nothing to render ahead of time
+        assert prefetcher.schedule("alice", 1, book, None, range(4)) == 0
+        assert prefetcher.schedule("alice", 1, book, None, range(1, 3), grayscale=True) == 2
+    finally:
+        prefetcher.shutdown(wait=True)
+
+    variant = cache.variant(sharpen=False, grayscale=True, webp=False)
+    path, mime_type = cache.get(1, book, 2, variant)
+    assert mime_type == "image/jpeg" and Image.open(path).mode == "L"
+    assert cache.get(1, book, 0, variant) is None
+
+    # Already cached: skipped on the next pass
+    prefetcher = PagePrefetcher()
+    try:
+        prefetcher.schedule("alice", 1, book, None, [2], grayscale=True)
+    finally:
+        prefetcher.shutdown(wait=True)
+    assert prefetcher.stats()["skipped"] == 1 and prefetcher.stats()["prefetched"] == 0
+
+
+def test_per_user_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.prefetch.page_cache", PageCache(tmp_path / "pages"))
+    monkeypatch.setattr(PageCache, "is_enabled", staticmethod(lambda: True))
+    book = str(make_book(tmp_path / "book.cbz", 6))
+
+    prefetcher = PagePrefetcher(max_per_user=2)
+    # Block the worker so nothing completes while scheduling
+    gate = threading.Event()
+    prefetcher._prefetch_page = lambda *args: gate.wait(5)
+
+    try:
+        assert prefetcher.schedule("alice", 1, book, None, range(5), sharpen=True) == 2
+        assert prefetcher.schedule("alice", 1, book, None, range(2), sharpen=True) == 0  # Already queued
+        assert prefetcher.schedule("bob", 1, book, None, range(1), webp=True) == 1
+        assert prefetcher.stats()["dropped"] == 3 and prefetcher.stats()["users"] == 2
+    finally:
+        gate.set()
+        prefetcher.shutdown(wait=True)
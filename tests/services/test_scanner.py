@@ -0,0 +1,332 @@
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from app.models.comic import Comic
+from app.models.collection import CollectionItem
+from app.models.credits import ComicCredit, Person
+from app.models.reading_list import ReadingListItem
+from app.models.tags import Character
+from app.models.reading_progress import ReadingProgress
+from app.models.library import Library
+from app.services.scanner import LibraryScanner
+
+
+# --- HELPERS ---
+
+def write_comic(path, series, number, extra="", cover=b"cover"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    comicinfo = (f"<ComicInfo><Series>{series}</Series><Number>{number}</Number>"
+                 f"<Volume>1</Volume><Writer>Brian K. Vaughan</Writer>{extra}</ComicInfo>")
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("001.jpg", cover)
+        zf.writestr("002.jpg", b"page")
+        zf.writestr("ComicInfo.xml", comicinfo)
+    return path
+
+
+def make_library(db, tmp_path):
+    lib = Library(name="Scan Lib", path=str(tmp_path / "library"))
+    db.add(lib)
+    db.commit()
+    return lib
+
+
+@pytest.fixture
+def scan_settings():
+    """Scanner settings are read via the cached loader; pin them for tests"""
+    values = {"scanning.metadata_workers": 2, "scanning.stream_thumbnails": False}
+    with patch("app.services.scanner.get_cached_setting", side_effect=lambda key, default=None: values.get(key, default)):
+        yield values
+
+
+@pytest.mark.parametrize("min_items", [1000, 0], ids=["serial", "parallel"])
+def test_scan_imports_and_skips(db, tmp_path, scan_settings, min_items):
+    """Both extraction paths import everything once, and a rescan skips unchanged files"""
+    lib = make_library(db, tmp_path)
+    for number in range(1, 6):
+        write_comic(tmp_path / "library" / "Saga" / f"Saga {number:03d}.cbz", "Saga", number)
+
+    with patch("app.services.scanner.PARALLEL_MIN_ITEMS", min_items), \
+            patch("app.services.scanner.multiprocessing.cpu_count", return_value=4):
+        result = LibraryScanner(lib, db).scan()
+
+    assert result["imported"] == 5
+    assert result["errors"] == 0
+    assert sorted(c.number for c in db.query(Comic).all()) == ["1", "2", "3", "4", "5"]
+    assert all(c.page_count == 2 and c.page_map for c in db.query(Comic).all())
+
+    rescan = LibraryScanner(lib, db).scan()
+    assert rescan["imported"] == 0
+    assert rescan["updated"] == 0
+    assert rescan["skipped"] == 5
+
+
+def test_unchanged_folders_are_not_listed(db, tmp_path, scan_settings):
+    """A second scan skips folders whose mtime didn't change, but still finds new files elsewhere"""
+    lib = make_library(db, tmp_path)
+    root = tmp_path / "library"
+    write_comic(root / "Saga" / "Saga 001.cbz", "Saga", 1)
+    write_comic(root / "Monstress" / "Monstress 001.cbz", "Monstress", 1)
+
+    first = LibraryScanner(lib, db).scan()
+    assert first["imported"] == 2
+    assert first["directories_skipped"] == 0
+
+    # New issue lands in one folder only
+    write_comic(root / "Saga" / "Saga 002.cbz", "Saga", 2)
+
+    second = LibraryScanner(lib, db).scan()
+    assert second["imported"] == 1
+    assert second["deleted"] == 0
+    assert second["skipped"] == 2
+    # Root + Monstress unchanged; Saga changed and was listed
+    assert second["directories_skipped"] == 2
+
+    # Deleting a file changes its folder's mtime, so it is noticed
+    (root / "Monstress" / "Monstress 001.cbz").unlink()
+    third = LibraryScanner(lib, db).scan()
+    assert third["deleted"] == 1
+    assert db.query(Comic).count() == 2
+
+    # Force scans list everything
+    forced = LibraryScanner(lib, db).scan(force=True)
+    assert forced["directories_skipped"] == 0
+    assert forced["updated"] == 2
+
+
+def test_deleted_files_remove_dependent_rows(db, tmp_path, scan_settings, normal_user):
+    """Bulk delete by id must also clear credits and reading progress for the removed comic"""
+    lib = make_library(db, tmp_path)
+    book = write_comic(tmp_path / "library" / "Saga" / "Saga 001.cbz", "Saga", 1)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 002.cbz", "Saga", 2)
+
+    LibraryScanner(lib, db).scan()
+    doomed = db.query(Comic).filter(Comic.file_path == str(book)).one()
+    db.add(ReadingProgress(user_id=normal_user.id, comic_id=doomed.id, current_page=1, total_pages=2))
+    db.commit()
+    doomed_id = doomed.id
+
+    book.unlink()
+    result = LibraryScanner(lib, db).scan()
+    db.expire_all()
+
+    assert result["deleted"] == 1
+    assert db.get(Comic, doomed_id) is None
+    assert db.query(ReadingProgress).filter(ReadingProgress.comic_id == doomed_id).count() == 0
+    assert db.query(ComicCredit).filter(ComicCredit.comic_id == doomed_id).count() == 0
+    assert db.query(ComicCredit).count() == 1
+
+
+def test_moved_file_keeps_id_and_progress(db, tmp_path, scan_settings, normal_user):
+    """A renamed/moved file is matched by fingerprint instead of being deleted and re-imported"""
+    lib = make_library(db, tmp_path)
+    book = write_comic(tmp_path / "library" / "Saga" / "Saga 001.cbz", "Saga", 1)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 002.cbz", "Saga", 2)
+
+    LibraryScanner(lib, db).scan()
+    comic = db.query(Comic).filter(Comic.file_path == str(book)).one()
+    assert comic.fingerprint
+    db.add(ReadingProgress(user_id=normal_user.id, comic_id=comic.id, current_page=1, total_pages=2))
+    db.commit()
+    comic_id = comic.id
+
+    new_path = tmp_path / "library" / "Saga (2012)" / "Saga #1.cbz"
+    new_path.parent.mkdir()
+    book.rename(new_path)
+
+    result = LibraryScanner(lib, db).scan()
+    db.expire_all()
+
+    assert result["moved"] == 1
+    assert result["imported"] == 0
+    assert result["deleted"] == 0
+
+    moved = db.get(Comic, comic_id)
+    assert moved.file_path == str(new_path)
+    assert moved.filename == "Saga #1.cbz"
+    assert db.query(ReadingProgress).filter(ReadingProgress.comic_id == comic_id).count() == 1
+    assert db.query(Comic).count() == 2
+
+
+def test_links_are_bulk_written_and_replaced_on_update(db, tmp_path, scan_settings):
+    """Credits, tags, lists and collections land once per comic and are replaced (not duplicated) on rescan"""
+    lib = make_library(db, tmp_path)
+    extra = ("<Penciller>Fiona Staples</Penciller><Characters>Alana, Marko, Alana</Characters>"
+             "<AlternateSeries>Saga Reading Order</AlternateSeries><AlternateNumber>2</AlternateNumber>"
+             "<SeriesGroup>Image Comics</SeriesGroup>")
+    write_comic(tmp_path / "library" / "Saga" / "Saga 001.cbz", "Saga", 1, extra)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 002.cbz", "Saga", 2, extra)
+
+    LibraryScanner(lib, db).scan()
+
+    assert db.query(Person).count() == 2
+    assert db.query(ComicCredit).count() == 4
+    assert sorted(name for (name,) in db.query(Character.name)) == ["Alana", "Marko"]
+    assert db.query(ReadingListItem).count() == 2
+    assert db.query(CollectionItem).count() == 2
+
+    forced = LibraryScanner(lib, db).scan(force=True)
+    db.expire_all()
+
+    assert forced["updated"] == 2
+    assert db.query(ComicCredit).count() == 4
+    assert all(len(c.characters) == 2 for c in db.query(Comic).all())
+    assert db.query(ReadingListItem).count() == 2
+    assert db.query(CollectionItem).count() == 2
+
+
+def test_failed_link_write_only_drops_that_comic(db, tmp_path, scan_settings):
+    """A failing bulk link write is retried per comic: the batch is kept, only the bad comic is reported"""
+    from app.services.credits import CreditService
+
+    lib = make_library(db, tmp_path)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 001.cbz", "Saga", 1)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 002.cbz", "Saga", 2, "<Penciller>Broken</Penciller>")
+
+    flush_queued = CreditService.flush_queued
+
+    def failing_flush(service):
+        if any(name == "Broken" for _, name, _ in service.pending_credits):
+            raise RuntimeError("constraint failed")
+        flush_queued(service)
+
+    with patch.object(CreditService, "flush_queued", failing_flush):
+        result = LibraryScanner(lib, db).scan()
+
+    assert result["imported"] == 2
+    assert result["errors"] == 1 and "Saga 002" in result["error_details"][0]["file"]
+    assert db.query(Comic).count() == 2
+    assert [name for (name,) in db.query(Person.name)] == ["Brian K. Vaughan"]
+    assert db.query(ComicCredit).count() == 1
+
+
+def test_failed_commit_is_rolled_back_and_retried(db, tmp_path, scan_settings):
+    """A batch whose commit fails (e.g. database is locked) is written again, not the end of the scan"""
+    from sqlalchemy.exc import OperationalError
+    from app.models.series import Series
+    from app.services.bulk import AdaptiveCommitBatcher
+
+    lib = make_library(db, tmp_path)
+    for number in range(1, 4):
+        write_comic(tmp_path / "library" / "Saga" / f"Saga {number:03d}.cbz", "Saga", number)
+
+    commit = AdaptiveCommitBatcher.commit
+    calls = []
+
+    def locked_once(batcher, session, before=None):
+        calls.append(batcher.pending)
+        if len(calls) == 1:
+            before()
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+        commit(batcher, session, before=before)
+
+    with patch.object(AdaptiveCommitBatcher, "commit", locked_once):
+        result = LibraryScanner(lib, db).scan()
+
+    assert len(calls) == 2 and calls[0] == 3
+    assert result["imported"] == 3 and result["errors"] == 0
+    assert result["commits"]["contended"] == 1
+    assert db.query(Comic).count() == 3
+    assert db.query(Series).count() == 1
+    assert db.query(ComicCredit).count() == 3
+
+
+def test_page_index_is_backfilled_without_full_update(db, tmp_path, scan_settings):
+    """Unchanged comics missing page_map / page_dimensions get only those columns, not a full update"""
+    lib = make_library(db, tmp_path)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 001.cbz", "Saga", 1)
+    LibraryScanner(lib, db).scan()
+
+    db.query(Comic).update({Comic.page_map: None, Comic.page_dimensions: None})
+    db.commit()
+
+    with patch.object(LibraryScanner, "_update_comic") as update_comic:
+        result = LibraryScanner(lib, db).scan()
+
+    update_comic.assert_not_called()
+    assert result["updated"] == 0 and result["skipped"] == 1
+    db.expire_all()
+    comic = db.query(Comic).one()
+    assert comic.page_map and len(comic.page_dimensions) == 2
+    assert db.query(ComicCredit).count() == 1
+
+
+def test_scoped_scan_only_touches_given_paths(db, tmp_path, scan_settings):
+    """A path-scoped scan imports, moves and deletes inside the scope and ignores everything else"""
+    lib = make_library(db, tmp_path)
+    root = tmp_path / "library"
+    gone = write_comic(root / "Saga" / "Saga 001.cbz", "Saga", 1)
+    renamed = write_comic(root / "Saga" / "Saga 002.cbz", "Saga", 2)
+    LibraryScanner(lib, db).scan()
+
+    gone.unlink()
+    renamed.rename(root / "Saga" / "Saga #2.cbz")
+    added = write_comic(root / "Monstress" / "Monstress 001.cbz", "Monstress", 1)
+    # Changed on disk but not reported: must be left alone
+    write_comic(root / "Paper Girls" / "Paper Girls 001.cbz", "Paper Girls", 1)
+
+    scope = [str(gone), str(renamed), str(root / "Saga" / "Saga #2.cbz"), str(added.parent)]
+    result = LibraryScanner(lib, db).scan(paths=scope)
+
+    assert result["scoped_paths"] == 4
+    assert result["imported"] == 1
+    assert result["moved"] == 1
+    assert result["deleted"] == 1
+    assert sorted(c.filename for c in db.query(Comic).all()) == ["Monstress 001.cbz", "Saga #2.cbz"]
+
+    # The next full scan still finds what the scoped scan wasn't told about
+    full = LibraryScanner(lib, db).scan()
+    assert full["imported"] == 1
+    assert full["deleted"] == 0
+
+
+def test_covers_are_generated_during_scan(db, tmp_path, scan_settings, monkeypatch):
+    """Cover bytes read by the metadata step are rendered alongside the scan, no THUMBNAIL job needed"""
+    from io import BytesIO
+    from PIL import Image
+    from app.services.cover_store import CoverStore
+    from app.services.image_pool import image_worker_pool
+
+    store = CoverStore(tmp_path / "cover")
+    monkeypatch.setattr("app.services.cover_store.cover_store", store)
+    image_worker_pool.shutdown()  # Workers fork with the patched store
+    monkeypatch.setattr("app.services.scanner.get_thumbnail_widths", lambda: [320])
+    scan_settings["scanning.stream_thumbnails"] = True
+
+    buf = BytesIO()
+    Image.new("RGB", (640, 910), (200, 30, 30)).save(buf, "JPEG")
+
+    lib = make_library(db, tmp_path)
+    write_comic(tmp_path / "library" / "Saga" / "Saga 001.cbz", "Saga", 1, cover=buf.getvalue())
+    write_comic(tmp_path / "library" / "Saga" / "Saga 001 (Variant).cbz", "Saga", 2, cover=buf.getvalue())
+    write_comic(tmp_path / "library" / "Saga" / "Saga 003.cbz", "Saga", 3)  # not an image
+
+    result = LibraryScanner(lib, db).scan()
+    assert result["thumbnails"] == {"generated": 2, "errors": 1, "deduplicated": 1}
+
+    db.expire_all()
+    comics = {c.number: c for c in db.query(Comic).all()}
+    assert comics["1"].cover_hash and comics["1"].cover_hash == comics["2"].cover_hash
+    assert comics["1"].thumbnail_path == str(store.path_for(comics["1"].cover_hash))
+    assert store.path_for(comics["1"].cover_hash).exists()
+    assert comics["1"].color_primary
+    assert comics["3"].cover_hash is None
+
+    # Forced rescan of unchanged files: no covers re-rendered
+    forced = LibraryScanner(lib, db).scan(force=True)
+    assert forced["updated"] == 3 and forced["thumbnails"] is None
+
+    # Aborted scan: the stream still hands the pool back
+    write_comic(tmp_path / "library" / "Saga" / "Saga 004.cbz", "Saga", 4, cover=buf.getvalue())
+    iter_metadata = LibraryScanner._iter_metadata
+
+    def failing_metadata(scanner, work_items, **kwargs):
+        yield from iter_metadata(scanner, work_items, **kwargs)
+        raise RuntimeError("worker pool died")
+
+    with patch.object(LibraryScanner, "_iter_metadata", failing_metadata), pytest.raises(RuntimeError):
+        LibraryScanner(lib, db).scan()
+    assert image_worker_pool._active == 0
+    image_worker_pool.shutdown()
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.services.watcher import LibraryEventHandler
+
+
+def fire(handler):
+    """Run the batch window callback now (instead of waiting for the timer)"""
+    handler._timer.cancel()
+    with patch("app.services.watcher.scan_manager.add_task") as add_task:
+        handler._trigger_scan()
+    return add_task
+
+
+def event(event_type, src_path, dest_path=None, is_directory=False):
+    return SimpleNamespace(event_type=event_type, src_path=src_path, dest_path=dest_path, is_directory=is_directory)
+
+
+def test_handler_queues_scan_scoped_to_changed_paths(tmp_path):
+    """Events are deduplicated into one scoped scan; noise is ignored; too many paths fall back to a full scan"""
+    handler = LibraryEventHandler(library_id=7, batch_window_seconds=3600)
+    lib = tmp_path / "library"
+
+    try:
+        handler.on_any_event(event("created", str(lib / "Saga" / "Saga 001.cbz")))
+        handler.on_any_event(event("modified", str(lib / "Saga" / "Saga 001.cbz")))
+        handler.on_any_event(event("moved", str(lib / "Saga 002.cbz.part"), str(lib / "Saga" / "Saga 002.cbz")))
+        handler.on_any_event(event("modified", str(lib / "Saga"), is_directory=True))
+        handler.on_any_event(event("created", str(lib / "Saga" / "cover.webp")))
+        handler.on_any_event(event("deleted", str(lib / "Old Series"), is_directory=True))
+
+        add_task = fire(handler)
+        add_task.assert_called_once_with(7, force=False, paths=sorted([
+            str(lib / "Old Series"),
+            str(lib / "Saga" / "Saga 001.cbz"),
+            str(lib / "Saga" / "Saga 002.cbz"),
+        ]))
+
+        with patch("app.services.watcher.SCOPED_SCAN_MAX_PATHS", 2):
+            for n in range(3):
+                handler.on_any_event(event("created", str(lib / f"Book {n}.cbz")))
+
+        add_task = fire(handler)
+        add_task.assert_called_once_with(7, force=False, paths=None)
+    finally:
+        handler.stop()
+
+
+def test_handler_watches_the_scanner_extensions(tmp_path):
+    """Only files the scanner would import trigger a scan"""
+    with patch("app.services.watcher.settings.supported_extensions", [".cbz", ".CB7"]):
+        handler = LibraryEventHandler(library_id=7, batch_window_seconds=3600)
+
+    assert handler._is_relevant(str(tmp_path / "Saga 001.cb7"), is_directory=False)
+    assert not handler._is_relevant(str(tmp_path / "Saga 001.cbr"), is_directory=False)